@@ -0,0 +1,139 @@
+"""本地 HNSW 索引 vs Chroma：recall@10 与单 query 检索延迟（p50/p99）
+
+使用随机聚簇向量（模拟 embedding 分布），以暴力余弦检索结果为真值。
+
+用法（在仓库根目录执行，需要 pip install ".[ann]"）：
+
+    python -m benchmarks.ann_vs_chroma --num 50000 --dim 1024 --queries 500 --output ann_vs_chroma.json
+"""
+
+import argparse
+import json
+import statistics
+import tempfile
+import time
+
+import chromadb
+import numpy as np
+
+from src.rag.retriever.ann_retriever.hnsw_index import HNSWIndex
+
+
+def make_vectors(num: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=num)
+    vectors = centers[labels] + 0.3 * rng.normal(size=(num, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def ground_truth(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    scores = queries @ vectors.T
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(
+        top, np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1), axis=1
+    )
+
+
+def recall(found: list[list[int]], truth: np.ndarray) -> float:
+    hits = [len(set(f) & set(t.tolist())) / len(t) for f, t in zip(found, truth)]
+    return float(np.mean(hits))
+
+
+def summarize(latencies: list[float]) -> dict:
+    ordered = sorted(latencies)
+    return {
+        "mean_ms": statistics.mean(ordered) * 1000,
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p99_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000,
+    }
+
+
+def bench_chroma(vectors: np.ndarray, queries: np.ndarray, k: int) -> dict:
+    client = chromadb.EphemeralClient()
+    collection = client.create_collection(
+        "bench", metadata={"hnsw:space": "cosine"}, embedding_function=None
+    )
+    start = time.perf_counter()
+    batch = 5000
+    for i in range(0, len(vectors), batch):
+        chunk = vectors[i : i + batch]
+        collection.add(
+            ids=[str(j) for j in range(i, i + len(chunk))],
+            embeddings=chunk.tolist(),  # type: ignore
+        )
+    build_s = time.perf_counter() - start
+
+    found, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        result = collection.query(query_embeddings=[query.tolist()], n_results=k)
+        latencies.append(time.perf_counter() - start)
+        found.append([int(i) for i in result["ids"][0]])
+    return {"build_s": build_s, "found": found, **summarize(latencies)}
+
+
+def bench_hnsw(
+    vectors: np.ndarray, queries: np.ndarray, k: int, ef: int, directory: str
+) -> dict:
+    index = HNSWIndex("bench")
+    index.directory = directory
+    start = time.perf_counter()
+    # 分批增量写入，与 ingest 路径一致
+    batch = 5000
+    for i in range(0, len(vectors), batch):
+        index.add_collection(f"c{i}", vectors[i : i + batch])
+    index.save()
+    build_s = time.perf_counter() - start
+
+    index.reload()
+    found, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        hits = index.search(query[None, :], k, ef=ef)[0]
+        latencies.append(time.perf_counter() - start)
+        found.append([int(cid[1:]) + pos for cid, pos, _ in hits])
+    return {"build_s": build_s, "found": found, **summarize(latencies)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--num", type=int, default=50000, help="向量数量")
+    parser.add_argument("--dim", type=int, default=1024, help="向量维度")
+    parser.add_argument("--clusters", type=int, default=100)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--ef", type=int, nargs="*", default=[32, 64, 128])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=str, default="ann_vs_chroma.json")
+    args = parser.parse_args()
+
+    vectors = make_vectors(args.num, args.dim, args.clusters, args.seed)
+    queries = make_vectors(args.queries, args.dim, args.clusters, args.seed + 1)
+    truth = ground_truth(vectors, queries, args.k)
+
+    report: dict = {"num": args.num, "dim": args.dim, "k": args.k, "results": {}}
+
+    chroma = bench_chroma(vectors, queries, args.k)
+    chroma["recall"] = recall(chroma.pop("found"), truth)
+    report["results"]["chroma"] = chroma
+
+    for ef in args.ef:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            hnsw = bench_hnsw(vectors, queries, args.k, ef, tmp_dir)
+        hnsw["recall"] = recall(hnsw.pop("found"), truth)
+        report["results"][f"hnsw_ef{ef}"] = hnsw
+
+    for name, result in report["results"].items():
+        print(
+            f"{name:>14}: recall@{args.k}={result['recall']:.4f} "
+            f"p50={result['p50_ms']:.2f}ms p99={result['p99_ms']:.2f}ms "
+            f"build={result['build_s']:.1f}s"
+        )
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
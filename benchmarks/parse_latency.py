@@ -0,0 +1,101 @@
+"""Docling 单文档解析延迟基准：每个文档新建 converter（旧实现） vs 复用预热的 converter
+
+用法（在仓库根目录执行）：
+
+    python -m benchmarks.parse_latency path/to/pdf_dir --runs 2 --output parse_latency.json
+"""
+
+import argparse
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from docling.document_converter import DocumentConverter, PdfFormatOption
+from docling.datamodel.base_models import InputFormat
+
+from src.document.converter_pool import (
+    build_pipeline_options,
+    clear_converters,
+    warm_up,
+)
+from src.document.parse import file_to_markdown
+
+from config import rag_cfg
+
+
+def cold_convert(file_path: str, **kwargs) -> float:
+    """旧实现：每个文档构造新的 DocumentConverter，模型随之重新加载"""
+    start = time.perf_counter()
+    converter = DocumentConverter(
+        format_options={
+            InputFormat.PDF: PdfFormatOption(
+                pipeline_options=build_pipeline_options(**kwargs)
+            )
+        }
+    )
+    converter.convert(file_path).document.export_to_markdown()
+    return time.perf_counter() - start
+
+
+def warm_convert(file_path: str, output_path: str, **kwargs) -> float:
+    start = time.perf_counter()
+    file_to_markdown(file_path, output_path, **kwargs)
+    return time.perf_counter() - start
+
+
+def summarize(latencies: list[float]) -> dict:
+    ordered = sorted(latencies)
+    return {
+        "count": len(ordered),
+        "mean_s": statistics.mean(ordered),
+        "p50_s": ordered[len(ordered) // 2],
+        "max_s": ordered[-1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("pdf_dir", type=Path, help="样例 PDF 所在目录")
+    parser.add_argument("--runs", type=int, default=1, help="每个文档重复次数")
+    parser.add_argument("--output", type=Path, default=None, help="JSON 报告路径")
+    args = parser.parse_args()
+
+    files = sorted(str(p) for p in args.pdf_dir.glob("*.pdf"))
+    if not files:
+        raise SystemExit(f"No PDF found in {args.pdf_dir}")
+
+    docling_cfg = rag_cfg.get("docling", {})
+
+    cold = [cold_convert(f, **docling_cfg) for _ in range(args.runs) for f in files]
+
+    clear_converters()
+    start = time.perf_counter()
+    warm_up(**docling_cfg)
+    warm_up_s = time.perf_counter() - start
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        warm = [
+            warm_convert(f, str(Path(tmp_dir) / f"{i}.md"), **docling_cfg)
+            for _ in range(args.runs)
+            for i, f in enumerate(files)
+        ]
+
+    report = {
+        "files": files,
+        "runs": args.runs,
+        "cold_per_document": summarize(cold),
+        "warm_up_s": warm_up_s,
+        "warm_per_document": summarize(warm),
+    }
+    report["speedup_mean"] = (
+        report["cold_per_document"]["mean_s"] / report["warm_per_document"]["mean_s"]
+    )
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""向量维度与量化方式的内存 / 召回率报告
+
+以最大维度的 float32 暴力检索结果为真值，对比不同 dimensions 与 quantization
+（none / int8 / pq，是否 float 重排）下的常驻内存与 recall@k。
+
+- 指定 --texts 时使用真实 embedding（每行一段文本，前 --queries 行作为 query，
+  按 --dims 中的每个维度分别调用 embedding 接口）
+- 否则使用随机聚簇向量，只对比量化方式（维度取 --dims 中的最大值）
+
+用法（在仓库根目录执行）：
+
+    python -m benchmarks.quantization_report --texts chunks.txt --dims 1024 512 256 --output quantization.json
+"""
+
+import argparse
+import json
+import tempfile
+
+import numpy as np
+
+from src.rag.retriever.ann_retriever.ANNRetriever import ANNRetriever
+from src.rag.retriever.ann_retriever.quantized_index import QuantizedIndex, normalize
+from src.rag.retriever.chroma_retriever.EmbeddingFunction import get_embedding_function
+
+
+def synthetic_vectors(
+    num: int, dim: int, seed: int, clusters: int = 100
+) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=num)
+    return normalize(centers[labels] + 0.3 * rng.normal(size=(num, dim)))
+
+
+def top_k(vectors: np.ndarray, queries: np.ndarray, k: int) -> list[list[int]]:
+    scores = normalize(queries) @ normalize(vectors).T
+    return np.argsort(-scores, axis=1)[:, :k].tolist()
+
+
+def recall(found: list[list[int]], truth: list[list[int]]) -> float:
+    hits = [len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)]
+    return float(np.mean(hits))
+
+
+def evaluate_quantized(
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    truth: list[list[int]],
+    k: int,
+    quantization: str,
+    rescore: int,
+) -> dict:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index = QuantizedIndex("report", quantization)
+        index.directory = tmp_dir
+        index.vector_loader = {"all": vectors}.get
+        index.add_collection("all", vectors)
+        hits = index.search(queries, k, rescore=rescore)
+    found = [[pos for _, pos, _ in query_hits] for query_hits in hits]
+    return {
+        "bytes_per_vector": index.memory_bytes() / len(vectors),
+        "recall": recall(found, truth),
+    }
+
+
+def report_dimension(
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    truth: list[list[int]],
+    k: int,
+    rescore: int,
+) -> dict:
+    results = {
+        "none": {
+            "bytes_per_vector": float(vectors.shape[1] * 4),
+            "recall": recall(top_k(vectors, queries, k), truth),
+        }
+    }
+    for quantization in ("int8", "pq"):
+        results[quantization] = evaluate_quantized(
+            vectors, queries, truth, k, quantization, 0
+        )
+        results[f"{quantization}+rescore"] = evaluate_quantized(
+            vectors, queries, truth, k, quantization, rescore
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--texts", type=str, default=None, help="每行一段文本")
+    parser.add_argument("--dims", type=int, nargs="+", default=[1024])
+    parser.add_argument("--num", type=int, default=20000, help="随机向量数量")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rescore", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=str, default="quantization.json")
+    args = parser.parse_args()
+
+    dims = sorted(set(args.dims), reverse=True)
+    embedded: dict[int, tuple[np.ndarray, np.ndarray]] = {}
+    if args.texts:
+        with open(args.texts, "r", encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+        for dim in dims:
+            vectors = ANNRetriever.embed(texts, get_embedding_function(dim))
+            embedded[dim] = (vectors[args.queries :], vectors[: args.queries])
+    else:
+        all_vectors = synthetic_vectors(args.num + args.queries, dims[0], args.seed)
+        embedded[dims[0]] = (all_vectors[args.queries :], all_vectors[: args.queries])
+
+    # 真值：最大维度的 float 暴力检索
+    base_vectors, base_queries = embedded[max(embedded)]
+    truth = top_k(base_vectors, base_queries, args.k)
+    num_vectors = len(base_vectors)
+
+    report: dict = {"num": num_vectors, "k": args.k, "results": {}}
+    baseline = max(embedded) * 4
+    for dim, (vectors, queries) in embedded.items():
+        results = report_dimension(vectors, queries, truth, args.k, args.rescore)
+        report["results"][str(dim)] = results
+        for mode, result in results.items():
+            result["memory_mb"] = result["bytes_per_vector"] * num_vectors / 2**20
+            result["memory_saved"] = 1 - result["bytes_per_vector"] / baseline
+            print(
+                f"dim={dim:>5} {mode:>13}: recall@{args.k}={result['recall']:.4f} "
+                f"memory={result['memory_mb']:.1f}MB "
+                f"saved={result['memory_saved']:.1%}"
+            )
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
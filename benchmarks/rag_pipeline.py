@@ -0,0 +1,549 @@
+"""RAG 全链路基准：入库吞吐、各检索器检索延迟、EnhancedPipeline 分阶段延迟、
+/chat-stream 并发首字延迟（TTFT）
+
+全部在本机运行，不访问网络：
+- 对话与 embedding 使用本地替身模型（provider = "local"，见 [tool.local_model]）
+- MongoDB 默认使用进程内的 mongomock-motor，也可用 --mongo-uri 指向本地实例
+  （使用独立的临时数据库，结束后删除）
+- Chroma、分块文件与 ANN 索引写入临时目录
+- 语料为随机生成的 Markdown 文档，规模由 --docs / --sections / --words 控制
+
+报告为 JSON，记录当前 commit；指定 --baseline 时与旧报告逐项对比延迟与吞吐。
+
+用法（在仓库根目录执行，需要 pip install ".[bench]"，ann 检索器另需 ".[ann]"）：
+
+    python -m benchmarks.rag_pipeline --docs 200 --users 8 --output bench.json
+    python -m benchmarks.rag_pipeline --docs 200 --users 8 --baseline bench.json
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+import config
+
+ALL_RETRIEVERS = ["vector", "sparse", "hybrid", "ann", "ann_hybrid"]
+
+
+def configure(args, work_dir: str):
+    """切换到本地替身模型与临时存储
+
+    各模块在 import 时读取配置（包括函数默认参数），必须在导入 src 之前调用。
+    """
+    for section in (config.rag_cfg, config.dialog_cfg, config.memory_cfg):
+        section["llm_provider"] = "local"
+        section["llm_model"] = "local-chat"
+    config.rag_cfg["embedding_provider"] = "local"
+    config.rag_cfg["embedding_model"] = "local-hashing"
+
+    config.rag_cfg["chunk_dir"] = os.path.join(work_dir, "chunks")
+    config.rag_cfg["markdown_storage_dir"] = os.path.join(work_dir, "markdown")
+    config.rag_cfg.setdefault("ann", {})["index_dir"] = os.path.join(work_dir, "ann")
+    config.memory_cfg["chunk_dir"] = os.path.join(work_dir, "memory_chunks")
+    config.chroma_cfg.pop("host", None)
+    config.chroma_cfg["persist_directory"] = os.path.join(work_dir, "chroma")
+
+    config.local_model_cfg["embedding_latency_ms"] = args.embedding_latency_ms
+    config.local_model_cfg["chat_first_token_ms"] = args.chat_first_token_ms
+    config.local_model_cfg["chat_token_ms"] = args.chat_token_ms
+    config.local_model_cfg["chat_output_tokens"] = args.chat_output_tokens
+
+
+def summarize(latencies: list[float]) -> dict:
+    if not latencies:
+        return {"count": 0}
+    ordered = sorted(latencies)
+
+    def percentile(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p))] * 1000
+
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.mean(ordered) * 1000,
+        "p50_ms": percentile(0.5),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{commit}-dirty" if dirty else commit
+
+
+# 语料 ==========================================================================
+
+
+def make_word(rng: random.Random) -> str:
+    syllables = ["ka", "lo", "mi", "ren", "tor", "va", "sil", "qu", "ne", "dra", "po"]
+    return "".join(rng.choice(syllables) for _ in range(rng.randint(2, 4)))
+
+
+class Corpus:
+    """随机 Markdown 语料：每个文档有自己的主题词，正文混合主题词与公共词"""
+
+    def __init__(self, num_docs: int, sections: int, words: int, seed: int):
+        rng = random.Random(seed)
+        common = [make_word(rng) for _ in range(2000)]
+        self.documents: list[dict] = []
+        for i in range(num_docs):
+            topic = [make_word(rng) for _ in range(30)]
+            body = [f"# Document {i} {' '.join(topic[:3])}\n"]
+            section_texts = []
+            for j in range(sections):
+                text = " ".join(
+                    rng.choice(topic) if rng.random() < 0.3 else rng.choice(common)
+                    for _ in range(words)
+                )
+                section_texts.append(text)
+                body.append(f"## Section {j} {topic[j % len(topic)]}\n\n{text}\n")
+            self.documents.append(
+                {
+                    "title": f"Document {i} {' '.join(topic[:3])}",
+                    "keywords": topic[:5],
+                    "markdown": "\n".join(body),
+                    "sections": section_texts,
+                }
+            )
+
+    def queries(self, num: int, seed: int) -> list[str]:
+        """从随机文档的随机段落中抽取连续片段作为 query"""
+        rng = random.Random(seed)
+        queries = []
+        for _ in range(num):
+            words = rng.choice(rng.choice(self.documents)["sections"]).split()
+            start = rng.randrange(max(1, len(words) - 8))
+            queries.append(" ".join(words[start : start + 8]))
+        return queries
+
+    def write(self, directory: Path) -> list[str]:
+        directory.mkdir(parents=True, exist_ok=True)
+        paths = []
+        for i, document in enumerate(self.documents):
+            path = directory / f"{i}.md"
+            path.write_text(document["markdown"], encoding="utf-8")
+            paths.append(str(path))
+        return paths
+
+
+# 环境 ==========================================================================
+
+
+async def init_database(mongo_uri: str | None):
+    from beanie import init_beanie
+
+    from src.session import Session, LongTermMemory
+    from src.document import DocumentRecord
+    import src.document.odm.DocumentRecord as dr
+    from src.rag import KnowledgeBase, CollectionRecord
+    from src.job import Job
+    from src.usage import TokenUsage
+    from src.prompt import load_all_prompts
+
+    if mongo_uri:
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        client = AsyncIOMotorClient(mongo_uri)
+    else:
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError as e:
+            raise SystemExit(
+                'mongomock-motor is not installed: pip install ".[bench]" '
+                "or pass --mongo-uri"
+            ) from e
+        client = AsyncMongoMockClient()
+
+    database_name = f"rag_bench_{os.getpid()}"
+    # 与 src.api.main 的 lifespan 一致
+    await init_beanie(
+        database=client[database_name],  # type: ignore
+        document_models=[
+            Session,
+            KnowledgeBase,
+            DocumentRecord,
+            CollectionRecord,
+            LongTermMemory,
+            Job,
+            TokenUsage,
+        ],
+    )
+    load_all_prompts()
+    dr.id_title_mapping = {}
+    return client, database_name
+
+
+async def create_records(corpus: Corpus, paths: list[str], salt: str) -> list[str]:
+    """为每个文档新建 DocumentRecord
+
+    file_hash 按检索器类型加盐，避免不同知识库之间复用分块与向量，
+    使每种检索器都测到完整的入库开销。
+    """
+    from src.document import DocumentRecord
+
+    ids = []
+    for i, (document, path) in enumerate(zip(corpus.documents, paths)):
+        record = DocumentRecord(
+            source="benchmark",
+            storage_path=path,
+            file_hash=f"bench-{salt}-{i}",
+            markdown_path=path,
+            language="EN",
+            title=document["title"],
+            keywords=document["keywords"],
+        )
+        await record.insert()
+        ids.append(str(record.id))
+    return ids
+
+
+# 基准 ==========================================================================
+
+
+async def bench_ingest(
+    corpus: Corpus, paths: list[str], retriever_type: str, args
+) -> tuple[str, dict]:
+    from src.rag import CollectionRecord
+    from src.rag.knowledge_base.knowledge_base_service import (
+        create_knowledge_base,
+        add_records_to_knowledge_base,
+    )
+
+    record_ids = await create_records(corpus, paths, retriever_type)
+    knowledge_base = await create_knowledge_base(
+        name=f"bench-{retriever_type}",
+        retriever_type=retriever_type,
+        chunk_size=args.chunk_size,
+        dimensions=args.dimensions,
+        quantization=args.quantization if retriever_type.startswith("ann") else "none",
+    )
+    knowledge_base_id = str(knowledge_base.id)
+
+    start = time.perf_counter()
+    statuses = await add_records_to_knowledge_base(
+        knowledge_base_id, record_ids, concurrency=args.ingest_concurrency
+    )
+    elapsed = time.perf_counter() - start
+
+    collections = await CollectionRecord.find(
+        CollectionRecord.knowledge_base_id == knowledge_base_id
+    ).to_list()
+    num_chunks = sum(c.num_chunks or 0 for c in collections)
+    return knowledge_base_id, {
+        "documents": len(record_ids),
+        "chunks": num_chunks,
+        "failed": sum(1 for s in statuses.values() if s == "failed"),
+        "seconds": elapsed,
+        "documents_per_s": len(record_ids) / elapsed,
+        "chunks_per_s": num_chunks / elapsed,
+    }
+
+
+async def bench_retrieve(knowledge_base_id: str, queries: list[str], args) -> dict:
+    from src.rag.retrieve_pipeline.retrieve import retrieve_knowledge_base
+
+    for query in queries[: args.warmup]:
+        await retrieve_knowledge_base(knowledge_base_id, query, top_k=args.top_k)
+
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        await retrieve_knowledge_base(knowledge_base_id, query, top_k=args.top_k)
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies)
+
+
+async def bench_pipeline(knowledge_base_id: str, queries: list[str]) -> dict:
+    from src.rag import EnhancedPipeline
+    from src.tracing import collect_timings
+
+    pipeline = EnhancedPipeline()
+    stages: dict[str, list[float]] = {}
+    totals = []
+    for query in queries:
+        start = time.perf_counter()
+        # 各阶段与其中的 llm_call / 检索器 / embedding span
+        with collect_timings() as timings:
+            await pipeline.retrieve_knowledge_base(query, knowledge_base_id)
+        totals.append(time.perf_counter() - start)
+        for stage, seconds in timings.items():
+            stages.setdefault(stage, []).append(seconds)
+
+    report = {stage: summarize(values) for stage, values in stages.items()}
+    report["total"] = summarize(totals)
+    return report
+
+
+async def bench_chat_stream(knowledge_base_id: str, queries: list[str], args) -> dict:
+    import httpx
+    import uvicorn
+
+    from src.api.main import app
+
+    # 数据库已在 init_database 中初始化，跳过应用自身的 lifespan
+    server = uvicorn.Server(
+        uvicorn.Config(
+            app, host="127.0.0.1", port=args.port, lifespan="off", log_level="warning"
+        )
+    )
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        if server_task.done():
+            server_task.result()
+        await asyncio.sleep(0.05)
+
+    base_url = f"http://127.0.0.1:{args.port}/api/v1"
+    ttft: list[float] = []
+    totals: list[float] = []
+    stages: dict[str, list[float]] = {}
+    errors = 0
+
+    async def user(client: httpx.AsyncClient, index: int):
+        nonlocal errors
+        response = await client.post(
+            "/sessions", json={"user_id": f"bench-user-{index}"}
+        )
+        response.raise_for_status()
+        session_id = response.json()["session_id"]
+
+        for turn in range(args.turns):
+            query = queries[(index * args.turns + turn) % len(queries)]
+            payload = {
+                "session_id": session_id,
+                "content": query,
+                "knowledge_base_id": knowledge_base_id,
+            }
+            start = time.perf_counter()
+            first = None
+            try:
+                async with client.stream("POST", "/chat-stream", json=payload) as r:
+                    r.raise_for_status()
+                    for stage, ms in parse_timing(r.headers.get("x-timing", "")):
+                        stages.setdefault(stage, []).append(ms / 1000)
+                    async for chunk in r.aiter_raw():
+                        if chunk and first is None:
+                            first = time.perf_counter() - start
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            if first is not None:
+                ttft.append(first)
+            totals.append(time.perf_counter() - start)
+
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=300) as client:
+            start = time.perf_counter()
+            await asyncio.gather(*(user(client, i) for i in range(args.users)))
+            elapsed = time.perf_counter() - start
+    finally:
+        server.should_exit = True
+        await server_task
+
+    return {
+        "users": args.users,
+        "turns": args.turns,
+        "errors": errors,
+        "requests_per_s": len(totals) / elapsed,
+        "ttft": summarize(ttft),
+        "total": summarize(totals),
+        # 服务端 X-Timing 响应头（首 token 之前的各阶段）
+        "server_timing": {stage: summarize(values) for stage, values in stages.items()},
+    }
+
+
+def parse_timing(header: str) -> list[tuple[str, float]]:
+    """解析 X-Timing 头：name;dur=毫秒, ..."""
+    items = []
+    for part in header.split(","):
+        name, _, duration = part.strip().partition(";dur=")
+        if name and duration:
+            items.append((name, float(duration)))
+    return items
+
+
+# 对比 ==========================================================================
+
+
+def flatten(report: dict, prefix: str = "") -> dict[str, float]:
+    """取出可对比的指标：延迟（*_ms）与吞吐（*_per_s）"""
+    metrics = {}
+    for key, value in report.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            metrics.update(flatten(value, path))
+        elif isinstance(value, (int, float)) and (
+            key.endswith("_ms") or key.endswith("_per_s")
+        ):
+            metrics[path] = float(value)
+    return metrics
+
+
+SECTIONS = ("ingest", "retrieve", "pipeline", "chat_stream")
+
+
+def compare(report: dict, baseline: dict) -> dict:
+    current = flatten({k: report[k] for k in SECTIONS if k in report})
+    previous = flatten({k: baseline[k] for k in SECTIONS if k in baseline})
+    comparison = {}
+    for path, value in current.items():
+        if path not in previous or not previous[path]:
+            continue
+        comparison[path] = {
+            "baseline": previous[path],
+            "current": value,
+            "change": value / previous[path] - 1,
+        }
+    return {"baseline_commit": baseline.get("commit"), "metrics": comparison}
+
+
+async def run(args, work_dir: str) -> dict:
+    corpus = Corpus(args.docs, args.sections, args.words, args.seed)
+    paths = corpus.write(Path(work_dir) / "markdown")
+    queries = corpus.queries(args.queries, args.seed + 1)
+
+    client, database_name = await init_database(args.mongo_uri)
+    report: dict = {"ingest": {}, "retrieve": {}}
+    knowledge_bases: dict[str, str] = {}
+    try:
+        for retriever_type in args.retrievers:
+            kb_id, ingest = await bench_ingest(corpus, paths, retriever_type, args)
+            knowledge_bases[retriever_type] = kb_id
+            report["ingest"][retriever_type] = ingest
+            report["retrieve"][retriever_type] = await bench_retrieve(
+                kb_id, queries, args
+            )
+            print(
+                f"{retriever_type:>10}: ingest {ingest['chunks_per_s']:.1f} chunks/s, "
+                f"retrieve p50 {report['retrieve'][retriever_type]['p50_ms']:.2f}ms"
+            )
+
+        pipeline_kb = knowledge_bases[args.pipeline_retriever]
+        report["pipeline"] = await bench_pipeline(
+            pipeline_kb, queries[: args.pipeline_queries]
+        )
+        print(f"  pipeline: total p50 {report['pipeline']['total']['p50_ms']:.2f}ms")
+
+        if args.users > 0:
+            report["chat_stream"] = await bench_chat_stream(pipeline_kb, queries, args)
+            print(
+                f"chat-stream: ttft p50 "
+                f"{report['chat_stream']['ttft'].get('p50_ms', float('nan')):.2f}ms "
+                f"({args.users} users)"
+            )
+    finally:
+        if args.mongo_uri:
+            await client.drop_database(database_name)
+        client.close()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    local = config.local_model_cfg
+    default_retrievers = [
+        r
+        for r in ALL_RETRIEVERS
+        if not r.startswith("ann") or importlib.util.find_spec("hnswlib")
+    ]
+    # 语料与入库
+    parser.add_argument("--docs", type=int, default=50, help="文档数量")
+    parser.add_argument("--sections", type=int, default=8, help="每个文档的段落数")
+    parser.add_argument("--words", type=int, default=120, help="每个段落的词数")
+    parser.add_argument("--chunk-size", type=int, default=config.rag_cfg["chunk_size"])
+    parser.add_argument("--dimensions", type=int, default=1024)
+    parser.add_argument("--quantization", default="none", help="ann 知识库的量化方式")
+    parser.add_argument("--ingest-concurrency", type=int, default=4)
+    parser.add_argument("--retrievers", nargs="+", default=default_retrievers)
+    # 检索与 pipeline
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--pipeline-retriever", default=None)
+    parser.add_argument("--pipeline-queries", type=int, default=20)
+    # /chat-stream 并发
+    parser.add_argument("--users", type=int, default=4, help="并发用户数，0 为跳过")
+    parser.add_argument("--turns", type=int, default=3, help="每个用户的对话轮数")
+    parser.add_argument("--port", type=int, default=18765)
+    # 本地替身模型
+    parser.add_argument(
+        "--embedding-latency-ms", type=float, default=local["embedding_latency_ms"]
+    )
+    parser.add_argument(
+        "--chat-first-token-ms", type=float, default=local["chat_first_token_ms"]
+    )
+    parser.add_argument("--chat-token-ms", type=float, default=local["chat_token_ms"])
+    parser.add_argument(
+        "--chat-output-tokens", type=int, default=local["chat_output_tokens"]
+    )
+    # 环境与输出
+    parser.add_argument("--mongo-uri", default=None, help="默认使用 mongomock-motor")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=Path("rag_pipeline.json"))
+    parser.add_argument("--baseline", type=Path, default=None, help="对比的旧报告")
+    args = parser.parse_args()
+
+    unknown = set(args.retrievers) - set(ALL_RETRIEVERS)
+    if unknown:
+        raise SystemExit(f"Unknown retriever types: {sorted(unknown)}")
+    if args.pipeline_retriever is None:
+        configured = config.rag_cfg.get("retriever_type")
+        args.pipeline_retriever = (
+            configured if configured in args.retrievers else args.retrievers[0]
+        )
+    elif args.pipeline_retriever not in args.retrievers:
+        raise SystemExit("--pipeline-retriever must be one of --retrievers")
+
+    work_dir = tempfile.mkdtemp(prefix="rag-bench-")
+    try:
+        configure(args, work_dir)
+        report = asyncio.run(run(args, work_dir))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "commit": git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {
+            k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()
+        },
+        **report,
+    }
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        report["comparison"] = compare(report, baseline)
+        for path, item in report["comparison"]["metrics"].items():
+            print(
+                f"{path}: {item['baseline']:.2f} -> {item['current']:.2f} "
+                f"({item['change']:+.1%})"
+            )
+
+    args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
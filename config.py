@@ -10,4 +10,20 @@ rag_cfg = cfg["tool"]["rag"]
 
 memory_cfg = cfg["tool"]["memory"]
 
-dialog_cfg = cfg["tool"]["dialog"]
\ No newline at end of file
+dialog_cfg = cfg["tool"]["dialog"]
+
+job_cfg = cfg["tool"]["job"]
+
+embedding_cfg = cfg["tool"]["embedding"]
+
+local_model_cfg = cfg["tool"]["local_model"]
+
+tracing_cfg = cfg["tool"]["tracing"]
+
+usage_cfg = cfg["tool"]["usage"]
+
+resilience_cfg = cfg["tool"]["resilience"]
+
+llm_router_cfg = cfg["tool"]["llm_router"]
+
+llm_limiter_cfg = cfg["tool"]["llm_limiter"]
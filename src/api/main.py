@@ -1,6 +1,6 @@
 """FastAPI 主应用入口"""
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from beanie import init_beanie
@@ -10,10 +10,15 @@ from src.session import Session, LongTermMemory
 from src.document import DocumentRecord
 import src.document.odm.DocumentRecord as dr
 from src.rag import KnowledgeBase, CollectionRecord
+from src.job import Job
+from src.usage import TokenUsage, usage_recorder
 from src.prompt import auto_register_from_directory, load_all_prompts
+from src.embedding.batcher import batch_stats
+from src import metrics
 
-from config import mongo_cfg
-from .routers import chat, document, knowledge_base
+from config import mongo_cfg, tracing_cfg
+from .middleware import TimingMiddleware
+from .routers import chat, document, knowledge_base, job, usage
 
 
 @asynccontextmanager
@@ -21,7 +26,7 @@ async def lifespan(app: FastAPI):
     """应用启动和关闭时的生命周期管理"""
     # 启动时: 初始化数据库连接
     mongo_uri = mongo_cfg.get("uri", "mongodb://localhost:27017")
-    database_name = mongo_cfg.get("database", "rag_agent")
+    database_name = mongo_cfg.get("db_name", "rag_agent")
 
     client = AsyncIOMotorClient(mongo_uri)
     db = client[database_name]
@@ -35,6 +40,8 @@ async def lifespan(app: FastAPI):
             DocumentRecord,
             CollectionRecord,
             LongTermMemory,
+            Job,
+            TokenUsage,
         ],
     )
 
@@ -51,9 +58,13 @@ async def lifespan(app: FastAPI):
         str(record.id): record.title for record in records if record.title
     }
 
+    # token 用量批量写入
+    usage_recorder.start()
+
     yield
 
     # 关闭时: 清理资源
+    await usage_recorder.stop()
     client.close()
     print("✅ Closed MongoDB connection")
 
@@ -73,12 +84,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Timing"],
 )
 
+# 请求级 span 与 X-Timing 响应头
+if tracing_cfg.get("enabled") or tracing_cfg.get("timing_header", True):
+    app.add_middleware(TimingMiddleware, header=tracing_cfg.get("timing_header", True))
+
 # 注册路由
 app.include_router(chat.router, prefix="/api/v1", tags=["Chat"])
 app.include_router(knowledge_base.router, prefix="/api/v1", tags=["Knowledge Base"])
 app.include_router(document.router, prefix="/api/v1", tags=["Document Management"])
+app.include_router(job.router, prefix="/api/v1", tags=["Jobs"])
+app.include_router(usage.router, prefix="/api/v1", tags=["Usage"])
 
 
 @app.get("/")
@@ -97,6 +115,19 @@ async def health_check():
     return {"status": "ok"}
 
 
+@app.get("/stats/embedding")
+async def embedding_stats():
+    """embedding 请求合并的批大小统计"""
+    return batch_stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus 指标"""
+    body, content_type = metrics.export()
+    return Response(content=body, media_type=content_type)
+
+
 @app.on_event("startup")
 async def preload_mapping():
     global id_title_mapping
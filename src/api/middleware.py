@@ -0,0 +1,45 @@
+"""ASGI 中间件"""
+
+import time
+
+from src.tracing import collect_timings, format_timings, span
+
+
+class TimingMiddleware:
+    """为每个 HTTP 请求创建根 span，并在响应头 X-Timing 中汇总各阶段耗时
+
+    X-Timing 在响应开始时写入，只包含此前已结束的 span；流式响应中首个 chunk
+    之后的阶段（生成剩余 token、保存消息等）只出现在导出的 trace 中。
+    格式为 name;dur=毫秒，以逗号分隔，同名 span 的耗时累加（并发的同名调用会超过墙钟时间）。
+    """
+
+    def __init__(self, app, header: bool = True):
+        self.app = app
+        self.header = header
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        with collect_timings() as timings, span(
+            f"HTTP {scope['method']}",
+            **{"http.method": scope["method"], "http.target": scope["path"]},
+        ) as request_span:
+
+            async def send_with_timing(message):
+                if message["type"] == "http.response.start":
+                    request_span.set_attribute(
+                        "http.status_code", message.get("status", 0)
+                    )
+                    if self.header:
+                        summary = {"total": time.perf_counter() - start, **timings}
+                        headers = list(message.get("headers", []))
+                        headers.append(
+                            (b"x-timing", format_timings(summary).encode("latin-1"))
+                        )
+                        message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_with_timing)
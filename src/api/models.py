@@ -64,6 +64,7 @@ class FileRecordResponse(BaseModel):
     source: str
     metadata: Optional[Dict[str, Any]] = None
     created_at: Optional[datetime] = None
+    job_id: Optional[str] = Field(default=None, description="解析任务ID")
 
 
 class DocumentUploadResponse(BaseModel):
@@ -92,7 +93,92 @@ class DocumentListResponse(BaseModel):
     documents: List[FileRecordResponse]
 
 
+# ===== 后台任务相关模型 =====
+class JobResponse(BaseModel):
+    """后台任务状态响应"""
+
+    id: str
+    job_type: str
+    status: str
+    progress: float = Field(default=0.0, description="进度 0~1")
+    stage: str = Field(default="", description="当前阶段")
+    attempts: int = 0
+    max_attempts: int = 0
+    payload: Dict[str, Any] = Field(default_factory=dict)
+    items: Dict[str, Dict[str, Any]] = Field(
+        default_factory=dict, description="批量任务的逐项状态"
+    )
+    result: Dict[str, Any] = Field(default_factory=dict)
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class JobListResponse(BaseModel):
+    """后台任务列表响应"""
+
+    total: int
+    jobs: List[JobResponse]
+
+
+# ===== 用量相关模型 =====
+class UsageItem(BaseModel):
+    """按分组维度汇总的 token 用量"""
+
+    day: Optional[str] = None
+    user_id: Optional[str] = None
+    session_id: Optional[str] = None
+    knowledge_base_id: Optional[str] = None
+    prompt: Optional[str] = None
+    llm_provider: Optional[str] = None
+    model: Optional[str] = None
+    input_tokens: int = 0
+    output_tokens: int = 0
+    calls: int = 0
+    cost: float = Field(default=0.0, description="按 [tool.usage.prices] 计算的费用")
+
+
+class UsageResponse(BaseModel):
+    """用量查询响应"""
+
+    items: List[UsageItem]
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost: float = 0.0
+
+
+class BudgetResponse(BaseModel):
+    """当天预算检查结果"""
+
+    action: str = Field(..., description="allow, downgrade 或 reject")
+    reason: str = ""
+    user_spent: Optional[float] = None
+    user_budget: Optional[float] = Field(default=None, description="0 为不限制")
+    knowledge_base_spent: Optional[float] = None
+    knowledge_base_budget: Optional[float] = Field(
+        default=None, description="0 为不限制"
+    )
+
+
 # ===== 知识库相关模型 =====
+class DuplicateFile(BaseModel):
+    """批量上传中与已有文件重复的文件"""
+
+    filename: str
+    id: str = Field(..., description="已存在的文件记录ID")
+
+
+class BatchUploadResponse(BaseModel):
+    """批量上传响应"""
+
+    documents: List[FileRecordResponse] = Field(default_factory=list)
+    duplicates: List[DuplicateFile] = Field(
+        default_factory=list, description="按上传顺序排列的重复文件"
+    )
+    job_id: Optional[str] = Field(default=None, description="批量入库任务ID")
+
+
 class KnowledgeBaseCreateRequest(BaseModel):
     """创建知识库请求"""
 
@@ -101,7 +187,17 @@ class KnowledgeBaseCreateRequest(BaseModel):
     chunk_size: int = Field(default=500, description="文本块大小")
     chunk_overlap: int = Field(default=50, description="文本块重叠大小")
     split_method: str = Field(default="recursive", description="文本拆分方法")
-    retriever_type: str = Field(default="hybrid", description="检索器类型")
+    retriever_type: str = Field(
+        default="hybrid",
+        description="检索器类型: vector, sparse, hybrid, ann, ann_hybrid",
+    )
+    dimensions: int = Field(
+        default=1024, description="向量维度: 2048, 1536, 1024, 768, 512, 256, 128, 64"
+    )
+    quantization: str = Field(
+        default="none",
+        description="本地向量量化方式: none, int8, pq（仅 ann / ann_hybrid 生效）",
+    )
     record_ids: List[str] = Field(default_factory=list, description="文件记录ID列表")
 
 
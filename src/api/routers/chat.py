@@ -1,5 +1,7 @@
 """聊天相关的 API 路由"""
 
+from typing import AsyncIterator
+
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
 from fastapi.responses import StreamingResponse
 
@@ -12,7 +14,10 @@ from src.api.models import (
     MessageResponse,
     SuccessResponse,
 )
+from src.llm import LLMOverloadedError
 from src.session import SessionService
+from src.metrics import ACTIVE_STREAMS
+from src.resilience import CircuitOpenError
 
 from src.api.dependencies import get_session_service
 
@@ -20,6 +25,17 @@ from src.api.dependencies import get_session_service
 router = APIRouter()
 
 
+async def prepend_chunk(
+    first_chunk: str | None, stream: AsyncIterator[str]
+) -> AsyncIterator[str]:
+    if first_chunk is None:
+        return
+    with ACTIVE_STREAMS.track_inprogress():
+        yield first_chunk
+        async for chunk in stream:
+            yield chunk
+
+
 @router.post("/sessions", response_model=SessionResponse, status_code=201)
 async def create_session(
     request: SessionCreateRequest,
@@ -80,13 +96,15 @@ async def delete_session(
 
 @router.post("/sessions/{session_id}/exit", response_model=SuccessResponse)
 async def exit_session(
-    background_task: BackgroundTasks,
     session_id: str,
     session_service: SessionService = Depends(get_session_service),
 ):
-    """退出会话：如果会话没有任何对话消息，则删除之，否则保留并返回信息。"""
+    """退出会话：如果会话没有任何对话消息，则删除之，否则保留并返回信息。
+
+    记忆更新与标题生成写入后台任务队列，由 memory 队列的 worker 执行。
+    """
     try:
-        background_task.add_task(session_service.exit_session, session_id)
+        await session_service.exit_session(session_id)
         return SuccessResponse(message="Session exit processing started.")
 
     except HTTPException:
@@ -130,11 +148,23 @@ async def send_message_stream(
             metadata=request.metadata,
             kb_id=request.knowledge_base_id,
         )
+        # 先取到首个 chunk 再开始响应：X-Timing 包含首 token 之前的全部阶段，
+        # 上游在首 token 前失败时也能返回 500
+        first_chunk = await anext(token_stream, None)
 
-        return StreamingResponse(token_stream, media_type="text/plain")
+        return StreamingResponse(
+            prepend_chunk(first_chunk, token_stream), media_type="text/plain"
+        )
 
     except HTTPException:
         raise
+    except (CircuitOpenError, LLMOverloadedError) as e:
+        # 上游熔断中或排队已满，快速失败
+        raise HTTPException(
+            status_code=503,
+            detail=f"LLM provider unavailable: {str(e)}",
+            headers={"Retry-After": str(int(e.retry_after) + 1)},
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Failed to process message: {str(e)}"
@@ -1,13 +1,18 @@
 """文档管理相关的 API 路由"""
 
-from fastapi import APIRouter, BackgroundTasks, HTTPException, UploadFile, File
+from typing import List
+
+from fastapi import APIRouter, HTTPException, UploadFile, File
 
 from src.api.models import (
+    BatchUploadResponse,
     DocumentListResponse,
+    DuplicateFile,
     FileRecordResponse,
     SuccessResponse,
 )
 from src.document import document_service as doc_service
+from src.job import JobType, job_service
 
 
 router = APIRouter()
@@ -37,12 +42,14 @@ async def list_document_records():
 
 
 @router.post("/document/upload", response_model=FileRecordResponse, status_code=201)
-async def upload_file(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
-    """上传文件并添加到知识库"""
+async def upload_file(file: UploadFile = File(...)):
+    """上传文件，并提交解析任务（由独立 worker 进程执行）"""
     try:
         document_record = await doc_service.upload_file(file=file)
-        # 不需要多线程，内部 CPU 密集型操作已使用 asyncio.run 处理
-        background_tasks.add_task(doc_service.parse_file, str(document_record.id))
+        job = await job_service.enqueue_job(
+            JobType.parse_document.value,
+            {"document_record_id": str(document_record.id)},
+        )
 
         return FileRecordResponse(
             id=str(document_record.id),
@@ -53,11 +60,51 @@ async def upload_file(background_tasks: BackgroundTasks, file: UploadFile = File
                 else None
             ),
             metadata=document_record.metadata,
+            job_id=str(job.id),
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to upload file: {str(e)}")
 
 
+@router.post(
+    "/document/upload/batch", response_model=BatchUploadResponse, status_code=201
+)
+async def upload_files(files: List[UploadFile] = File(...)):
+    """批量上传文件，按哈希去重，并为每个新文件提交解析任务"""
+    try:
+        document_records, duplicates = await doc_service.upload_files(files)
+
+        documents = []
+        for document_record in document_records:
+            job = await job_service.enqueue_job(
+                JobType.parse_document.value,
+                {"document_record_id": str(document_record.id)},
+            )
+            documents.append(
+                FileRecordResponse(
+                    id=str(document_record.id),
+                    source=document_record.source,
+                    created_at=document_record.created_at,
+                    metadata=document_record.metadata,
+                    job_id=str(job.id),
+                )
+            )
+
+        return BatchUploadResponse(
+            documents=documents,
+            duplicates=[
+                DuplicateFile(filename=filename, id=record_id)
+                for filename, record_id in duplicates
+            ],
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to upload files: {str(e)}")
+
+
 # TODO 清理本地文件（markdown，chroma...）
 @router.delete("/document/{record_id}", response_model=SuccessResponse)
 async def delete_document_record(record_id: str):
@@ -0,0 +1,61 @@
+"""后台任务相关的 API 路由"""
+
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException
+
+from src.api.models import JobListResponse, JobResponse
+from src.job import Job, JobStatus, job_service
+
+
+router = APIRouter()
+
+
+def to_job_response(job: Job) -> JobResponse:
+    return JobResponse(
+        id=str(job.id),
+        job_type=job.job_type,
+        status=job.status.value,
+        progress=job.progress,
+        stage=job.stage,
+        attempts=job.attempts,
+        max_attempts=job.max_attempts,
+        payload=job.payload,
+        items=job.items,
+        result=job.result,
+        error=job.error,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+    )
+
+
+@router.get("/jobs", response_model=JobListResponse)
+async def list_jobs(
+    status: Optional[JobStatus] = None,
+    job_type: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 50,
+):
+    """列出后台任务"""
+    try:
+        jobs = await job_service.list_jobs(status, job_type, skip, limit)
+        return JobListResponse(
+            total=len(jobs), jobs=[to_job_response(job) for job in jobs]
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to list jobs: {str(e)}")
+
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """获取后台任务状态与进度"""
+    try:
+        job = await job_service.get_job(job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return to_job_response(job)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get job: {str(e)}")
@@ -1,6 +1,6 @@
 """知识库相关的 API 路由"""
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, UploadFile, File
 
 from typing import List
 
@@ -9,14 +9,20 @@ from src.api.models import (
     KnowledgeBaseResponse,
     KnowledgeBaseListResponse,
     FileRecordResponse,
+    BatchUploadResponse,
+    DuplicateFile,
+    JobResponse,
     SuccessResponse,
 )
+from src.api.routers.job import to_job_response
 from src.rag import (
     CollectionRecord,
     KnowledgeBase,
     knowledge_base_service as kb_service,
 )
 from src.document import DocumentRecord, id_to_title
+from src.document import document_service as doc_service
+from src.job import JobType, job_service
 
 
 router = APIRouter()
@@ -33,6 +39,8 @@ async def create_knowledge_base(request: KnowledgeBaseCreateRequest):
             chunk_overlap=request.chunk_overlap,
             split_method=request.split_method,
             retriever_type=request.retriever_type,
+            dimensions=request.dimensions,
+            quantization=request.quantization,
             document_record_ids=request.record_ids,
         )
 
@@ -181,23 +189,86 @@ async def add_file_to_knowledge_base(kb_id: str, file_id: str):
         raise HTTPException(status_code=500, detail=f"Failed to add file: {str(e)}")
 
 
-# TODO 更新
-@router.post("/knowledge-bases/{kb_id}/files", response_model=SuccessResponse)
-async def add_multiple_files_to_knowledge_base(
-    kb_id: str, file_ids: List[str]
-) -> SuccessResponse:
-    """将多个文件添加到知识库"""
+@router.post(
+    "/knowledge-bases/{kb_id}/files", response_model=JobResponse, status_code=202
+)
+async def add_multiple_files_to_knowledge_base(kb_id: str, file_ids: List[str]):
+    """将多个文件添加到知识库：提交批量入库任务，通过 /jobs/{job_id} 查询逐个文件的进度"""
     try:
-        for file_id in file_ids:
-            await kb_service.add_record_to_knowledge_base(
-                knowledge_base_id=kb_id,
-                document_record_id=file_id,
-            )
-        return SuccessResponse(message="Files added to knowledge base successfully")
+        kb = await KnowledgeBase.get(kb_id)
+        if not kb:
+            raise HTTPException(status_code=404, detail="Knowledge base not found")
+
+        job = await job_service.enqueue_job(
+            JobType.ingest_documents.value,
+            {
+                "knowledge_base_id": kb_id,
+                "document_record_ids": list(dict.fromkeys(file_ids)),
+            },
+        )
+        return to_job_response(job)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to add files: {str(e)}")
 
 
+@router.post(
+    "/knowledge-bases/{kb_id}/upload",
+    response_model=BatchUploadResponse,
+    status_code=202,
+)
+async def upload_files_to_knowledge_base(
+    kb_id: str, files: List[UploadFile] = File(...)
+):
+    """批量上传文件并加入知识库：按哈希去重后提交一个解析+入库任务"""
+    try:
+        kb = await KnowledgeBase.get(kb_id)
+        if not kb:
+            raise HTTPException(status_code=404, detail="Knowledge base not found")
+
+        document_records, duplicates = await doc_service.upload_files(files)
+
+        # 已存在的文件同样加入知识库（已在库中的会被跳过）
+        document_record_ids = list(
+            dict.fromkeys(
+                [str(record.id) for record in document_records]
+                + [record_id for _, record_id in duplicates]
+            )
+        )
+        job = None
+        if document_record_ids:
+            job = await job_service.enqueue_job(
+                JobType.ingest_documents.value,
+                {
+                    "knowledge_base_id": kb_id,
+                    "document_record_ids": document_record_ids,
+                },
+            )
+
+        return BatchUploadResponse(
+            documents=[
+                FileRecordResponse(
+                    id=str(record.id),
+                    source=record.source,
+                    created_at=record.created_at,
+                    metadata=record.metadata,
+                    job_id=str(job.id) if job else None,
+                )
+                for record in document_records
+            ],
+            duplicates=[
+                DuplicateFile(filename=filename, id=record_id)
+                for filename, record_id in duplicates
+            ],
+            job_id=str(job.id) if job else None,
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to upload files: {str(e)}")
+
+
 @router.delete(
     "/knowledge-bases/{kb_id}/files/{file_id}", response_model=SuccessResponse
 )
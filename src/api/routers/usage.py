@@ -0,0 +1,70 @@
+"""token 用量与预算相关的 API 路由"""
+
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from src.api.models import BudgetResponse, UsageItem, UsageResponse
+from src.usage import USAGE_KEYS, check_budget, usage_recorder, usage_service
+
+
+router = APIRouter()
+
+
+@router.get("/usage", response_model=UsageResponse)
+async def get_usage(
+    user_id: Optional[str] = None,
+    session_id: Optional[str] = None,
+    knowledge_base_id: Optional[str] = None,
+    start_day: Optional[str] = Query(default=None, description="YYYY-MM-DD（UTC）"),
+    end_day: Optional[str] = Query(default=None, description="YYYY-MM-DD（UTC）"),
+    group_by: list[str] = Query(default=["prompt", "llm_provider", "model"]),
+):
+    """按用户 / 会话 / 知识库 / 日期筛选，按 group_by 维度汇总 token 用量与费用"""
+    unknown = set(group_by) - set(USAGE_KEYS)
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown group_by field(s): {sorted(unknown)}"
+        )
+    try:
+        rows = await usage_service.get_usage(
+            user_id=user_id,
+            session_id=session_id,
+            knowledge_base_id=knowledge_base_id,
+            start_day=start_day,
+            end_day=end_day,
+            group_by=tuple(group_by),
+        )
+        return UsageResponse(
+            items=[UsageItem(**row) for row in rows],
+            input_tokens=sum(row["input_tokens"] for row in rows),
+            output_tokens=sum(row["output_tokens"] for row in rows),
+            cost=sum(row["cost"] for row in rows),
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get usage: {str(e)}")
+
+
+@router.get("/usage/budget", response_model=BudgetResponse)
+async def get_budget(
+    user_id: Optional[str] = None, knowledge_base_id: Optional[str] = None
+):
+    """查看用户 / 知识库当天的费用、预算与当前的处理方式"""
+    try:
+        decision = await check_budget(
+            user_id=user_id, knowledge_base_id=knowledge_base_id
+        )
+        response = BudgetResponse(action=decision.action, reason=decision.reason)
+        if user_id:
+            response.user_spent = await usage_recorder.spend("user_id", user_id)
+            response.user_budget = usage_service.get_budget("user_id", user_id)
+        if knowledge_base_id:
+            response.knowledge_base_spent = await usage_recorder.spend(
+                "knowledge_base_id", knowledge_base_id
+            )
+            response.knowledge_base_budget = usage_service.get_budget(
+                "knowledge_base_id", knowledge_base_id
+            )
+        return response
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get budget: {str(e)}")
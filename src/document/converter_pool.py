@@ -0,0 +1,92 @@
+import logging
+from threading import Lock
+
+from docling.datamodel.accelerator_options import AcceleratorDevice, AcceleratorOptions
+from docling.document_converter import DocumentConverter, PdfFormatOption
+from docling.datamodel.pipeline_options import PdfPipelineOptions
+from docling.datamodel.base_models import InputFormat
+
+from config import rag_cfg
+
+
+logger = logging.getLogger(__name__)
+
+# 影响 PdfPipelineOptions 的配置项，只有这些参与缓存 key
+PIPELINE_OPTION_KEYS = (
+    "do_picture_description",
+    "do_ocr",
+    "do_table_structure",
+    "do_cell_matching",
+    "accelerator_options",
+)
+
+# 进程内缓存：pipeline options -> 已加载模型的 DocumentConverter
+_converters: dict[tuple, DocumentConverter] = {}
+_converters_lock: Lock = Lock()
+
+
+def build_pipeline_options(**kwargs) -> PdfPipelineOptions:
+    """根据 [tool.rag.docling] 配置构建 PdfPipelineOptions"""
+    pipeline_options = PdfPipelineOptions()
+    pipeline_options.do_picture_description = kwargs.get(
+        "do_picture_description", False
+    )
+    pipeline_options.do_ocr = kwargs.get("do_ocr", False)
+    pipeline_options.do_table_structure = kwargs.get("do_table_structure", True)
+    pipeline_options.table_structure_options.do_cell_matching = kwargs.get(  # type: ignore
+        "do_cell_matching", True
+    )
+    pipeline_options.do_formula_enrichment = True
+    pipeline_options.accelerator_options = kwargs.get(
+        "accelerator_options",
+        AcceleratorOptions(num_threads=8, device=AcceleratorDevice.AUTO),
+    )
+    return pipeline_options
+
+
+def _options_key(**kwargs) -> tuple:
+    return tuple((k, repr(kwargs.get(k))) for k in PIPELINE_OPTION_KEYS)
+
+
+def get_converter(**kwargs) -> DocumentConverter:
+    """获取（或创建）与 pipeline options 对应的 DocumentConverter。
+
+    DocumentConverter 会在首次转换时加载 layout / table-structure 模型，
+    复用同一实例可避免每个文档都重新加载模型。
+    """
+    key = _options_key(**kwargs)
+    converter = _converters.get(key)
+    if converter is not None:
+        return converter
+
+    with _converters_lock:
+        if key not in _converters:
+            _converters[key] = DocumentConverter(
+                format_options={
+                    InputFormat.PDF: PdfFormatOption(
+                        pipeline_options=build_pipeline_options(**kwargs)
+                    )
+                }
+            )
+        return _converters[key]
+
+
+def warm_up(**kwargs) -> DocumentConverter:
+    """预加载 PDF pipeline 的模型"""
+    converter = get_converter(**kwargs)
+    converter.initialize_pipeline(InputFormat.PDF)
+    return converter
+
+
+def init_converter_process():
+    """进程池 initializer：每个 worker 进程启动时按配置预热 converter"""
+    docling_cfg = rag_cfg.get("docling", {})
+    if docling_cfg.get("prewarm", False):
+        warm_up(**docling_cfg)
+        logger.info("Docling converter pre-warmed")
+
+
+def clear_converters():
+    """清空缓存（主要用于测试与基准）"""
+    with _converters_lock:
+        _converters.clear()
@@ -1,9 +1,14 @@
+import asyncio
 import hashlib
 import os
 import uuid
+from concurrent.futures import Executor
+from typing import Awaitable, Callable
 from fastapi import File, HTTPException, UploadFile
 from pathlib import Path
 
+from beanie.operators import In
+
 from src.rag import CollectionRecord
 
 from .odm.DocumentRecord import DocumentRecord
@@ -11,6 +16,9 @@ from .parse import parse
 from config import rag_cfg
 
 
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 流式上传每次读取 1MB
+
+
 async def list_document_records() -> list[DocumentRecord]:
     """列出所有文件记录。
 
@@ -38,8 +46,41 @@ async def delete_document_record(document_record_id: str):
     await document_record.delete()
 
 
+async def stream_to_temp_file(
+    file: UploadFile, tmp_path: Path, max_size: int
+) -> tuple[str, int]:
+    """分块读取上传文件并写入临时文件，增量计算 MD5。
+
+    超过 max_size 时立即中止并删除临时文件，不会把整个文件读入内存。
+
+    Returns:
+        tuple[str, int]: (MD5 哈希, 文件大小)
+    """
+    md5 = hashlib.md5()
+    size = 0
+    try:
+        with open(tmp_path, "wb") as f:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_size:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File exceeds {max_size // (1024 * 1024)}MB limit",
+                    )
+                md5.update(chunk)
+                await asyncio.to_thread(f.write, chunk)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    return md5.hexdigest(), size
+
+
 async def upload_file(file: UploadFile = File(...)) -> DocumentRecord:
-    """上传文件（≤10MB）"""
+    """上传文件（≤ max_file_size_mb）
+
+    流式写入同目录下的临时文件，校验通过后原子重命名为正式文件。
+    """
 
     filename = file.filename or "unknown_file"
     file_id = uuid.uuid4().hex
@@ -48,24 +89,31 @@ async def upload_file(file: UploadFile = File(...)) -> DocumentRecord:
 
     save_path = Path(rag_cfg["file_storage_dir"]) / new_filename
     save_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = save_path.with_name(f".{new_filename}.part")
 
-    # 读取全部内容
-    content = await file.read()
+    max_size = rag_cfg.get("max_file_size_mb", 10) * 1024 * 1024
 
-    # 文件大小限制
-    if len(content) > rag_cfg.get("max_file_size_mb", 10) * 1024 * 1024:
-        raise HTTPException(status_code=400, detail="File exceeds 10MB limit")
+    # 客户端声明了大小时，提前拒绝
+    if file.size is not None and file.size > max_size:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File exceeds {max_size // (1024 * 1024)}MB limit",
+        )
 
-    # 计算 MD5
-    file_hash = hashlib.md5(content).hexdigest()
-    document_record = await DocumentRecord.find_one(
-        DocumentRecord.file_hash == file_hash
-    )
-    if document_record:
-        raise Exception("File already exists")
+    # 流式写入临时文件，同时计算 MD5
+    file_hash, _ = await stream_to_temp_file(file, tmp_path, max_size)
+
+    try:
+        document_record = await DocumentRecord.find_one(
+            DocumentRecord.file_hash == file_hash
+        )
+        if document_record:
+            raise Exception("File already exists")
 
-    # 保存文件
-    save_path.write_bytes(content)
+        # 原子重命名
+        os.replace(tmp_path, save_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
 
     # 创建记录
     document_record = DocumentRecord(
@@ -73,13 +121,110 @@ async def upload_file(file: UploadFile = File(...)) -> DocumentRecord:
         storage_path=str(save_path),
         file_hash=file_hash,
     )
-    await document_record.insert()
+    try:
+        await document_record.insert()
+    except Exception:
+        save_path.unlink(missing_ok=True)
+        raise
 
     return document_record
 
 
-async def parse_file(document_record_id: str):
-    """解析上传的文件，转换为Markdown格式"""
+async def upload_files(
+    files: list[UploadFile],
+) -> tuple[list[DocumentRecord], list[tuple[str, str]]]:
+    """批量上传文件。
+
+    每个文件流式写入临时文件并计算 MD5，之后用一次查询按哈希去重
+    （批次内重复的文件也只保留第一个），再重命名并批量创建记录。
+
+    Returns:
+        tuple[list[DocumentRecord], list[tuple[str, str]]]:
+            (新建的文件记录, 按上传顺序排列的重复文件 (文件名, 已存在的文件记录ID))
+    """
+    storage_dir = Path(rag_cfg["file_storage_dir"])
+    storage_dir.mkdir(parents=True, exist_ok=True)
+    max_size = rag_cfg.get("max_file_size_mb", 10) * 1024 * 1024
+
+    # (原始文件名, 正式路径, 临时路径, MD5)
+    staged: list[tuple[str, Path, Path, str]] = []
+    try:
+        for file in files:
+            filename = file.filename or "unknown_file"
+            if file.size is not None and file.size > max_size:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"{filename} exceeds {max_size // (1024 * 1024)}MB limit",
+                )
+            new_filename = f"{uuid.uuid4().hex}{Path(filename).suffix}"
+            save_path = storage_dir / new_filename
+            tmp_path = save_path.with_name(f".{new_filename}.part")
+            file_hash, _ = await stream_to_temp_file(file, tmp_path, max_size)
+            staged.append((filename, save_path, tmp_path, file_hash))
+
+        # 一次查询去重
+        existing = await DocumentRecord.find(
+            In(DocumentRecord.file_hash, [item[3] for item in staged])
+        ).to_list()
+        known_hashes = {record.file_hash: str(record.id) for record in existing}
+
+        # 重复文件按上传位置记录，同名文件互不覆盖：
+        # (上传位置, 文件名, 已存在的记录ID 或 None, 批次内首个同哈希文件在新建记录中的下标)
+        duplicated: list[tuple[int, str, str | None, int]] = []
+        batch_hashes: dict[str, int] = {}
+        document_records: list[DocumentRecord] = []
+        for index, (filename, save_path, tmp_path, file_hash) in enumerate(staged):
+            if file_hash in known_hashes:
+                duplicated.append((index, filename, known_hashes[file_hash], -1))
+                continue
+            if file_hash in batch_hashes:
+                duplicated.append((index, filename, None, batch_hashes[file_hash]))
+                continue
+            os.replace(tmp_path, save_path)
+            document_record = DocumentRecord(
+                source=filename,
+                storage_path=str(save_path),
+                file_hash=file_hash,
+            )
+            batch_hashes[file_hash] = len(document_records)
+            document_records.append(document_record)
+    finally:
+        for _, _, tmp_path, _ in staged:
+            tmp_path.unlink(missing_ok=True)
+
+    if document_records:
+        try:
+            result = await DocumentRecord.insert_many(document_records)
+        except Exception:
+            for document_record in document_records:
+                Path(document_record.storage_path).unlink(missing_ok=True)
+            raise
+        # insert_many 不会回填 id，按插入顺序取回
+        for document_record, inserted_id in zip(
+            document_records, result.inserted_ids
+        ):
+            document_record.id = inserted_id
+
+    # 批次内重复项指向同批新建的记录
+    duplicates = [
+        (filename, record_id or str(document_records[first].id))
+        for _, filename, record_id, first in duplicated
+    ]
+    return document_records, duplicates
+
+
+async def parse_file(
+    document_record_id: str,
+    executor: Executor | None = None,
+    report_progress: Callable[[float, str], Awaitable[None]] | None = None,
+):
+    """解析上传的文件，转换为Markdown格式
+
+    Args:
+        document_record_id (str): 文件记录ID。
+        executor (Executor, optional): 执行 Docling 转换的执行器（worker 进程池）。
+        report_progress (Callable, optional): 进度回调 (progress, stage)。
+    """
     document_record = await DocumentRecord.get(document_record_id)
     if not document_record:
         raise ValueError("File record not found")
@@ -91,7 +236,15 @@ async def parse_file(document_record_id: str):
         markdown_filename = Path(document_record.storage_path).with_suffix(".md").name
         output_path = output_dir / markdown_filename
 
-        parse_result = await parse(document_record.storage_path, str(output_path))
+        if report_progress:
+            await report_progress(0.1, "parsing")
+
+        parse_result = await parse(
+            document_record.storage_path, str(output_path), executor=executor
+        )
+
+        if report_progress:
+            await report_progress(0.9, "saving")
 
         document_record.markdown_path = str(output_path)
         document_record.title = parse_result.title
@@ -1,18 +1,18 @@
 import asyncio
+from concurrent.futures import Executor
+from functools import partial
 import hashlib
 from io import BytesIO
 import logging
 from pathlib import Path
 import re
 
-from docling.datamodel.accelerator_options import AcceleratorDevice, AcceleratorOptions
-from docling.document_converter import DocumentConverter, PdfFormatOption
-from docling.datamodel.pipeline_options import PdfPipelineOptions
-from docling.datamodel.base_models import InputFormat
 from docling_core.types.io import DocumentStream
+import pypdfium2 as pdfium
 
 from src.llm import get_llm
 from src.prompt import llm_call
+from .converter_pool import get_converter
 
 from config import rag_cfg
 
@@ -24,27 +24,11 @@ logger = logging.getLogger(__name__)
 def docling_to_markdown(
     document_stream: DocumentStream, output_path: str | Path, **kwargs
 ) -> str:
-    """使用 Docling 将文件转换为 Markdown 格式并保存到指定路径。"""
-    pipeline_options = PdfPipelineOptions()
-    pipeline_options.do_picture_description = kwargs.get(
-        "do_picture_description", False
-    )
-    pipeline_options.do_ocr = kwargs.get("do_ocr", False)
-    pipeline_options.do_table_structure = kwargs.get("do_table_structure", True)
-    pipeline_options.table_structure_options.do_cell_matching = kwargs.get(  # type: ignore
-        "do_cell_matching", True
-    )
-    pipeline_options.do_formula_enrichment = True
-    pipeline_options.accelerator_options = kwargs.get(
-        "accelerator_options",
-        AcceleratorOptions(num_threads=8, device=AcceleratorDevice.AUTO),
-    )
+    """使用 Docling 将文件转换为 Markdown 格式并保存到指定路径。
 
-    converter = DocumentConverter(
-        format_options={
-            InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)
-        }
-    )
+    converter 按 pipeline options 在进程内复用，模型只在首次使用时加载。
+    """
+    converter = get_converter(**kwargs)
 
     conversion_result = converter.convert(document_stream)
     markdown_content = remove_line_numbers(
@@ -57,6 +41,115 @@ def docling_to_markdown(
     return markdown_content
 
 
+def file_to_markdown(file_path: str, output_path: str | Path, **kwargs) -> str:
+    """读取文件并转换为 Markdown，参数均可序列化，可直接提交给进程池执行。"""
+    with open(file_path, "rb") as f:
+        data = f.read()
+
+    document_stream = DocumentStream(name=Path(file_path).name, stream=BytesIO(data))
+    return docling_to_markdown(document_stream, output_path, **kwargs)
+
+
+def pdf_page_count(file_path: str) -> int:
+    """读取 PDF 页数（pypdfium2 为 docling 的依赖，只解析文档结构，开销很小）"""
+    pdf = pdfium.PdfDocument(file_path)
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+
+def split_page_ranges(num_pages: int, pages_per_chunk: int) -> list[tuple[int, int]]:
+    """将 [1, num_pages] 划分为连续页段，页码从 1 开始、闭区间（与 docling page_range 一致）"""
+    pages_per_chunk = max(1, pages_per_chunk)
+    return [
+        (start, min(start + pages_per_chunk - 1, num_pages))
+        for start in range(1, num_pages + 1, pages_per_chunk)
+    ]
+
+
+def pdf_pages_to_markdown(
+    file_path: str, start_page: int, end_page: int, **kwargs
+) -> str:
+    """转换 PDF 的一个页段，可直接提交给进程池执行。"""
+    converter = get_converter(**kwargs)
+    conversion_result = converter.convert(file_path, page_range=(start_page, end_page))
+    return remove_line_numbers(conversion_result.document.export_to_markdown())
+
+
+def stitch_markdown(parts: list[str]) -> str:
+    """按页段顺序拼接 Markdown。
+
+    页段边界处若下一段以与上一段最后一个标题相同的标题开头（跨页重复的页眉/章节名），
+    去掉重复标题，使边界前后的正文仍归属同一章节。
+    """
+    heading_pattern = re.compile(r"^#{1,6}\s+.+$", re.MULTILINE)
+
+    stitched: list[str] = []
+    last_heading: str | None = None
+    for part in parts:
+        part = part.strip()
+        if not part:
+            continue
+
+        first_line, _, rest = part.partition("\n")
+        if last_heading and first_line.strip() == last_heading:
+            part = rest.lstrip("\n")
+
+        headings = heading_pattern.findall(part)
+        if headings:
+            last_heading = headings[-1].strip()
+        if part:
+            stitched.append(part)
+
+    return "\n\n".join(stitched) + "\n"
+
+
+async def convert_to_markdown(
+    file_path: str, output_path: str, executor: Executor | None = None
+) -> str:
+    """将文件转换为 Markdown 并写入 output_path。
+
+    开启 page_parallel 时，页数超过 page_parallel_min_pages 的 PDF 按 pages_per_chunk
+    拆分为页段，并行提交给 executor（worker 的进程池）转换后按顺序拼接。
+    """
+    docling_cfg = dict(rag_cfg["docling"])
+    page_parallel = docling_cfg.pop("page_parallel", False)
+    min_pages = docling_cfg.pop("page_parallel_min_pages", 100)
+    pages_per_chunk = docling_cfg.pop("pages_per_chunk", 50)
+
+    loop = asyncio.get_running_loop()
+
+    num_pages = 0
+    if page_parallel and file_path.lower().endswith(".pdf"):
+        num_pages = await loop.run_in_executor(None, pdf_page_count, file_path)
+
+    if num_pages <= max(min_pages, pages_per_chunk):
+        return await loop.run_in_executor(
+            executor, partial(file_to_markdown, file_path, output_path, **docling_cfg)
+        )
+
+    page_ranges = split_page_ranges(num_pages, pages_per_chunk)
+    logger.info(
+        f"Page-parallel conversion: {file_path}, {num_pages} pages, "
+        f"{len(page_ranges)} ranges"
+    )
+    parts = await asyncio.gather(
+        *(
+            loop.run_in_executor(
+                executor,
+                partial(pdf_pages_to_markdown, file_path, start, end, **docling_cfg),
+            )
+            for start, end in page_ranges
+        )
+    )
+
+    markdown_content = stitch_markdown(list(parts))
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(markdown_content)
+    return markdown_content
+
+
 class ParseResult:
     __slots__ = "title", "abstract", "keywords", "directory", "language"
 
@@ -75,119 +168,102 @@ class ParseResult:
         self.language = language
 
 
-async def parse(file_path: str, output_path: str) -> ParseResult:
+async def parse(
+    file_path: str, output_path: str, executor: Executor | None = None
+) -> ParseResult:
+    """解析文件：Docling 转换 Markdown，再提取标题、摘要、关键词等元信息。
+
+    Args:
+        file_path (str): 原始文件路径。
+        output_path (str): Markdown 输出路径。
+        executor (Executor, optional): 执行 Docling 转换的执行器，
+            worker 中传入进程池；为 None 时使用事件循环默认线程池。
+    """
     if not file_path.endswith((".pdf", ".docx", ".doc", ".txt", ".md")):
         logger.warning(f"文件 {file_path} 不是支持的文件格式。")
         raise ValueError("Unsupported file format")
 
-    with open(file_path, "rb") as f:
-        data = f.read()
-
     # convert to markdown
     try:
-        document_stream = DocumentStream(
-            name=Path(file_path).name, stream=BytesIO(data)
-        )
-
-        markdown_content = await asyncio.to_thread(
-            docling_to_markdown, document_stream, output_path, **rag_cfg["docling"]
-        )
+        markdown_content = await convert_to_markdown(file_path, output_path, executor)
     except Exception as e:
         logger.error(f"文件转换失败: {file_path}", exc_info=e)
         raise RuntimeError(f"Markdown 转换失败: {file_path}") from e
 
-    abstract_keywords, title, markdown_title, is_chinese = await asyncio.gather(
-        extract_abstract_keywords(markdown_content),
-        extract_title_from_markdown(markdown_content),
+    metadata, markdown_title, is_chinese = await asyncio.gather(
+        extract_metadata(markdown_content),
         extract_markdown_title(markdown_content),
         contains_chinese(markdown_content),
     )
+    metadata = metadata or {}
+
+    title = metadata.get("title")
+    if not title and markdown_title:
+        # LLM 未提取到标题时，退回第一个 Markdown 标题
+        title = markdown_title[0].lstrip("#").strip()
 
     return ParseResult(
         title=title if title else "",
-        abstract=abstract_keywords[0] if abstract_keywords else "",
-        keywords=abstract_keywords[1] if abstract_keywords else [],
+        abstract=metadata.get("abstract") or "",
+        keywords=metadata.get("keywords") or [],
         markdown_title=markdown_title if markdown_title else [],
         language="ZH" if is_chinese else "EN",
     )
 
 
-async def extract_abstract_keywords(markdown_content: str) -> tuple[str, list] | None:
-    """提取文章摘要和关键词"""
-
-    # prompt_template = get_prompt("extract_abstract")
-    # llm = get_llm(llm_provider=rag_cfg["llm_provider"], model=rag_cfg["llm_model"])
+async def extract_metadata(
+    markdown_content: str, window_size: int = 3000, max_chars: int = 9000
+) -> dict | None:
+    """提取文章标题、摘要和关键词
 
-    # 最多尝试前 3 页（0,1,2）
-    # max_pages_to_try = min(3, len(reader.pages))
-    max_tokens = min(9000, len(markdown_content))
-
-    for start in range(0, max_tokens, 3000):
-        # text = reader.pages[page_idx].extract_text()
-        text = markdown_content[start : min(start + 3000, max_tokens)]
-        # prompt = prompt_template.format(text=text)
-
-        # llm_response = await llm.async_call(prompt)
-        llm_response = await llm_call(
-            prompt_name="extract_abstract",
-            llm=get_llm(
-                llm_provider=rag_cfg["llm_provider"], model=rag_cfg["llm_model"]
-            ),
-            args={"text": text},
-        )
-        if llm_response is None:
-            raise RuntimeError("LLM 调用失败，未获取响应。")
-
-        # 尝试解析 JSON
-        # try:
-        #     parsed = json.loads(llm_response)
-        # except json.JSONDecodeError:
-        #     # 若 LLM 返回非法 JSON，直接视为失败，继续下一页
-        #     continue
-
-        # 若 LLM 指示为 false，继续下一页
-        if llm_response == "false":
-            continue
-
-        # 应包含 abstract 和 keywords
-        if "abstract" in llm_response and "keywords" in llm_response:
-            return llm_response["abstract"], llm_response["keywords"]
-
-    return None
-
-
-async def extract_title_from_markdown(markdown_content: str) -> str | None:
-    """提取文章标题"""
-
-    max_tokens = min(9000, len(markdown_content))
-
-    for start in range(0, max_tokens, 3000):
-        text = markdown_content[start : min(start + 3000, max_tokens)]
-        # prompt = prompt_template.format(text=text)
+    前 max_chars 个字符按 window_size 切分为多个窗口，所有窗口并发调用 LLM，
+    第一个包含摘要的结果胜出，其余调用被取消；
+    若所有窗口都没有摘要，返回第一个包含标题的结果。
+    """
+    max_chars = min(max_chars, len(markdown_content))
+    windows = [
+        markdown_content[start : min(start + window_size, max_chars)]
+        for start in range(0, max_chars, window_size)
+    ]
+    if not windows:
+        return None
 
-        # llm_response = await llm.async_call(prompt)
-        llm_response = await llm_call(
-            prompt_name="extract_title",
-            llm=get_llm(
-                llm_provider=rag_cfg["llm_provider"], model=rag_cfg["llm_model"]
-            ),
-            args={"text": text},
+    llm = get_llm(llm_provider=rag_cfg["llm_provider"], model=rag_cfg["llm_model"])
+    tasks = [
+        asyncio.create_task(
+            llm_call(prompt_name="extract_metadata", llm=llm, args={"text": text})
         )
-        if llm_response is None:
-            raise RuntimeError("LLM 调用失败，未获取响应。")
-
-        # try:
-        #     parsed = json.loads(llm_response)
-        # except json.JSONDecodeError:
-        #     continue
+        for text in windows
+    ]
 
-        if llm_response == "false":
-            continue
-
-        if "title" in llm_response:
-            return llm_response["title"]
-
-    return None
+    partial_result: dict | None = None
+    errors: list[Exception] = []
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                llm_response = await next_done
+            except Exception as e:
+                # 单个窗口失败不影响其他窗口
+                logger.warning(f"元信息提取失败: {e}")
+                errors.append(e)
+                continue
+
+            # 若 LLM 指示为 false，等待其他窗口
+            if not isinstance(llm_response, dict):
+                continue
+
+            if llm_response.get("abstract"):
+                return llm_response
+            if partial_result is None and llm_response.get("title"):
+                partial_result = llm_response
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    if partial_result is None and len(errors) == len(tasks):
+        raise RuntimeError("LLM 调用失败，未获取响应。") from errors[-1]
+
+    return partial_result
 
 
 async def extract_markdown_title(markdown_content: str) -> list[str] | None:
@@ -1,16 +1,19 @@
-from .BaseEmbeddingAdapter import BaseEmbeddingAdapter
+from .BaseEmbeddingAdapter import BaseEmbeddingAdapter, decode_embeddings
 
-import json
 import os
 from typing import Literal
+import numpy as np
 from openai import Omit, OpenAI, AsyncOpenAI
-from chromadb import Embeddings
+
+from src.resilience import client_options
 
 
 class BailianEmbeddingAdapter(BaseEmbeddingAdapter):
     """百炼平台 Embedding 适配器"""
 
     supports_async = True
+    # text-embedding-v4 支持的输出维度
+    supported_dimensions = (2048, 1536, 1024, 768, 512, 256, 128, 64)
 
     @property
     def name(self) -> dict:
@@ -25,10 +28,12 @@ class BailianEmbeddingAdapter(BaseEmbeddingAdapter):
         self.client = OpenAI(
             api_key=self.api_key,
             base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",
+            **client_options("embedding_timeout"),
         )
         self.async_client = AsyncOpenAI(
             api_key=self.api_key,
             base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",
+            **client_options("embedding_timeout"),
         )
         self.model = model
 
@@ -36,39 +41,29 @@ class BailianEmbeddingAdapter(BaseEmbeddingAdapter):
         self,
         input: list[str] | str,
         dimensions: int = 1024,
-        encoding_format: Omit | Literal["float", "base64"] = "float",
+        encoding_format: Omit | Literal["float", "base64"] = "base64",
         **kwargs,
-    ) -> Embeddings:
+    ) -> np.ndarray:
         completion = self.client.embeddings.create(
             model="text-embedding-v4",
             input=input,
             dimensions=dimensions,
             encoding_format=encoding_format,
         )
-        if isinstance(input, str):
-            return json.loads(completion.model_dump_json())["data"][0]["embedding"]
-        else:
-            return [
-                item["embedding"]
-                for item in json.loads(completion.model_dump_json())["data"]
-            ]
+        embeddings = decode_embeddings(completion.data)
+        return embeddings[0] if isinstance(input, str) else embeddings
 
     async def async_embedding_call(
         self,
         input: list[str] | str,
         dimensions: int = 1024,
-        encoding_format: Omit | Literal["float", "base64"] = "float",
-    ) -> Embeddings:
+        encoding_format: Omit | Literal["float", "base64"] = "base64",
+    ) -> np.ndarray:
         completion = await self.async_client.embeddings.create(
             model="text-embedding-v4",
             input=input,
             dimensions=dimensions,
             encoding_format=encoding_format,
         )
-        if isinstance(input, str):
-            return json.loads(completion.model_dump_json())["data"][0]["embedding"]
-        else:
-            return [
-                item["embedding"]
-                for item in json.loads(completion.model_dump_json())["data"]
-            ]
+        embeddings = decode_embeddings(completion.data)
+        return embeddings[0] if isinstance(input, str) else embeddings
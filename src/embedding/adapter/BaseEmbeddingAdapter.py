@@ -1,11 +1,38 @@
 from abc import ABC, abstractmethod
 from typing import Optional, Iterator, AsyncGenerator
 import asyncio
+import base64
 import json
 import os
 from typing import Literal
+import numpy as np
 from openai import Omit, OpenAI, AsyncOpenAI
-from chromadb import Embeddings
+
+from src.tracing.tracer import trace_methods
+
+
+def decode_embeddings(data: list) -> np.ndarray:
+    """将 embedding 响应的 data 解码为 [n, dim] float32 矩阵
+
+    base64 格式直接按小端 float32 解析字节（np.frombuffer），不生成 Python float 列表；
+    float 格式（列表）同样写入连续矩阵。
+    """
+    items = sorted(data, key=lambda item: item.index)
+    if not items:
+        return np.empty((0, 0), dtype=np.float32)
+
+    rows = [
+        (
+            np.frombuffer(base64.b64decode(item.embedding), dtype="<f4")
+            if isinstance(item.embedding, str)
+            else np.asarray(item.embedding, dtype=np.float32)
+        )
+        for item in items
+    ]
+    out = np.empty((len(rows), len(rows[0])), dtype=np.float32)
+    for i, row in enumerate(rows):
+        out[i] = row
+    return out
 
 
 class BaseEmbeddingAdapter(ABC):
@@ -13,6 +40,19 @@ class BaseEmbeddingAdapter(ABC):
 
     supports_async: bool = False
 
+    def __init_subclass__(cls, trace: bool = True, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if not trace:
+            # 包装其他适配器的类（如 ResilientEmbeddingAdapter）不重复生成 span
+            return
+        # 各平台实现的调用自动生成 embedding.<方法名> span
+        trace_methods(
+            cls,
+            "embedding",
+            ("embedding_call", "async_embedding_call"),
+            attributes=lambda self: self.name,
+        )
+
     @property
     @abstractmethod
     def name(self) -> dict:
@@ -23,18 +63,18 @@ class BaseEmbeddingAdapter(ABC):
         self,
         input: list[str] | str,
         dimensions: int = 1024,
-        encoding_format: Omit | Literal["float", "base64"] = "float",
+        encoding_format: Omit | Literal["float", "base64"] = "base64",
         **kwargs,
-    ) -> Embeddings:
-        """同步获取嵌入向量的生成器"""
+    ) -> np.ndarray:
+        """同步获取嵌入向量：输入为列表时返回 [n, dim] float32 矩阵，为字符串时返回 [dim]"""
 
     @abstractmethod
     async def async_embedding_call(
         self,
         input: list[str] | str,
         dimensions: int = 1024,
-        encoding_format: Omit | Literal["float", "base64"] = "float",
-    ) -> Embeddings:
+        encoding_format: Omit | Literal["float", "base64"] = "base64",
+    ) -> np.ndarray:
         """默认异步封装，不阻塞事件循环"""
         loop = asyncio.get_event_loop()
         return await loop.run_in_executor(
@@ -0,0 +1,88 @@
+from .BaseEmbeddingAdapter import BaseEmbeddingAdapter
+
+import asyncio
+import math
+import re
+import time
+import zlib
+from typing import Literal
+import numpy as np
+from openai import Omit
+
+from config import local_model_cfg
+
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+|[\u4e00-\u9fff]")
+
+
+class LocalEmbeddingAdapter(BaseEmbeddingAdapter):
+    """本地哈希特征 Embedding：不访问网络，用于离线压测
+
+    特征为英文词 / 汉字、相邻二元组与字符 trigram，经 crc32 哈希到 dimensions 维
+    （带符号），按 1 + log(tf) 加权后 L2 归一化。相同文本得到相同向量，
+    词面重叠越多的文本余弦相似度越高。
+    """
+
+    supports_async = True
+
+    @property
+    def name(self) -> dict:
+        return {"llm_provider": "local", "model": self.model}
+
+    def __init__(
+        self,
+        model: str = "local-hashing",
+        latency_ms: float = local_model_cfg.get("embedding_latency_ms", 0),
+    ):
+        self.model = model
+        self.latency = latency_ms / 1000
+
+    @staticmethod
+    def features(text: str) -> list[str]:
+        text = text.lower()
+        units = _WORD_PATTERN.findall(text)
+        features = [f"w:{unit}" for unit in units]
+        features += [f"b:{a}{b}" for a, b in zip(units, units[1:])]
+        compact = re.sub(r"\s+", " ", text)
+        features += [f"c:{compact[i : i + 3]}" for i in range(len(compact) - 2)]
+        return features
+
+    def embed_texts(self, texts: list[str], dimensions: int) -> np.ndarray:
+        out = np.zeros((len(texts), dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts: dict[int, float] = {}
+            for feature in self.features(text):
+                h = zlib.crc32(feature.encode("utf-8"))
+                col = h % dimensions
+                sign = 1.0 if (h >> 31) & 1 else -1.0
+                counts[col] = counts.get(col, 0.0) + sign
+            for col, value in counts.items():
+                if value:
+                    out[row, col] = math.copysign(1 + math.log(abs(value)), value)
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.maximum(norms, 1e-12)
+
+    def embedding_call(
+        self,
+        input: list[str] | str,
+        dimensions: int = 1024,
+        encoding_format: Omit | Literal["float", "base64"] = "base64",
+        **kwargs,
+    ) -> np.ndarray:
+        if self.latency:
+            time.sleep(self.latency)
+        texts = [input] if isinstance(input, str) else list(input)
+        embeddings = self.embed_texts(texts, dimensions)
+        return embeddings[0] if isinstance(input, str) else embeddings
+
+    async def async_embedding_call(
+        self,
+        input: list[str] | str,
+        dimensions: int = 1024,
+        encoding_format: Omit | Literal["float", "base64"] = "base64",
+    ) -> np.ndarray:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        texts = [input] if isinstance(input, str) else list(input)
+        embeddings = self.embed_texts(texts, dimensions)
+        return embeddings[0] if isinstance(input, str) else embeddings
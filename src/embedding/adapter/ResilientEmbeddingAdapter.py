@@ -0,0 +1,68 @@
+from .BaseEmbeddingAdapter import BaseEmbeddingAdapter
+
+from typing import Any, Literal
+import numpy as np
+from openai import Omit
+
+from src.metrics import LLM_RETRIES
+from src.resilience import get_breaker, load_policy, retry_async, retry_sync
+
+
+class ResilientEmbeddingAdapter(BaseEmbeddingAdapter, trace=False):
+    """为 embedding 适配器加上超时（embedding_timeout）、重试与按 provider 的熔断，
+    由 get_embedding_model 包装"""
+
+    def __init__(self, adapter: BaseEmbeddingAdapter):
+        self.adapter = adapter
+        self.supports_async = adapter.supports_async
+
+        name = adapter.name
+        self.breaker = get_breaker(f"embedding:{name['llm_provider']}")
+        self.policy = load_policy("embedding_timeout")
+        self._retries = LLM_RETRIES.labels(
+            llm_provider=name["llm_provider"], model=name["model"]
+        )
+
+    @property
+    def name(self) -> dict:
+        return self.adapter.name
+
+    def __getattr__(self, attr: str) -> Any:
+        # 平台特有的属性（model、supported_dimensions 等）沿用内层适配器
+        if attr == "adapter":
+            raise AttributeError(attr)
+        return getattr(self.adapter, attr)
+
+    def _on_retry(self, error: BaseException):
+        self._retries.inc()
+
+    def embedding_call(
+        self,
+        input: list[str] | str,
+        dimensions: int = 1024,
+        encoding_format: Omit | Literal["float", "base64"] = "base64",
+        **kwargs,
+    ) -> np.ndarray:
+        return retry_sync(
+            lambda: self.adapter.embedding_call(
+                input, dimensions, encoding_format, **kwargs
+            ),
+            self.policy,
+            self.breaker,
+            self._on_retry,
+        )
+
+    async def async_embedding_call(
+        self,
+        input: list[str] | str,
+        dimensions: int = 1024,
+        encoding_format: Omit | Literal["float", "base64"] = "base64",
+    ) -> np.ndarray:
+        return await retry_async(
+            lambda: self.adapter.async_embedding_call(
+                input, dimensions, encoding_format
+            ),
+            self.policy,
+            self.breaker,
+            self._on_retry,
+        )
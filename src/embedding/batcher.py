@@ -0,0 +1,185 @@
+"""Embedding 请求合并（micro-batching）
+
+并发的对话请求各自只向量化一两条 query。批处理器在后台线程中收集请求，
+等待至多 max_wait_ms 或凑满 max_batch_size 条文本后合并为一次 embedding 调用，
+再把结果按请求切片返回。线程（检索器在 asyncio.to_thread 中执行）与协程都可以使用。
+"""
+
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+import numpy as np
+
+from src.metrics import EMBEDDING_BATCH_REQUESTS
+from config import embedding_cfg
+
+
+EmbedFn = Callable[[list[str]], np.ndarray]
+
+
+class _Request:
+    __slots__ = ("texts", "future")
+
+    def __init__(self, texts: list[str]):
+        self.texts = texts
+        self.future: Future = Future()
+
+
+class BatchStats:
+    """批大小统计，用于观察合并效果"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.requests = 0
+        self.texts = 0
+        self.batch_sizes: dict[int, int] = {}
+
+    def record(self, num_requests: int, num_texts: int):
+        with self._lock:
+            self.batches += 1
+            self.requests += num_requests
+            self.texts += num_texts
+            self.batch_sizes[num_texts] = self.batch_sizes.get(num_texts, 0) + 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "requests": self.requests,
+                "texts": self.texts,
+                "mean_batch_size": self.texts / self.batches if self.batches else 0.0,
+                "mean_requests_per_batch": (
+                    self.requests / self.batches if self.batches else 0.0
+                ),
+                "batch_sizes": dict(sorted(self.batch_sizes.items())),
+            }
+
+
+class EmbeddingBatcher:
+    """合并并发的小 embedding 请求，超过 max_batch_size 的请求直接调用"""
+
+    def __init__(
+        self,
+        embed_fn: EmbedFn,
+        name: str = "",
+        max_batch_size: int = embedding_cfg.get("max_batch_size", 10),
+        max_wait_ms: float = embedding_cfg.get("max_wait_ms", 5),
+        max_concurrency: int = embedding_cfg.get("max_concurrency", 4),
+    ):
+        self.embed_fn = embed_fn
+        self.name = name
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.stats = BatchStats()
+
+        self._queue: queue.Queue[_Request] = queue.Queue()
+        self._carry: _Request | None = None
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        # 多个批次可以同时在途
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="embedding-batch"
+        )
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="embedding-batcher", daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, texts: list[str]) -> Future:
+        request = _Request(list(texts))
+        if len(request.texts) >= self.max_batch_size:
+            # 已经是满批次，不参与合并
+            self._executor.submit(self._dispatch, [request])
+        else:
+            self._ensure_started()
+            self._queue.put(request)
+        return request.future
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        return self.submit(texts).result()
+
+    async def aembed(self, texts: list[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        return await asyncio.wrap_future(self.submit(texts))
+
+    def _next_request(self, timeout: float | None) -> _Request | None:
+        if self._carry is not None:
+            request, self._carry = self._carry, None
+            return request
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def _run(self):
+        while True:
+            first = self._next_request(None)
+            if first is None:
+                continue
+            batch = [first]
+            size = len(first.texts)
+            deadline = time.monotonic() + self.max_wait
+
+            while size < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                request = self._next_request(remaining)
+                if request is None:
+                    break
+                if size + len(request.texts) > self.max_batch_size:
+                    # 放不下的请求留给下一批
+                    self._carry = request
+                    break
+                batch.append(request)
+                size += len(request.texts)
+
+            self._executor.submit(self._dispatch, batch)
+
+    def _dispatch(self, batch: list[_Request]):
+        texts = [text for request in batch for text in request.texts]
+        try:
+            vectors = np.asarray(self.embed_fn(texts), dtype=np.float32)
+        except Exception as e:
+            for request in batch:
+                request.future.set_exception(e)
+            return
+
+        self.stats.record(len(batch), len(texts))
+        EMBEDDING_BATCH_REQUESTS.labels(model=self.name).observe(len(batch))
+        start = 0
+        for request in batch:
+            end = start + len(request.texts)
+            request.future.set_result(vectors[start:end])
+            start = end
+
+
+_batchers: dict[str, EmbeddingBatcher] = {}
+_batchers_lock = threading.Lock()
+
+
+def get_batcher(key: str, embed_fn: EmbedFn) -> EmbeddingBatcher:
+    """按模型（及维度）获取批处理器单例"""
+    with _batchers_lock:
+        if key not in _batchers:
+            _batchers[key] = EmbeddingBatcher(embed_fn, name=key)
+        return _batchers[key]
+
+
+def batch_stats() -> dict[str, dict]:
+    """各批处理器的批大小统计"""
+    return {key: batcher.stats.snapshot() for key, batcher in _batchers.items()}
@@ -1,6 +1,10 @@
 from typing import Dict
 from .adapter.BailianEmbeddingAdapter import BailianEmbeddingAdapter
 from .adapter.BaseEmbeddingAdapter import BaseEmbeddingAdapter
+from .adapter.LocalEmbeddingAdapter import LocalEmbeddingAdapter
+from .adapter.ResilientEmbeddingAdapter import ResilientEmbeddingAdapter
+
+from config import resilience_cfg
 
 _instances: Dict[str, BaseEmbeddingAdapter] = {}
 
@@ -9,10 +13,17 @@ def get_embedding_model(llm_provider: str, model: str, api_key: str | None = Non
     """获取或创建指定 LLM 的单例实例"""
     key = f"{llm_provider}:{model}" if model else llm_provider  # 支持多模型缓存
     if key not in _instances:
+        adapter: BaseEmbeddingAdapter
         if llm_provider == "bailian":
-            _instances[key] = BailianEmbeddingAdapter(
+            adapter = BailianEmbeddingAdapter(
                 api_key=api_key, model=model or "text-embedding-v4"
             )
+        elif llm_provider == "local":
+            # 本地哈希 embedding，离线压测用
+            adapter = LocalEmbeddingAdapter(model=model or "local-hashing")
         else:
             raise ValueError(f"Unknown LLM provider name: {llm_provider}")
+        if resilience_cfg.get("enabled", True):
+            adapter = ResilientEmbeddingAdapter(adapter)
+        _instances[key] = adapter
     return _instances[key]
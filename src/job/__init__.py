@@ -0,0 +1,4 @@
+from .odm.Job import Job, JobStatus, JobType
+from . import job_service
+
+__all__ = ["Job", "JobStatus", "JobType", "job_service"]
@@ -0,0 +1,198 @@
+import asyncio
+import logging
+from concurrent.futures import Executor
+from typing import Awaitable, Callable
+
+from beanie import PydanticObjectId
+from beanie.operators import In
+
+from src.document import DocumentRecord
+from src.document import document_service as doc_service
+from src.llm.usage import usage_context
+from src.rag import knowledge_base_service as kb_service
+from src.session import Session, get_dialog_manager, get_memory_manager
+
+from .odm.Job import Job, JobType
+from . import job_service
+
+from config import job_cfg
+
+
+logger = logging.getLogger(__name__)
+
+
+class JobContext:
+    """handler 运行上下文：当前任务 + worker 的进程池"""
+
+    __slots__ = "job", "executor", "items"
+
+    def __init__(self, job: Job, executor: Executor | None = None):
+        self.job = job
+        self.executor = executor
+        self.items: dict[str, dict] = dict(job.items)
+
+    async def report(self, progress: float, stage: str):
+        """上报任务进度"""
+        await job_service.update_progress(self.job.id, progress, stage)  # type: ignore
+
+    async def init_items(self, item_ids: list[str]):
+        """初始化批量任务的逐项状态（重试时保留已成功的项，失败项重新执行）"""
+        for item_id in item_ids:
+            if self.items.get(item_id, {}).get("status") not in ("done", "skipped"):
+                self.items[item_id] = {"status": "pending", "error": None}
+        await self._push_items(self.items)
+
+    async def report_item(self, item_id: str, status: str, error: str | None = None):
+        """上报批量任务中单项的状态，整体进度按已结束的项计算"""
+        self.items[item_id] = {"status": status, "error": error}
+        await self._push_items({item_id: self.items[item_id]})
+
+    async def _push_items(self, items: dict[str, dict]):
+        finished = sum(
+            1 for item in self.items.values() if item["status"] in ITEM_FINISHED
+        )
+        await job_service.update_items(
+            self.job.id,  # type: ignore
+            items,
+            finished / max(1, len(self.items)),
+            f"{finished}/{len(self.items)}",
+        )
+
+
+# 批量任务中单项的终止状态
+ITEM_FINISHED = ("done", "skipped", "failed")
+
+JobHandler = Callable[[JobContext], Awaitable[dict | None]]
+
+JOB_HANDLERS: dict[str, JobHandler] = {}
+# 队列名 -> 任务类型，worker 可以只消费某个队列（--queue）
+JOB_QUEUES: dict[str, list[str]] = {}
+# 需要进程池（CPU 密集）的任务类型，只消费其他类型的 worker 不创建进程池
+PROCESS_POOL_JOB_TYPES: set[str] = set()
+
+
+def register_job_handler(
+    job_type: str, queue: str = "document", process_pool: bool = False
+) -> Callable[[JobHandler], JobHandler]:
+    def decorator(handler: JobHandler) -> JobHandler:
+        if job_type in JOB_HANDLERS:
+            raise ValueError(f"Duplicate job handler registered: {job_type}")
+        JOB_HANDLERS[job_type] = handler
+        JOB_QUEUES.setdefault(queue, []).append(job_type)
+        if process_pool:
+            PROCESS_POOL_JOB_TYPES.add(job_type)
+        return handler
+
+    return decorator
+
+
+@register_job_handler(JobType.parse_document.value, process_pool=True)
+async def parse_document(ctx: JobContext) -> dict:
+    document_record_id = ctx.job.payload["document_record_id"]
+    await doc_service.parse_file(
+        document_record_id, executor=ctx.executor, report_progress=ctx.report
+    )
+    return {"document_record_id": document_record_id}
+
+
+@register_job_handler(JobType.ingest_documents.value, process_pool=True)
+async def ingest_documents(ctx: JobContext) -> dict:
+    """批量加入知识库：先以有限并发解析未解析的文档，再统一分块并共享 embedding 批次入库"""
+    knowledge_base_id = ctx.job.payload["knowledge_base_id"]
+    document_record_ids: list[str] = ctx.job.payload["document_record_ids"]
+    concurrency = job_cfg.get("ingest_concurrency", 4)
+
+    await ctx.init_items(document_record_ids)
+
+    # 1. 解析
+    unparsed = await DocumentRecord.find(
+        In(DocumentRecord.id, [PydanticObjectId(i) for i in document_record_ids]),
+        DocumentRecord.markdown_path == "",
+    ).to_list()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def parse_one(record_id: str):
+        async with semaphore:
+            await ctx.report_item(record_id, "parsing")
+            try:
+                await doc_service.parse_file(record_id, executor=ctx.executor)
+            except Exception as e:
+                logger.error(f"Failed to parse {record_id}", exc_info=e)
+                await ctx.report_item(record_id, "failed", f"{type(e).__name__}: {e}")
+
+    await asyncio.gather(*(parse_one(str(record.id)) for record in unparsed))
+
+    # 2. 分块 + 向量化
+    pending_ids = [
+        record_id
+        for record_id in document_record_ids
+        if ctx.items[record_id]["status"] not in ITEM_FINISHED
+    ]
+    await kb_service.add_records_to_knowledge_base(
+        knowledge_base_id,
+        pending_ids,
+        concurrency=concurrency,
+        on_item=ctx.report_item,
+    )
+
+    statuses = [item["status"] for item in ctx.items.values()]
+    return {
+        "knowledge_base_id": knowledge_base_id,
+        "done": statuses.count("done"),
+        "skipped": statuses.count("skipped"),
+        "failed": statuses.count("failed"),
+    }
+
+
+async def _load_session(ctx: JobContext) -> Session | None:
+    session_id = ctx.job.payload["session_id"]
+    session = await Session.get(session_id)
+    if session is None:
+        # 会话已被删除
+        logger.info(f"Session {session_id} not found, skip {ctx.job.job_type}")
+    return session
+
+
+@register_job_handler(JobType.short_term_memory.value, queue="memory")
+async def short_term_memory(ctx: JobContext) -> dict:
+    """合并后的短期记忆摘要：执行时按会话的最新状态摘要，已摘要过的直接跳过"""
+    session = await _load_session(ctx)
+    if session is None:
+        return {"skipped": "session not found"}
+    memory_manager = get_memory_manager()
+    # 入队时的消息数；之后的多次触发合并到同一任务，已摘要到该位置时跳过（重试同样适用）
+    period = memory_manager.short_term_memory_period
+    if session.last_summary_count >= ctx.job.payload["message_count"] - period:
+        return {"skipped": "up to date"}
+    with usage_context(user_id=session.user_id, session_id=str(session.id)):
+        await memory_manager.update_short_term_memory(session)
+    return {"last_summary_count": session.last_summary_count}
+
+
+@register_job_handler(JobType.long_term_memory.value, queue="memory")
+async def long_term_memory(ctx: JobContext) -> dict:
+    session = await _load_session(ctx)
+    if session is None or not session.user_id:
+        return {"skipped": "session not found"}
+    with usage_context(user_id=session.user_id, session_id=str(session.id)):
+        await get_memory_manager().update_long_term_memory(session)
+    return {"user_id": session.user_id}
+
+
+@register_job_handler(JobType.ingest_memory.value, queue="memory")
+async def ingest_memory(ctx: JobContext) -> dict:
+    session = await _load_session(ctx)
+    if session is None:
+        return {"skipped": "session not found"}
+    await get_memory_manager().ingest_memory_to_rag(session)
+    return {"user_id": session.user_id}
+
+
+@register_job_handler(JobType.dialog_title.value, queue="memory")
+async def dialog_title(ctx: JobContext) -> dict:
+    session = await _load_session(ctx)
+    if session is None:
+        return {"skipped": "session not found"}
+    with usage_context(user_id=session.user_id, session_id=str(session.id)):
+        title = await get_dialog_manager().generate_dialog_title(session)
+    return {"title": title}
@@ -0,0 +1,231 @@
+from datetime import datetime, timedelta, timezone
+
+from beanie import PydanticObjectId, UpdateResponse
+from beanie.odm.operators.update.general import Inc, Set
+from beanie.operators import In, Or
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import DuplicateKeyError
+
+from .odm.Job import Job, JobStatus
+from config import job_cfg
+
+
+async def enqueue_job(
+    job_type: str,
+    payload: dict | None = None,
+    max_attempts: int | None = None,
+    priority: int = 0,
+    dedup_key: str | None = None,
+    delay: float = 0,
+) -> Job:
+    """创建一个待执行的任务。
+
+    Args:
+        job_type (str): 任务类型。
+        payload (dict, optional): 任务参数。
+        max_attempts (int, optional): 最大尝试次数，默认读取配置。
+        priority (int, optional): 优先级，越大越先被领取。
+        dedup_key (str, optional): 去重键。已有相同去重键的 pending 任务时不再创建，
+            返回已有任务；配合 delay，窗口内的多次入队合并为一次执行。
+        delay (float, optional): 延迟执行的秒数。
+
+    Returns:
+        Job: 创建的（或合并到的）任务。
+    """
+    run_after = None
+    if delay > 0:
+        run_after = datetime.now(timezone.utc) + timedelta(seconds=delay)
+    job = Job(
+        job_type=job_type,
+        payload=payload or {},
+        max_attempts=max_attempts or job_cfg.get("max_attempts", 3),
+        priority=priority,
+        run_after=run_after,
+        dedup_key=dedup_key,
+    )
+    try:
+        await job.insert()
+    except DuplicateKeyError:
+        existing = await Job.find_one(
+            Job.dedup_key == dedup_key, Job.status == JobStatus.pending
+        )
+        if existing is not None:
+            return existing
+        # 已有任务恰好被领取，重新创建
+        return await enqueue_job(
+            job_type, payload, max_attempts, priority, dedup_key, delay
+        )
+    return job
+
+
+async def get_job(job_id: str) -> Job | None:
+    return await Job.get(job_id)
+
+
+async def list_jobs(
+    status: JobStatus | None = None,
+    job_type: str | None = None,
+    skip: int = 0,
+    limit: int = 50,
+) -> list[Job]:
+    """按状态/类型列出任务，按创建时间倒序"""
+    query = Job.find()
+    if status is not None:
+        query = query.find(Job.status == status)
+    if job_type is not None:
+        query = query.find(Job.job_type == job_type)
+    return await query.sort(-Job.created_at).skip(skip).limit(limit).to_list()  # type: ignore
+
+
+async def claim_job(job_types: list[str], worker_id: str) -> Job | None:
+    """原子地领取一个到期的待执行任务，并标记为 running。
+
+    优先级高的先领取，同优先级按创建时间（FIFO）。
+    使用 find_one_and_update，多个 worker 并发领取时不会重复执行同一任务。
+    """
+    now = datetime.now(timezone.utc)
+    return await Job.find_one(
+        Job.status == JobStatus.pending,
+        In(Job.job_type, job_types),
+        Or(Job.run_after == None, Job.run_after <= now),  # noqa: E711
+    ).update(
+        Set(
+            {
+                Job.status: JobStatus.running,
+                Job.worker_id: worker_id,
+                Job.started_at: now,
+                Job.heartbeat_at: now,
+                Job.updated_at: now,
+            }
+        ),
+        Inc({Job.attempts: 1}),
+        response_type=UpdateResponse.NEW_DOCUMENT,
+        pymongo_kwargs={"sort": [("priority", DESCENDING), ("created_at", ASCENDING)]},
+    )
+
+
+async def update_progress(job_id: PydanticObjectId | str, progress: float, stage: str):
+    """更新任务进度，同时刷新心跳"""
+    now = datetime.now(timezone.utc)
+    await Job.find_one(Job.id == PydanticObjectId(job_id)).update(
+        Set(
+            {
+                Job.progress: max(0.0, min(1.0, progress)),
+                Job.stage: stage,
+                Job.heartbeat_at: now,
+                Job.updated_at: now,
+            }
+        )
+    )
+
+
+async def update_items(
+    job_id: PydanticObjectId | str,
+    items: dict[str, dict],
+    progress: float,
+    stage: str,
+):
+    """更新批量任务的逐项状态与整体进度"""
+    now = datetime.now(timezone.utc)
+    update = {f"items.{item_id}": item for item_id, item in items.items()}
+    update.update(
+        {
+            "progress": max(0.0, min(1.0, progress)),
+            "stage": stage,
+            "heartbeat_at": now,
+            "updated_at": now,
+        }
+    )
+    await Job.find_one(Job.id == PydanticObjectId(job_id)).update(Set(update))
+
+
+async def heartbeat(job_ids: list[PydanticObjectId]):
+    """刷新运行中任务的心跳"""
+    if not job_ids:
+        return
+    now = datetime.now(timezone.utc)
+    await Job.find(In(Job.id, job_ids), Job.status == JobStatus.running).update(
+        Set({Job.heartbeat_at: now})
+    )
+
+
+async def complete_job(job: Job, result: dict | None = None):
+    now = datetime.now(timezone.utc)
+    await Job.find_one(Job.id == job.id).update(
+        Set(
+            {
+                Job.status: JobStatus.succeeded,
+                Job.progress: 1.0,
+                Job.stage: "done",
+                Job.result: result or {},
+                Job.error: None,
+                Job.finished_at: now,
+                Job.updated_at: now,
+            }
+        )
+    )
+
+
+def retry_delay(attempts: int) -> float:
+    """第 attempts 次尝试失败后的重试延迟（秒），按指数退避，不超过 max_retry_delay"""
+    delay = job_cfg.get("retry_delay", 10) * 2 ** max(attempts - 1, 0)
+    return min(delay, job_cfg.get("max_retry_delay", 300))
+
+
+async def fail_job(job: Job, error: str):
+    """记录失败；未超过最大尝试次数时重新入队，退避一段时间后重试。
+
+    带去重键的任务重新入队时，若已有相同去重键的 pending 任务（执行期间新入队的），
+    由该任务代替重试，本任务标记为失败。
+    """
+    now = datetime.now(timezone.utc)
+    failed = {
+        Job.status: JobStatus.failed,
+        Job.error: error,
+        Job.finished_at: now,
+        Job.updated_at: now,
+    }
+    if job.attempts >= job.max_attempts:
+        await Job.find_one(Job.id == job.id).update(Set(failed))
+        return
+
+    run_after = now + timedelta(seconds=retry_delay(job.attempts))
+    try:
+        await Job.find_one(Job.id == job.id).update(
+            Set(
+                {
+                    Job.status: JobStatus.pending,
+                    Job.worker_id: None,
+                    Job.run_after: run_after,
+                    Job.error: error,
+                    Job.updated_at: now,
+                }
+            )
+        )
+    except DuplicateKeyError:
+        failed[Job.error] = f"{error} (superseded by a pending job: {job.dedup_key})"
+        await Job.find_one(Job.id == job.id).update(Set(failed))
+
+
+async def recover_stale_jobs(stale_timeout: float | None = None) -> int:
+    """崩溃恢复：将心跳超时的 running 任务重新入队（或在尝试次数耗尽时标记失败）。
+
+    Args:
+        stale_timeout (float, optional): 心跳超时时间（秒），默认读取配置。
+
+    Returns:
+        int: 被恢复的任务数量。
+    """
+    if stale_timeout is None:
+        stale_timeout = job_cfg.get("stale_timeout", 300)
+    deadline = datetime.now(timezone.utc) - timedelta(seconds=stale_timeout)
+
+    stale_jobs = await Job.find(
+        Job.status == JobStatus.running,
+        Job.heartbeat_at < deadline,  # type: ignore
+    ).to_list()
+
+    for job in stale_jobs:
+        await fail_job(job, error=f"Worker {job.worker_id} lost heartbeat")
+
+    return len(stale_jobs)
@@ -0,0 +1,76 @@
+from datetime import datetime
+from enum import Enum
+from typing import Any
+
+from pydantic import Field
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from src.database import BaseDocument
+
+
+class JobStatus(str, Enum):
+    pending = "pending"  # 等待执行
+    running = "running"  # 执行中
+    succeeded = "succeeded"  # 执行成功
+    failed = "failed"  # 重试耗尽后失败
+
+
+class JobType(str, Enum):
+    parse_document = "parse_document"  # Docling 解析 + 元信息提取
+    ingest_documents = "ingest_documents"  # 批量解析并加入知识库
+    short_term_memory = "short_term_memory"  # 会话短期记忆摘要
+    long_term_memory = "long_term_memory"  # 退出会话时更新用户长期记忆
+    ingest_memory = "ingest_memory"  # 退出会话时将对话写入记忆检索库
+    dialog_title = "dialog_title"  # 退出会话时生成会话标题
+
+
+class Job(BaseDocument):
+    """持久化的后台任务（解析等 CPU 密集型任务、记忆更新），由独立 worker 进程消费"""
+
+    job_type: str = Field(...)  # 任务类型，对应 worker 中注册的 handler
+    payload: dict[str, Any] = Field(default_factory=dict)  # handler 参数
+    status: JobStatus = Field(default=JobStatus.pending)
+    priority: int = Field(default=0)  # 越大越先被领取，同优先级按创建时间
+    run_after: datetime | None = Field(default=None)  # 在该时间之后才可被领取
+    # 去重键：同一去重键最多只有一个 pending 任务，重复入队时合并到已有任务
+    dedup_key: str | None = Field(default=None)
+
+    progress: float = Field(default=0.0)  # 0 ~ 1
+    stage: str = Field(default="")  # 当前阶段描述
+    items: dict[str, dict[str, Any]] = Field(default_factory=dict)  # 批量任务的逐项进度
+    result: dict[str, Any] = Field(default_factory=dict)
+    error: str | None = Field(default=None)
+
+    attempts: int = Field(default=0)  # 已尝试次数（每次被领取 +1）
+    max_attempts: int = Field(default=3)
+
+    worker_id: str | None = Field(default=None)
+    started_at: datetime | None = Field(default=None)
+    finished_at: datetime | None = Field(default=None)
+    heartbeat_at: datetime | None = Field(default=None)
+
+    class Settings:
+        name = "job"  # MongoDB 集合名
+        indexes = [
+            [("status", ASCENDING), ("job_type", ASCENDING), ("created_at", ASCENDING)],
+            # claim_job：按优先级、创建时间领取
+            [
+                ("status", ASCENDING),
+                ("priority", DESCENDING),
+                ("created_at", ASCENDING),
+            ],
+            [("status", ASCENDING), ("heartbeat_at", ASCENDING)],
+            [("created_at", DESCENDING)],
+            IndexModel(
+                [("dedup_key", ASCENDING)],
+                unique=True,
+                partialFilterExpression={
+                    "status": JobStatus.pending.value,
+                    "dedup_key": {"$type": "string"},
+                },
+            ),
+        ]
+        use_state_management = True
+
+    def __str__(self) -> str:
+        return f"Job(id={self.id}, type={self.job_type}, status={self.status.value})"
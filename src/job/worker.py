@@ -0,0 +1,237 @@
+"""后台任务 worker 入口
+
+与 API 进程分离运行，CPU 密集的解析任务在进程池中执行，不再占用 API worker：
+
+    python -m src.job.worker --concurrency 2
+
+记忆更新与标题生成（memory 队列）可以由单独的 worker 消费，不创建进程池：
+
+    python -m src.job.worker --queue memory --concurrency 8
+"""
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from beanie import PydanticObjectId
+
+from src.database import connect_db, disconnect_db
+from src.document import DocumentRecord
+from src.document.converter_pool import init_converter_process
+from src.rag import KnowledgeBase, CollectionRecord
+from src.prompt import load_all_prompts
+from src.session import Session, LongTermMemory
+from src.usage import TokenUsage, usage_recorder
+
+from .odm.Job import Job
+from .handlers import JOB_HANDLERS, JOB_QUEUES, PROCESS_POOL_JOB_TYPES, JobContext
+from . import job_service
+
+from config import job_cfg
+
+
+logger = logging.getLogger(__name__)
+
+
+class JobWorker:
+    def __init__(
+        self,
+        job_types: list[str] | None = None,
+        concurrency: int = job_cfg.get("concurrency", 2),
+        poll_interval: float = job_cfg.get("poll_interval", 1.0),
+        heartbeat_interval: float = job_cfg.get("heartbeat_interval", 10),
+        stale_timeout: float = job_cfg.get("stale_timeout", 300),
+    ):
+        self.job_types = job_types or list(JOB_HANDLERS.keys())
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_timeout = stale_timeout
+
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.executor: ProcessPoolExecutor | None = None
+        self._running: dict[PydanticObjectId, asyncio.Task] = {}
+        self._stopping: asyncio.Event | None = None
+
+    @property
+    def needs_process_pool(self) -> bool:
+        return any(t in PROCESS_POOL_JOB_TYPES for t in self.job_types)
+
+    def _new_executor(self) -> ProcessPoolExecutor | None:
+        if not self.needs_process_pool:
+            return None
+        # spawn：避免 fork 继承事件循环和 Mongo 连接
+        # initializer：每个子进程启动时按配置预热 Docling converter
+        return ProcessPoolExecutor(
+            max_workers=self.concurrency,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_converter_process,
+        )
+
+    def stop(self):
+        """优雅退出：不再领取新任务，等待执行中的任务完成"""
+        if self._stopping is not None:
+            self._stopping.set()
+
+    async def run(self):
+        self._stopping = asyncio.Event()
+
+        try:
+            recovered = await job_service.recover_stale_jobs(self.stale_timeout)
+            if recovered:
+                logger.warning(f"Recovered {recovered} stale job(s) left in-flight")
+        except Exception as e:
+            # 心跳循环中会再次尝试恢复
+            logger.error("Failed to recover stale jobs", exc_info=e)
+
+        self.executor = self._new_executor()
+        heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+        logger.info(
+            f"Worker {self.worker_id} started: types={self.job_types}, "
+            f"concurrency={self.concurrency}"
+        )
+        try:
+            await self._poll_loop()
+        finally:
+            if self._running:
+                await asyncio.gather(*self._running.values(), return_exceptions=True)
+            heartbeat_task.cancel()
+            if self.executor is not None:
+                self.executor.shutdown(wait=True)
+            logger.info(f"Worker {self.worker_id} stopped")
+
+    async def _poll_loop(self):
+        assert self._stopping is not None
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        while not self._stopping.is_set():
+            await semaphore.acquire()
+            try:
+                job = await job_service.claim_job(self.job_types, self.worker_id)
+            except Exception as e:
+                logger.error("Failed to claim job", exc_info=e)
+                job = None
+
+            if job is None:
+                semaphore.release()
+                try:
+                    await asyncio.wait_for(
+                        self._stopping.wait(), timeout=self.poll_interval
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            task = asyncio.create_task(self._execute(job))
+            self._running[job.id] = task  # type: ignore
+
+            def _done(_: asyncio.Task, job_id=job.id):
+                self._running.pop(job_id, None)  # type: ignore
+                semaphore.release()
+
+            task.add_done_callback(_done)
+
+    async def _execute(self, job: Job):
+        handler = JOB_HANDLERS.get(job.job_type)
+        if handler is None:
+            await job_service.fail_job(job, f"No handler for job type: {job.job_type}")
+            return
+
+        logger.info(f"Running {job} (attempt {job.attempts}/{job.max_attempts})")
+        executor = self.executor
+        try:
+            result = await handler(JobContext(job, executor))
+        except BrokenProcessPool as e:
+            # 子进程崩溃（如 OOM）后进程池不可用，重建后任务按重试策略重新入队
+            logger.error(f"Process pool broken while running {job}", exc_info=e)
+            # 同一进程池上的多个任务会同时失败，只由第一个任务重建
+            if executor is not None and self.executor is executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = self._new_executor()
+            await job_service.fail_job(job, f"{type(e).__name__}: {e}")
+        except Exception as e:
+            logger.error(f"{job} failed", exc_info=e)
+            await job_service.fail_job(job, f"{type(e).__name__}: {e}")
+        else:
+            await job_service.complete_job(job, result)
+            logger.info(f"{job} succeeded")
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await job_service.heartbeat(list(self._running.keys()))
+                await job_service.recover_stale_jobs(self.stale_timeout)
+            except Exception as e:
+                logger.error("Heartbeat failed", exc_info=e)
+
+
+async def main(args: argparse.Namespace):
+    client = await connect_db(
+        models=[
+            Job,
+            DocumentRecord,
+            KnowledgeBase,
+            CollectionRecord,
+            TokenUsage,
+            Session,
+            LongTermMemory,
+        ]
+    )
+    load_all_prompts()
+    # 元信息提取等任务中的 LLM 调用同样计入用量
+    usage_recorder.start()
+
+    job_types = args.job_types
+    if args.queue:
+        job_types = [t for queue in args.queue for t in JOB_QUEUES.get(queue, [])]
+    worker = JobWorker(
+        job_types=job_types,
+        concurrency=args.concurrency,
+    )
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, worker.stop)
+        except NotImplementedError:
+            # Windows 不支持 add_signal_handler
+            pass
+
+    try:
+        await worker.run()
+    finally:
+        await usage_recorder.stop()
+        await disconnect_db(client)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="RAG Agent background job worker")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=job_cfg.get("concurrency", 2),
+        help="并发执行的任务数（消费 document 队列时也是进程池大小）",
+    )
+    parser.add_argument(
+        "--job-types",
+        nargs="*",
+        default=None,
+        help="只消费指定类型的任务，默认消费全部已注册类型",
+    )
+    parser.add_argument(
+        "--queue",
+        nargs="*",
+        choices=sorted(JOB_QUEUES),
+        default=None,
+        help="只消费指定队列的任务：document（解析、入库）、memory（记忆更新、标题）",
+    )
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(parser.parse_args()))
@@ -1,4 +1,11 @@
 from .factory import get_llm, BaseChatAdapter
+from .limiter import LLMOverloadedError
 from .Message import Message, Messages
 
-__all__ = ["get_llm", "Message", "Messages", "BaseChatAdapter"]
+__all__ = [
+    "get_llm",
+    "Message",
+    "Messages",
+    "BaseChatAdapter",
+    "LLMOverloadedError",
+]
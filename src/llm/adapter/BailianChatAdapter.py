@@ -2,6 +2,8 @@ import os
 from typing import Iterator, AsyncGenerator
 from openai import OpenAI, AsyncOpenAI
 from .BaseChatAdapter import BaseChatAdapter, Messages
+from ..usage import record_completion_usage
+from src.resilience import client_options
 
 
 
@@ -28,10 +30,12 @@ class BailianChatAdapter(BaseChatAdapter):
         self.client = OpenAI(
             api_key=self.api_key,
             base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",
+            **client_options("llm_timeout"),
         )
         self.async_client = AsyncOpenAI(
             api_key=self.api_key,
             base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",
+            **client_options("llm_timeout"),
         )
         self.model = model
 
@@ -68,6 +72,7 @@ class BailianChatAdapter(BaseChatAdapter):
         except Exception as e:
             raise e
 
+        record_completion_usage(self, response.usage)
         return response.choices[0].message.content
 
     async def async_chat(
@@ -99,6 +104,7 @@ class BailianChatAdapter(BaseChatAdapter):
         except Exception as e:
             raise e
 
+        record_completion_usage(self, response.usage)
         return response.choices[0].message.content
 
     def stream_chat(
@@ -144,9 +150,13 @@ class BailianChatAdapter(BaseChatAdapter):
                     max_tokens=max_tokens,
                     temperature=temperature,
                     stream=True,  # 开启流式输出
+                    # 最后一个 chunk 返回本次调用的 token 用量（choices 为空）
+                    stream_options={"include_usage": True},
                 )
 
                 async for chunk in stream:
+                    if chunk.usage is not None:
+                        record_completion_usage(self, chunk.usage)
                     # 检查是否有内容片段
                     if (
                         chunk.choices
@@ -2,6 +2,8 @@ from abc import ABC, abstractmethod
 from typing import AsyncIterator, Optional, Iterator, AsyncGenerator
 import asyncio
 from ..Message import Messages
+from src.tracing.tracer import trace_methods
+from ..usage import adapter_labels
 
 
 class BaseChatAdapter(ABC):
@@ -13,6 +15,20 @@ class BaseChatAdapter(ABC):
     # supports_prefix_assistant_message: bool = False
     # supports_stop_sequences: bool = False
 
+    def __init_subclass__(cls, trace: bool = True, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if not trace:
+            # 包装其他适配器的类（如 ResilientChatAdapter）不重复生成 span
+            return
+        # 各平台实现的调用自动生成 llm.<方法名> span
+        trace_methods(
+            cls,
+            "llm",
+            ("chat", "async_chat", "call", "async_call"),
+            stream_methods=("async_stream_chat",),
+            attributes=adapter_labels,
+        )
+
     @property
     @abstractmethod
     def name(self) -> dict:
@@ -37,9 +53,13 @@ class BaseChatAdapter(ABC):
         temperature: float = 0.5,
         **kwargs,
     ) -> str | None:
-        """默认异步封装，不阻塞事件循环"""
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, self.chat, messages, format, **kwargs)
+        """默认异步封装，不阻塞事件循环
+
+        to_thread 会复制 contextvars，线程中上报的用量保留 prompt 与归属
+        """
+        return await asyncio.to_thread(
+            self.chat, messages, format, max_tokens, temperature, **kwargs
+        )
 
     def stream_chat(
         self,
@@ -81,7 +101,6 @@ class BaseChatAdapter(ABC):
         temperature: float = 0.5,
     ) -> str | None:
         """异步调用接口，一次性调用，无对话记录，返回完整文本"""
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(
-            None, self.call, prompt, format, max_tokens, temperature
+        return await asyncio.to_thread(
+            self.call, prompt, format, max_tokens, temperature
         )
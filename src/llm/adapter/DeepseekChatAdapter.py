@@ -2,6 +2,8 @@ import os
 from typing import Iterator, AsyncGenerator
 from openai import OpenAI, AsyncOpenAI
 from .BaseChatAdapter import BaseChatAdapter, Messages
+from ..usage import record_completion_usage
+from src.resilience import client_options
 
 """
 deepseek 和 openai API 类似，但有些区别：
@@ -32,10 +34,14 @@ class DeepseekChatAdapter(BaseChatAdapter):
                 "DeepSeek API key is missing. Set DEEPSEEK_API_KEY environment variable."
             )
         self.client = OpenAI(
-            api_key=self.api_key, base_url="https://api.deepseek.com/beta"
+            api_key=self.api_key,
+            base_url="https://api.deepseek.com/beta",
+            **client_options("llm_timeout"),
         )
         self.async_client = AsyncOpenAI(
-            api_key=self.api_key, base_url="https://api.deepseek.com/beta"
+            api_key=self.api_key,
+            base_url="https://api.deepseek.com/beta",
+            **client_options("llm_timeout"),
         )
         self.model = model
 
@@ -66,6 +72,7 @@ class DeepseekChatAdapter(BaseChatAdapter):
         except Exception as e:
             raise e
 
+        record_completion_usage(self, response.usage)
         return response.choices[0].message.content
 
     async def async_chat(
@@ -90,6 +97,7 @@ class DeepseekChatAdapter(BaseChatAdapter):
         except Exception as e:
             raise e
 
+        record_completion_usage(self, response.usage)
         return response.choices[0].message.content
 
     def stream_chat(
@@ -136,9 +144,13 @@ class DeepseekChatAdapter(BaseChatAdapter):
                     temperature=temperature,
                     stop="```" if format else None,
                     stream=True,  # 开启流式输出
+                    # 最后一个 chunk 返回本次调用的 token 用量（choices 为空）
+                    stream_options={"include_usage": True},
                 )
 
                 async for chunk in stream:
+                    if chunk.usage is not None:
+                        record_completion_usage(self, chunk.usage)
                     # 检查是否有内容片段
                     if (
                         chunk.choices
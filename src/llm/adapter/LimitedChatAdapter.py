@@ -0,0 +1,122 @@
+from typing import Any, AsyncGenerator, AsyncIterator, Iterator
+import inspect
+
+from .BaseChatAdapter import BaseChatAdapter, Messages
+from ..limiter import get_limiter, prompt_priority
+from ..usage import adapter_labels, current_prompt
+
+
+class LimitedChatAdapter(BaseChatAdapter, trace=False):
+    """异步调用前向 provider 的限制器申请名额（见 src/llm/limiter.py），由 get_llm 包装
+
+    - 优先级由当前 prompt 决定；名额在调用结束（流式调用为流结束）时释放
+    - 包在 ResilientChatAdapter 外层：重试的退避期间仍占用名额，超时不含排队时间
+    - 同步接口在线程中调用，不经过限制器
+    """
+
+    def __init__(self, adapter: BaseChatAdapter):
+        self.adapter = adapter
+        self.supports_streaming = adapter.supports_streaming
+        self.supports_async = adapter.supports_async
+        self.limiter = get_limiter(adapter_labels(adapter)["llm_provider"])
+
+    @property
+    def name(self) -> dict:
+        return self.adapter.name
+
+    def __getattr__(self, attr: str) -> Any:
+        # breaker、model 等属性沿用内层适配器
+        if attr == "adapter":
+            raise AttributeError(attr)
+        return getattr(self.adapter, attr)
+
+    async def _limited(self, call) -> Any:
+        priority = prompt_priority(current_prompt.get())
+        await self.limiter.acquire(priority)
+        try:
+            return await call()
+        finally:
+            self.limiter.release(priority)
+
+    def chat(
+        self,
+        messages: Messages,
+        format: str | None = None,
+        max_tokens: int = 2048,
+        temperature: float = 0.5,
+        **kwargs,
+    ) -> str | None:
+        return self.adapter.chat(messages, format, max_tokens, temperature, **kwargs)
+
+    async def async_chat(
+        self,
+        messages: Messages,
+        format: str | None = None,
+        max_tokens: int = 2048,
+        temperature: float = 0.5,
+        **kwargs,
+    ) -> str | None:
+        return await self._limited(
+            lambda: self.adapter.async_chat(
+                messages, format, max_tokens, temperature, **kwargs
+            )
+        )
+
+    def call(
+        self,
+        prompt: str,
+        format: str | None = None,
+        max_tokens: int = 2048,
+        temperature: float = 0.5,
+    ) -> str | None:
+        return self.adapter.call(prompt, format, max_tokens, temperature)
+
+    async def async_call(
+        self,
+        prompt: str,
+        format: str | None = None,
+        max_tokens: int = 2048,
+        temperature: float = 0.5,
+    ) -> str | None:
+        return await self._limited(
+            lambda: self.adapter.async_call(prompt, format, max_tokens, temperature)
+        )
+
+    def stream_chat(
+        self,
+        messages: Messages,
+        format: str | None = None,
+        max_tokens: int = 2048,
+        temperature: float = 0.5,
+        **kwargs,
+    ) -> Iterator[str]:
+        return self.adapter.stream_chat(
+            messages, format, max_tokens, temperature, **kwargs
+        )
+
+    async def async_stream_chat(
+        self,
+        messages: Messages,
+        format: str | None = None,
+        max_tokens: int = 2048,
+        temperature: float = 0.5,
+        **kwargs,
+    ) -> AsyncGenerator[str, None]:
+        return self._stream(messages, format, max_tokens, temperature, **kwargs)
+
+    async def _stream(self, messages: Messages, *args, **kwargs) -> AsyncIterator[str]:
+        # 在取首个 chunk 时排队，/chat-stream 开始响应前即可返回 503
+        priority = prompt_priority(current_prompt.get())
+        await self.limiter.acquire(priority)
+        stream = None
+        try:
+            stream = self.adapter.async_stream_chat(messages, *args, **kwargs)
+            if inspect.isawaitable(stream):
+                stream = await stream
+            async for chunk in stream:
+                yield chunk
+        finally:
+            aclose = getattr(stream, "aclose", None)
+            if aclose is not None:
+                await aclose()
+            self.limiter.release(priority)
@@ -0,0 +1,159 @@
+import asyncio
+import hashlib
+import random
+import time
+from typing import Iterator, AsyncGenerator
+from .BaseChatAdapter import BaseChatAdapter, Messages
+from ..usage import record_usage
+
+from config import local_model_cfg
+
+"""
+本地替身对话模型：不访问网络，用于离线压测整个 API。
+- 回复由 prompt 的哈希确定性生成，相同输入得到相同输出
+- 首 token 延迟与逐 token 延迟可配置，模拟真实模型的流式输出
+- format="json" 时按 prompt 中的标记返回预设 JSON（见 [tool.local_model]）
+"""
+
+_VOCABULARY = (
+    "the model retrieves relevant context from the knowledge base and answers "
+    "based on the documents 检索 相关 文档 并 根据 上下文 回答 问题"
+).split()
+
+
+def count_input_tokens(messages: Messages) -> int:
+    """按空白切分估算输入 token 数"""
+    return sum(len(str(m.get("content", "")).split()) for m in messages)
+
+
+class LocalChatAdapter(BaseChatAdapter):
+    """本地确定性对话模型，模拟延迟并流式输出"""
+
+    supports_streaming = True
+    supports_async = True
+    supports_format_output = True
+    supports_prefix_assistant_message = False
+    supports_stop_sequences = False
+
+    def __init__(
+        self,
+        model: str = "local-chat",
+        first_token_ms: float = local_model_cfg.get("chat_first_token_ms", 200),
+        token_ms: float = local_model_cfg.get("chat_token_ms", 20),
+        output_tokens: int = local_model_cfg.get("chat_output_tokens", 64),
+    ):
+        self.model = model
+        self.first_token_delay = first_token_ms / 1000
+        self.token_delay = token_ms / 1000
+        self.output_tokens = output_tokens
+        # [(prompt 中的标记, JSON 回复)]，按顺序匹配
+        self.json_responses: list[tuple[str, str]] = [
+            (marker, response)
+            for marker, response in local_model_cfg.get("chat_json_responses", [])
+        ]
+
+    @property
+    def name(self) -> dict:
+        return {"llm_provider": "local", "model": self.model}
+
+    def _tokens(
+        self, messages: Messages, format: str | None, max_tokens: int
+    ) -> list[str]:
+        prompt = "\n".join(str(m.get("content", "")) for m in messages)
+        if format == "json":
+            for marker, response in self.json_responses:
+                if marker in prompt:
+                    return [response]
+            return ["{}"]
+
+        seed = int.from_bytes(hashlib.md5(prompt.encode("utf-8")).digest()[:8], "big")
+        rng = random.Random(seed)
+        count = min(self.output_tokens, max_tokens)
+        return [rng.choice(_VOCABULARY) + " " for _ in range(count)]
+
+    def chat(
+        self,
+        messages: Messages,
+        format: str | None = None,
+        max_tokens: int = 2048,
+        temperature: float = 0.5,
+        **kwargs,
+    ) -> str | None:
+        tokens = self._tokens(messages, format, max_tokens)
+        time.sleep(self.first_token_delay + self.token_delay * (len(tokens) - 1))
+        record_usage(self, count_input_tokens(messages), len(tokens))
+        return "".join(tokens)
+
+    async def async_chat(
+        self,
+        messages: Messages,
+        format: str | None = None,
+        max_tokens: int = 2048,
+        temperature: float = 0.5,
+        **kwargs,
+    ) -> str | None:
+        tokens = self._tokens(messages, format, max_tokens)
+        await asyncio.sleep(
+            self.first_token_delay + self.token_delay * (len(tokens) - 1)
+        )
+        record_usage(self, count_input_tokens(messages), len(tokens))
+        return "".join(tokens)
+
+    def stream_chat(
+        self,
+        messages: Messages,
+        format: str | None = None,
+        max_tokens: int = 2048,
+        temperature: float = 0.5,
+        **kwargs,
+    ) -> Iterator[str]:
+        tokens = self._tokens(messages, format, max_tokens)
+        for i, token in enumerate(tokens):
+            time.sleep(self.first_token_delay if i == 0 else self.token_delay)
+            yield token
+        record_usage(self, count_input_tokens(messages), len(tokens))
+
+    async def async_stream_chat(
+        self,
+        messages: Messages,
+        format: str | None = None,
+        max_tokens: int = 2048,
+        temperature: float = 0.5,
+        **kwargs,
+    ) -> AsyncGenerator[str, None]:
+        """异步流式接口：逐 token 返回"""
+
+        async def _stream():
+            tokens = self._tokens(messages, format, max_tokens)
+            for i, token in enumerate(tokens):
+                await asyncio.sleep(
+                    self.first_token_delay if i == 0 else self.token_delay
+                )
+                yield token
+            record_usage(self, count_input_tokens(messages), len(tokens))
+
+        return _stream()
+
+    def call(
+        self,
+        prompt: str,
+        format: str | None = None,
+        max_tokens: int = 2048,
+        temperature: float = 0.5,
+    ) -> str | None:
+        messages: Messages = [{"role": "user", "content": prompt}]
+        return self.chat(
+            messages, format=format, max_tokens=max_tokens, temperature=temperature
+        )
+
+    async def async_call(
+        self,
+        prompt: str,
+        format: str | None = None,
+        max_tokens: int = 2048,
+        temperature: float = 0.5,
+    ) -> str | None:
+        messages: Messages = [{"role": "user", "content": prompt}]
+        return await self.async_chat(
+            messages, format=format, max_tokens=max_tokens, temperature=temperature
+        )
@@ -2,6 +2,8 @@ import os
 from typing import Any, Iterator, AsyncGenerator, Optional
 from openai import OpenAI, AsyncOpenAI
 from .BaseChatAdapter import BaseChatAdapter, Messages
+from ..usage import record_completion_usage
+from src.resilience import client_options
 
 
 def add_assistant_prefix(messages: Messages, prefix: str):
@@ -10,22 +12,37 @@ def add_assistant_prefix(messages: Messages, prefix: str):
 
 
 class OpenaiChatAdapter(BaseChatAdapter):
-    """DeepSeek API 适配器，实现 sync 与 stream 调用"""
+    """OpenAI 及 OpenAI 兼容接口适配器（base_url 缺省读取 OPENAI_BASE_URL）"""
 
     supports_streaming = True
-    supports_async = False  # 如果要加 async 可扩展
+    supports_async = True
     supports_format_output = False
     supports_prefix_assistant_message = True
     supports_stop_sequences = True
 
-    def __init__(self, api_key: Optional[str] = None, model: str = "gpt"):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: str = "gpt-4o-mini",
+        base_url: Optional[str] = None,
+    ):
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             raise ValueError(
                 "OpenAI API key is missing. Set OPENAI_API_KEY environment variable."
             )
-        self.client = OpenAI(api_key=self.api_key, base_url="")  # TODO
-        self.async_client = AsyncOpenAI(api_key=self.api_key, base_url="")  # TODO
+        # None 时使用 OpenAI 官方地址
+        self.base_url = base_url or os.getenv("OPENAI_BASE_URL") or None
+        self.client = OpenAI(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            **client_options("llm_timeout"),
+        )
+        self.async_client = AsyncOpenAI(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            **client_options("llm_timeout"),
+        )
         self.model = model
 
     @property
@@ -52,6 +69,7 @@ class OpenaiChatAdapter(BaseChatAdapter):
             stop="```" if format else None,
         )
 
+        record_completion_usage(self, response.usage)
         return response.choices[0].message.content
 
     async def async_chat(
@@ -65,7 +83,7 @@ class OpenaiChatAdapter(BaseChatAdapter):
         if format:
             add_assistant_prefix(messages, "```" + format)
 
-        response = self.client.chat.completions.create(
+        response = await self.async_client.chat.completions.create(
             model=self.model,
             messages=messages,  # type: ignore
             max_tokens=max_tokens,
@@ -73,6 +91,7 @@ class OpenaiChatAdapter(BaseChatAdapter):
             stop="```" if format else None,
         )
 
+        record_completion_usage(self, response.usage)
         return response.choices[0].message.content
 
     def stream_chat(
@@ -95,3 +114,61 @@ class OpenaiChatAdapter(BaseChatAdapter):
                     yield event.delta["content"]
                 elif event.type == "message.completed":
                     break
+
+    async def async_stream_chat(
+        self,
+        messages: Messages,
+        format: Optional[str] = None,
+        max_tokens: int = 2048,
+        temperature: float = 0.5,
+        **kwargs,
+    ) -> AsyncGenerator[str, None]:
+        """异步流式接口：逐段返回"""
+
+        async def _stream():
+            stream = await self.async_client.chat.completions.create(
+                model=self.model,
+                messages=messages,  # type: ignore
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stream=True,
+                # 最后一个 chunk 返回本次调用的 token 用量（choices 为空）
+                stream_options={"include_usage": True},
+            )
+            async for chunk in stream:
+                if chunk.usage is not None:
+                    record_completion_usage(self, chunk.usage)
+                if (
+                    chunk.choices
+                    and chunk.choices[0].delta
+                    and chunk.choices[0].delta.content
+                ):
+                    yield chunk.choices[0].delta.content
+
+        return _stream()
+
+    def call(
+        self,
+        prompt: str,
+        format: Optional[str] = None,
+        max_tokens: int = 2048,
+        temperature: float = 0.5,
+    ) -> str | None:
+        """同步调用接口，一次性调用，无对话记录，返回完整文本"""
+        messages: Messages = [{"role": "user", "content": prompt}]
+        return self.chat(
+            messages, format=format, max_tokens=max_tokens, temperature=temperature
+        )
+
+    async def async_call(
+        self,
+        prompt: str,
+        format: Optional[str] = None,
+        max_tokens: int = 2048,
+        temperature: float = 0.5,
+    ) -> str | None:
+        """异步调用接口，一次性调用，无对话记录，返回完整文本"""
+        messages: Messages = [{"role": "user", "content": prompt}]
+        return await self.async_chat(
+            messages, format=format, max_tokens=max_tokens, temperature=temperature
+        )
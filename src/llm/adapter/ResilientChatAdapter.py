@@ -0,0 +1,192 @@
+from typing import Any, AsyncGenerator, AsyncIterator, Iterator
+import asyncio
+import dataclasses
+import functools
+import inspect
+
+from .BaseChatAdapter import BaseChatAdapter, Messages
+from ..usage import adapter_labels, current_prompt
+from src.metrics import HEDGED_REQUESTS, LLM_RETRIES
+from src.resilience import (
+    get_breaker,
+    hedged,
+    is_retryable,
+    load_policy,
+    retry_async,
+    retry_sync,
+)
+
+from config import resilience_cfg
+
+
+class ResilientChatAdapter(BaseChatAdapter, trace=False):
+    """为任意适配器加上超时、重试、熔断与对冲请求，由 get_llm 包装
+
+    - 非流式调用：单次尝试超时 llm_timeout，可重试的错误按带抖动的指数退避重试
+    - 流式调用：首 token 前失败（含 first_token_timeout 超时）可重试；
+      之后相邻 chunk 超过 stream_idle_timeout 视为失败，不再重试（已输出部分内容）
+    - 熔断器按 provider 共享，熔断中直接抛出 CircuitOpenError
+    - hedge_prompts 中的 prompt（延迟敏感的 query_rewrite / query_route）在 hedge_delay
+      秒内未返回时再发出一个相同请求，取先返回的结果
+    """
+
+    def __init__(self, adapter: BaseChatAdapter):
+        self.adapter = adapter
+        self.supports_streaming = adapter.supports_streaming
+        self.supports_async = adapter.supports_async
+
+        labels = adapter_labels(adapter)
+        self.breaker = get_breaker(f"llm:{labels['llm_provider']}")
+        self.policy = load_policy("llm_timeout")
+        self.first_token_timeout = resilience_cfg.get("first_token_timeout") or None
+        self.stream_idle_timeout = resilience_cfg.get("stream_idle_timeout") or None
+        self.hedge_prompts = set(resilience_cfg.get("hedge_prompts", []))
+        self.hedge_delay = resilience_cfg.get("hedge_delay", 1.5)
+        self._retries = LLM_RETRIES.labels(**labels)
+
+    @property
+    def name(self) -> dict:
+        return self.adapter.name
+
+    def __getattr__(self, attr: str) -> Any:
+        # 平台特有的属性（model、supports_format_output 等）沿用内层适配器
+        if attr == "adapter":
+            raise AttributeError(attr)
+        return getattr(self.adapter, attr)
+
+    def _on_retry(self, error: BaseException):
+        self._retries.inc()
+
+    async def _call(self, call) -> Any:
+        prompt = current_prompt.get()
+        if prompt in self.hedge_prompts:
+            on_hedge = HEDGED_REQUESTS.labels(prompt=prompt).inc
+            call = functools.partial(hedged, call, self.hedge_delay, on_hedge)
+        return await retry_async(call, self.policy, self.breaker, self._on_retry)
+
+    def chat(
+        self,
+        messages: Messages,
+        format: str | None = None,
+        max_tokens: int = 2048,
+        temperature: float = 0.5,
+        **kwargs,
+    ) -> str | None:
+        # 部分适配器会在 messages 末尾追加前缀消息，每次尝试使用副本
+        return retry_sync(
+            lambda: self.adapter.chat(
+                list(messages), format, max_tokens, temperature, **kwargs
+            ),
+            self.policy,
+            self.breaker,
+            self._on_retry,
+        )
+
+    async def async_chat(
+        self,
+        messages: Messages,
+        format: str | None = None,
+        max_tokens: int = 2048,
+        temperature: float = 0.5,
+        **kwargs,
+    ) -> str | None:
+        return await self._call(
+            lambda: self.adapter.async_chat(
+                list(messages), format, max_tokens, temperature, **kwargs
+            )
+        )
+
+    def call(
+        self,
+        prompt: str,
+        format: str | None = None,
+        max_tokens: int = 2048,
+        temperature: float = 0.5,
+    ) -> str | None:
+        return retry_sync(
+            lambda: self.adapter.call(prompt, format, max_tokens, temperature),
+            self.policy,
+            self.breaker,
+            self._on_retry,
+        )
+
+    async def async_call(
+        self,
+        prompt: str,
+        format: str | None = None,
+        max_tokens: int = 2048,
+        temperature: float = 0.5,
+    ) -> str | None:
+        return await self._call(
+            lambda: self.adapter.async_call(prompt, format, max_tokens, temperature)
+        )
+
+    def stream_chat(
+        self,
+        messages: Messages,
+        format: str | None = None,
+        max_tokens: int = 2048,
+        temperature: float = 0.5,
+        **kwargs,
+    ) -> Iterator[str]:
+        return self.adapter.stream_chat(
+            messages, format, max_tokens, temperature, **kwargs
+        )
+
+    async def async_stream_chat(
+        self,
+        messages: Messages,
+        format: str | None = None,
+        max_tokens: int = 2048,
+        temperature: float = 0.5,
+        **kwargs,
+    ) -> AsyncGenerator[str, None]:
+        return self._stream(messages, format, max_tokens, temperature, **kwargs)
+
+    async def _open_stream(
+        self, messages: Messages, *args, **kwargs
+    ) -> tuple[AsyncIterator[str], str | None]:
+        """发起流式调用并取到首个 chunk（流为空时为 None）"""
+        stream = self.adapter.async_stream_chat(list(messages), *args, **kwargs)
+        if inspect.isawaitable(stream):
+            stream = await stream
+        iterator = aiter(stream)
+        try:
+            first = await anext(iterator, None)
+        except BaseException:
+            aclose = getattr(iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
+            raise
+        return iterator, first
+
+    async def _stream(self, messages: Messages, *args, **kwargs) -> AsyncIterator[str]:
+        # 首 token 之前的失败按非流式调用的方式重试
+        policy = dataclasses.replace(self.policy, timeout=self.first_token_timeout)
+        iterator, first = await retry_async(
+            lambda: self._open_stream(messages, *args, **kwargs),
+            policy,
+            self.breaker,
+            self._on_retry,
+        )
+        if first is None:
+            return
+
+        try:
+            yield first
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(
+                        anext(iterator), self.stream_idle_timeout
+                    )
+                except StopAsyncIteration:
+                    break
+                except Exception as e:
+                    if is_retryable(e):
+                        self.breaker.record_failure()
+                    raise
+                yield chunk
+        finally:
+            aclose = getattr(iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
@@ -0,0 +1,271 @@
+from collections import deque
+from typing import Any, AsyncGenerator, AsyncIterator, Callable, Iterator
+import inspect
+import logging
+import random
+import threading
+import time
+
+from .BaseChatAdapter import BaseChatAdapter, Messages
+from ..limiter import LLMOverloadedError
+from ..usage import adapter_labels
+from src.metrics import ROUTER_FAILOVERS, ROUTER_SELECTIONS
+from src.resilience import CircuitBreaker, CircuitOpenError, is_retryable
+
+from config import llm_router_cfg
+
+
+logger = logging.getLogger(__name__)
+
+# 调用未发出即失败（熔断中、排队已满），直接切换
+FAILOVER_ERRORS = (CircuitOpenError, LLMOverloadedError)
+
+
+class ProviderStats:
+    """单个 provider 最近 window 次调用的耗时与成败（非流式与流式首 token 分开统计）"""
+
+    def __init__(self, window: int = llm_router_cfg.get("window", 50)):
+        self._lock = threading.Lock()
+        self.outcomes: deque[bool] = deque(maxlen=window)
+        self.latency: deque[float] = deque(maxlen=window)  # 非流式调用耗时
+        self.first_token: deque[float] = deque(maxlen=window)  # 流式首 token 延迟
+
+    def record(self, ok: bool, seconds: float | None = None, stream: bool = False):
+        with self._lock:
+            self.outcomes.append(ok)
+            if ok and seconds is not None:
+                (self.first_token if stream else self.latency).append(seconds)
+
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self.outcomes:
+                return 0.0
+            return 1 - sum(self.outcomes) / len(self.outcomes)
+
+    def samples(self) -> int:
+        return len(self.outcomes)
+
+    def mean_latency(self, stream: bool = False) -> float:
+        """没有样本时为 0，新加入的 provider 会先被尝试"""
+        with self._lock:
+            values = self.first_token if stream else self.latency
+            return sum(values) / len(values) if values else 0.0
+
+
+class RoutingChatAdapter(BaseChatAdapter, trace=False):
+    """在多个 provider 之间路由的适配器，由 get_llm(llm_provider="router") 创建
+
+    - 每次调用按最近的耗时（流式按首 token 延迟）选择最快的健康 provider；
+      熔断中或错误率超过 max_error_rate 的 provider 排在最后，只在其余都失败时使用
+    - 以 explore_ratio 的概率先尝试随机的健康 provider，保持各 provider 的统计更新
+    - 可重试的错误（超时、限流、5xx、熔断、排队已满）切换到下一个 provider；
+      流式调用在首 token 之前失败时切换，之后的错误直接抛出
+    - 各 provider 的适配器自带超时、重试与熔断（ResilientChatAdapter）
+    """
+
+    def __init__(self, route: str, adapters: list[BaseChatAdapter]):
+        if not adapters:
+            raise ValueError(f"LLM route '{route}' has no available provider")
+        self.route = route
+        self.adapters = adapters
+        self.stats = [ProviderStats() for _ in adapters]
+        self.supports_streaming = any(a.supports_streaming for a in adapters)
+        self.supports_async = True
+
+        self.min_samples = llm_router_cfg.get("min_samples", 5)
+        self.max_error_rate = llm_router_cfg.get("max_error_rate", 0.5)
+        self.explore_ratio = llm_router_cfg.get("explore_ratio", 0.05)
+
+    @property
+    def name(self) -> dict:
+        return {"llm_provider": "router", "model": self.route}
+
+    def _healthy(self, index: int) -> bool:
+        breaker = getattr(self.adapters[index], "breaker", None)
+        if isinstance(breaker, CircuitBreaker) and breaker.state == breaker.OPEN:
+            return False
+        stats = self.stats[index]
+        return (
+            stats.samples() < self.min_samples
+            or stats.error_rate() <= self.max_error_rate
+        )
+
+    def candidates(self, stream: bool = False) -> list[int]:
+        """本次调用尝试 provider 的顺序（adapters 的下标）"""
+        indexes = range(len(self.adapters))
+        if stream:
+            indexes = [i for i in indexes if self.adapters[i].supports_streaming]
+        healthy = [i for i in indexes if self._healthy(i)]
+        unhealthy = [i for i in indexes if i not in healthy]
+
+        healthy.sort(key=lambda i: self.stats[i].mean_latency(stream))
+        if len(healthy) > 1 and random.random() < self.explore_ratio:
+            healthy.insert(0, healthy.pop(random.randrange(1, len(healthy))))
+        return healthy + unhealthy
+
+    def _selected(self, index: int):
+        ROUTER_SELECTIONS.labels(
+            route=self.route, **adapter_labels(self.adapters[index])
+        ).inc()
+
+    def _failover(self, index: int, error: BaseException):
+        labels = adapter_labels(self.adapters[index])
+        ROUTER_FAILOVERS.labels(route=self.route, **labels).inc()
+        logger.warning(
+            f"LLM route '{self.route}': {labels['llm_provider']}:{labels['model']} "
+            f"failed ({type(error).__name__}: {error}), failing over"
+        )
+
+    @staticmethod
+    def _should_failover(error: BaseException) -> bool:
+        return isinstance(error, FAILOVER_ERRORS) or is_retryable(error)
+
+    def _route_sync(self, call: Callable[[BaseChatAdapter], Any]) -> Any:
+        order = self.candidates()
+        for position, index in enumerate(order):
+            self._selected(index)
+            start = time.perf_counter()
+            try:
+                result = call(self.adapters[index])
+            except Exception as e:
+                self.stats[index].record(False)
+                if position == len(order) - 1 or not self._should_failover(e):
+                    raise
+                self._failover(index, e)
+                continue
+            self.stats[index].record(True, time.perf_counter() - start)
+            return result
+
+    async def _route_async(self, call: Callable[[BaseChatAdapter], Any]) -> Any:
+        order = self.candidates()
+        for position, index in enumerate(order):
+            self._selected(index)
+            start = time.perf_counter()
+            try:
+                result = await call(self.adapters[index])
+            except Exception as e:
+                self.stats[index].record(False)
+                if position == len(order) - 1 or not self._should_failover(e):
+                    raise
+                self._failover(index, e)
+                continue
+            self.stats[index].record(True, time.perf_counter() - start)
+            return result
+
+    def chat(
+        self,
+        messages: Messages,
+        format: str | None = None,
+        max_tokens: int = 2048,
+        temperature: float = 0.5,
+        **kwargs,
+    ) -> str | None:
+        return self._route_sync(
+            lambda adapter: adapter.chat(
+                list(messages), format, max_tokens, temperature, **kwargs
+            )
+        )
+
+    async def async_chat(
+        self,
+        messages: Messages,
+        format: str | None = None,
+        max_tokens: int = 2048,
+        temperature: float = 0.5,
+        **kwargs,
+    ) -> str | None:
+        return await self._route_async(
+            lambda adapter: adapter.async_chat(
+                list(messages), format, max_tokens, temperature, **kwargs
+            )
+        )
+
+    def call(
+        self,
+        prompt: str,
+        format: str | None = None,
+        max_tokens: int = 2048,
+        temperature: float = 0.5,
+    ) -> str | None:
+        return self._route_sync(
+            lambda adapter: adapter.call(prompt, format, max_tokens, temperature)
+        )
+
+    async def async_call(
+        self,
+        prompt: str,
+        format: str | None = None,
+        max_tokens: int = 2048,
+        temperature: float = 0.5,
+    ) -> str | None:
+        return await self._route_async(
+            lambda adapter: adapter.async_call(prompt, format, max_tokens, temperature)
+        )
+
+    def stream_chat(
+        self,
+        messages: Messages,
+        format: str | None = None,
+        max_tokens: int = 2048,
+        temperature: float = 0.5,
+        **kwargs,
+    ) -> Iterator[str]:
+        index = self.candidates(stream=True)[0]
+        self._selected(index)
+        return self.adapters[index].stream_chat(
+            messages, format, max_tokens, temperature, **kwargs
+        )
+
+    async def async_stream_chat(
+        self,
+        messages: Messages,
+        format: str | None = None,
+        max_tokens: int = 2048,
+        temperature: float = 0.5,
+        **kwargs,
+    ) -> AsyncGenerator[str, None]:
+        return self._stream(messages, format, max_tokens, temperature, **kwargs)
+
+    async def _stream(self, messages: Messages, *args, **kwargs) -> AsyncIterator[str]:
+        order = self.candidates(stream=True)
+        if not order:
+            raise NotImplementedError(f"{self.name} does not support async streaming")
+
+        for position, index in enumerate(order):
+            self._selected(index)
+            start = time.perf_counter()
+            stream = None
+            try:
+                stream = self.adapters[index].async_stream_chat(
+                    list(messages), *args, **kwargs
+                )
+                if inspect.isawaitable(stream):
+                    stream = await stream
+                iterator = aiter(stream)
+                first = await anext(iterator, None)
+            except Exception as e:
+                # 首 token 之前失败：切换到下一个 provider
+                self.stats[index].record(False)
+                aclose = getattr(stream, "aclose", None)
+                if aclose is not None:
+                    await aclose()
+                if position == len(order) - 1 or not self._should_failover(e):
+                    raise
+                self._failover(index, e)
+                continue
+
+            self.stats[index].record(True, time.perf_counter() - start, stream=True)
+            if first is None:
+                return
+            try:
+                yield first
+                async for chunk in iterator:
+                    yield chunk
+            except Exception:
+                self.stats[index].record(False)
+                raise
+            finally:
+                aclose = getattr(iterator, "aclose", None)
+                if aclose is not None:
+                    await aclose()
+            return
@@ -1,28 +1,71 @@
 from typing import Dict
+import logging
+
 from .adapter.DeepseekChatAdapter import DeepseekChatAdapter
 from .adapter.BaseChatAdapter import BaseChatAdapter
 from .adapter.BailianChatAdapter import BailianChatAdapter
+from .adapter.LimitedChatAdapter import LimitedChatAdapter
+from .adapter.LocalChatAdapter import LocalChatAdapter
+from .adapter.OpenaiChatAdapter import OpenaiChatAdapter
+from .adapter.ResilientChatAdapter import ResilientChatAdapter
+from .adapter.RoutingChatAdapter import RoutingChatAdapter
+
+from config import llm_limiter_cfg, llm_router_cfg, resilience_cfg
 
 
+logger = logging.getLogger(__name__)
+
 _instances: Dict[str, BaseChatAdapter] = {}
 
 
 def get_llm(
     llm_provider: str, model: str, api_key: str | None = None
 ) -> BaseChatAdapter:
-    """获取或创建指定 LLM 的单例实例"""
+    """获取或创建指定 LLM 的单例实例，启用 [tool.resilience] 时包装超时、重试与熔断，
+    启用 [tool.llm_limiter] 时在最外层包装按 provider 与优先级的准入控制
+
+    llm_provider = "router" 时 model 为 [tool.llm_router.routes] 中的路由名
+    """
     key = f"{llm_provider}:{model}" if model else llm_provider  # 支持多模型缓存
     if key not in _instances:
+        if llm_provider == "router":
+            # 各 provider 的适配器已经过包装，路由适配器本身不再包装
+            _instances[key] = _create_router(model or "default")
+            return _instances[key]
+
+        adapter: BaseChatAdapter
         if llm_provider == "deepseek":
-            _instances[key] = DeepseekChatAdapter(
+            adapter = DeepseekChatAdapter(
                 api_key=api_key, model=model or "deepseek-chat"
             )
         elif llm_provider == "openai":
-            raise NotImplementedError("OpenAI adapter not added yet")
+            adapter = OpenaiChatAdapter(api_key=api_key, model=model or "gpt-4o-mini")
         elif llm_provider == "bailian":
-            _instances[key] = BailianChatAdapter(
+            adapter = BailianChatAdapter(
                 api_key=api_key, model=model or "deepseek-chat"
             )
+        elif llm_provider == "local":
+            # 本地替身模型，离线压测用
+            adapter = LocalChatAdapter(model=model or "local-chat")
         else:
             raise ValueError(f"Unknown LLM provider name: {llm_provider}")
+        if resilience_cfg.get("enabled", True):
+            adapter = ResilientChatAdapter(adapter)
+        if llm_limiter_cfg.get("enabled", True):
+            adapter = LimitedChatAdapter(adapter)
+        _instances[key] = adapter
     return _instances[key]
+
+
+def _create_router(route: str) -> RoutingChatAdapter:
+    routes = llm_router_cfg.get("routes", {})
+    if route not in routes:
+        raise ValueError(f"Unknown LLM route: {route}")
+    adapters = []
+    for llm_provider, model in routes[route]:
+        try:
+            adapters.append(get_llm(llm_provider, model))
+        except ValueError as e:
+            # 未配置 API key 的 provider 不参与路由
+            logger.warning(f"LLM route '{route}' skips {llm_provider}:{model}: {e}")
+    return RoutingChatAdapter(route, adapters)
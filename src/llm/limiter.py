@@ -0,0 +1,219 @@
+"""上游 LLM 调用的准入控制：按 provider 的并发上限与令牌桶限速，按优先级排队
+
+- 优先级（[tool.llm_limiter] priorities，从高到低）：interactive（对话回答）>
+  retrieval（改写、路由、重排等检索辅助调用）> background（记忆摘要、标题等后台任务）
+- 调用的优先级由 prompt 名称决定（[tool.llm_limiter.prompts]），未列出的使用 default_priority
+- 有空闲并发与令牌时立即放行，否则按优先级排队；每个优先级最多占用 share 比例的并发，
+  后台任务不会占满 provider 的并发
+- 排队数超过 max_queue 或排队超过 max_wait 秒时抛出 LLMOverloadedError，/chat-stream 返回 503
+- 限制按进程生效（API 进程与 worker 进程各自计数），只作用于异步调用
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+
+from src.metrics import (
+    LLM_ADMISSION_REJECTED,
+    LLM_IN_FLIGHT,
+    LLM_QUEUE_DEPTH,
+    LLM_QUEUE_WAIT,
+)
+
+from config import llm_limiter_cfg
+
+
+PRIORITIES: list[str] = llm_limiter_cfg.get(
+    "priorities", ["interactive", "retrieval", "background"]
+)
+_prompt_priority: dict[str, str] = llm_limiter_cfg.get("prompts", {})
+
+
+def prompt_priority(prompt: str) -> str:
+    """prompt 名称对应的优先级"""
+    return _prompt_priority.get(
+        prompt, llm_limiter_cfg.get("default_priority", "retrieval")
+    )
+
+
+class LLMOverloadedError(RuntimeError):
+    """排队已满或排队超时，调用未发出"""
+
+    def __init__(self, provider: str, priority: str, reason: str, retry_after: float):
+        super().__init__(
+            f"LLM provider '{provider}' is overloaded ({priority}: {reason}), "
+            f"retry in {retry_after:.0f}s"
+        )
+        self.provider = provider
+        self.priority = priority
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class ProviderLimiter:
+    """单个 provider 的并发与速率限制
+
+    max_concurrency：同时在途的调用数（流式调用持续到流结束）
+    rate / burst：令牌桶，每秒补充 rate 个令牌、最多积累 burst 个，每次调用消耗一个；
+    rate = 0 为不限速
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        max_concurrency: int = 16,
+        rate: float = 0,
+        burst: int = 0,
+    ):
+        self.provider = provider
+        self.max_concurrency = max_concurrency
+        self.rate = rate
+        self.burst = max(burst, 1)
+
+        classes = llm_limiter_cfg.get("classes", {})
+        self.limits = {
+            p: max(1, math.floor(max_concurrency * classes.get(p, {}).get("share", 1)))
+            for p in PRIORITIES
+        }
+        self.max_queue = {
+            p: classes.get(p, {}).get("max_queue", 100) for p in PRIORITIES
+        }
+        self.max_wait = {p: classes.get(p, {}).get("max_wait", 10) for p in PRIORITIES}
+        self.retry_after = llm_limiter_cfg.get("retry_after", 5)
+
+        self.in_flight = dict.fromkeys(PRIORITIES, 0)
+        self.queues: dict[str, deque[asyncio.Future]] = {p: deque() for p in PRIORITIES}
+        self._tokens = float(self.burst)
+        self._refilled_at = time.monotonic()
+        self._timer: asyncio.TimerHandle | None = None
+
+    def _can_start(self, priority: str) -> bool:
+        return (
+            sum(self.in_flight.values()) < self.max_concurrency
+            and self.in_flight[priority] < self.limits[priority]
+        )
+
+    def _take_token(self) -> bool:
+        if not self.rate:
+            return True
+        now = time.monotonic()
+        self._tokens = min(
+            self.burst, self._tokens + (now - self._refilled_at) * self.rate
+        )
+        self._refilled_at = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    def _start(self, priority: str):
+        self.in_flight[priority] += 1
+        LLM_IN_FLIGHT.labels(llm_provider=self.provider, priority=priority).inc()
+
+    def _set_depth(self, priority: str):
+        LLM_QUEUE_DEPTH.labels(llm_provider=self.provider, priority=priority).set(
+            len(self.queues[priority])
+        )
+
+    def _schedule(self):
+        """令牌不足时，等到下一个令牌补充后再分配"""
+        loop = asyncio.get_running_loop()
+        if self._timer is not None and not self._timer.cancelled():
+            if self._timer.when() >= loop.time():
+                return
+        wait = (1 - self._tokens) / self.rate
+        self._timer = loop.call_later(wait, self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        self._dispatch()
+
+    def _dispatch(self):
+        """按优先级把空闲的并发与令牌分配给排队的调用"""
+        for priority in PRIORITIES:
+            queue = self.queues[priority]
+            while queue and self._can_start(priority):
+                if queue[0].done():
+                    # 已超时或被取消
+                    queue.popleft()
+                    continue
+                if not self._take_token():
+                    self._set_depth(priority)
+                    self._schedule()
+                    return
+                self._start(priority)
+                queue.popleft().set_result(None)
+            self._set_depth(priority)
+
+    async def acquire(self, priority: str):
+        """获取一个调用名额，排队已满或超时时抛出 LLMOverloadedError"""
+        wait_time = LLM_QUEUE_WAIT.labels(llm_provider=self.provider, priority=priority)
+        # 同级或更高优先级有排队时不插队
+        higher = PRIORITIES[: PRIORITIES.index(priority) + 1]
+        if (
+            not any(self.queues[p] for p in higher)
+            and self._can_start(priority)
+            and self._take_token()
+        ):
+            self._start(priority)
+            wait_time.observe(0)
+            return
+
+        queue = self.queues[priority]
+        if len(queue) >= self.max_queue[priority]:
+            self._reject(priority, "queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        queue.append(waiter)
+        self._set_depth(priority)
+        start = time.perf_counter()
+        self._dispatch()
+        try:
+            # wait 不会取消 waiter，超时与被取消时由 _abandon 处理
+            await asyncio.wait([waiter], timeout=self.max_wait[priority])
+        except BaseException:
+            self._abandon(priority, waiter)
+            raise
+        if not waiter.done():
+            self._abandon(priority, waiter)
+            self._reject(priority, "timeout")
+        wait_time.observe(time.perf_counter() - start)
+
+    def _abandon(self, priority: str, waiter: asyncio.Future):
+        if waiter.done() and not waiter.cancelled():
+            # 已分配到名额
+            self.release(priority)
+            return
+        waiter.cancel()
+        try:
+            self.queues[priority].remove(waiter)
+        except ValueError:
+            pass
+        self._set_depth(priority)
+
+    def _reject(self, priority: str, reason: str):
+        LLM_ADMISSION_REJECTED.labels(
+            llm_provider=self.provider, priority=priority, reason=reason
+        ).inc()
+        raise LLMOverloadedError(self.provider, priority, reason, self.retry_after)
+
+    def release(self, priority: str):
+        self.in_flight[priority] -= 1
+        LLM_IN_FLIGHT.labels(llm_provider=self.provider, priority=priority).dec()
+        self._dispatch()
+
+
+_limiters: dict[str, ProviderLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(provider: str) -> ProviderLimiter:
+    """获取或创建指定 provider 的限制器单例，未配置的 provider 使用 providers.default"""
+    with _limiters_lock:
+        if provider not in _limiters:
+            providers = llm_limiter_cfg.get("providers", {})
+            options = providers.get(provider, providers.get("default", {}))
+            _limiters[provider] = ProviderLimiter(provider, **options)
+        return _limiters[provider]
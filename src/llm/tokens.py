@@ -0,0 +1,29 @@
+"""粗略的 token 估算，不依赖具体模型的分词器，用于限制 prompt 的输入长度"""
+
+import math
+import re
+
+
+# 中日韩文字与全角标点约 1 个 token / 字
+_CJK = re.compile(r"[　-〿㐀-䶿一-鿿가-힯＀-￯]")
+
+
+def estimate_tokens(text: str) -> int:
+    """中日韩字符按 1 个 token / 字，其余按 4 个字符 / token 估算"""
+    cjk = len(_CJK.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """保留开头约 max_tokens 个 token，截断时末尾加 "…" """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    # 二分查找满足上限的最长前缀
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if estimate_tokens(text[:mid]) <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    return text[:low] + "…"
@@ -0,0 +1,81 @@
+"""LLM token 用量上报：适配器拿到响应中的 usage 后调用 record_usage
+
+用量计入 Prometheus 指标，并按 prompt 与归属（用户 / 会话 / 知识库）写入 usage_recorder。
+归属由调用方用 usage_context() 设置；流式调用在 llm_chat_stream 中捕获，
+消费流时重新进入，流结束时上报的用量仍归属于发起调用的请求。
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+
+from src.metrics import LLM_TOKENS
+from src.usage import usage_recorder
+
+
+# 当前调用的 prompt 名称（PROMPT_REGISTRY 的 key），由 llm_call / llm_chat_stream 设置
+current_prompt: ContextVar[str] = ContextVar("current_prompt", default="unknown")
+# 用量归属：user_id / session_id / knowledge_base_id
+current_attribution: ContextVar[dict[str, str] | None] = ContextVar(
+    "current_attribution", default=None
+)
+
+
+@contextmanager
+def usage_context(prompt: str | None = None, **attribution: str | None) -> Iterator:
+    """设置上下文内 LLM 调用的 prompt 与归属，未给出的字段沿用外层设置"""
+    prompt_token = current_prompt.set(prompt) if prompt else None
+    attribution_token = current_attribution.set(
+        {
+            **(current_attribution.get() or {}),
+            **{key: value or "" for key, value in attribution.items()},
+        }
+    )
+    try:
+        yield
+    finally:
+        current_attribution.reset(attribution_token)
+        if prompt_token is not None:
+            current_prompt.reset(prompt_token)
+
+
+def adapter_labels(adapter: Any) -> dict[str, str]:
+    """适配器的 provider / model 标签（部分适配器的 name 只是平台名字符串）"""
+    name = adapter.name
+    if isinstance(name, dict):
+        return {
+            "llm_provider": str(name.get("llm_provider", "")),
+            "model": str(name.get("model", "")),
+        }
+    return {"llm_provider": str(name), "model": ""}
+
+
+def record_usage(
+    adapter: Any, input_tokens: int, output_tokens: int, prompt: str | None = None
+):
+    labels = adapter_labels(adapter)
+    prompt = prompt or current_prompt.get()
+    LLM_TOKENS.labels(prompt=prompt, direction="input", **labels).inc(input_tokens)
+    LLM_TOKENS.labels(prompt=prompt, direction="output", **labels).inc(output_tokens)
+    usage_recorder.record(
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        prompt=prompt,
+        **labels,
+        **(current_attribution.get() or {}),
+    )
+
+
+def record_completion_usage(adapter: Any, usage: Any, prompt: str | None = None):
+    """OpenAI 兼容接口的 CompletionUsage（prompt_tokens / completion_tokens）
+
+    流式调用需要 stream_options={"include_usage": True}，usage 在最后一个 chunk 中。
+    """
+    if usage is None:
+        return
+    record_usage(
+        adapter,
+        getattr(usage, "prompt_tokens", 0) or 0,
+        getattr(usage, "completion_tokens", 0) or 0,
+        prompt,
+    )
@@ -0,0 +1,55 @@
+from .prometheus import (
+    ACTIVE_STREAMS,
+    BUDGET_DECISIONS,
+    CACHE_REQUESTS,
+    CIRCUIT_STATE,
+    EMBEDDING_BATCH_REQUESTS,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_CALLS,
+    EMBEDDING_LATENCY,
+    HEDGED_REQUESTS,
+    LLM_ADMISSION_REJECTED,
+    LLM_CALLS,
+    LLM_ERRORS,
+    LLM_FIRST_TOKEN,
+    LLM_IN_FLIGHT,
+    LLM_LATENCY,
+    LLM_QUEUE_DEPTH,
+    LLM_QUEUE_WAIT,
+    LLM_RETRIES,
+    LLM_TOKENS,
+    RETRIEVER_LATENCY,
+    ROUTER_FAILOVERS,
+    ROUTER_SELECTIONS,
+    export,
+    record_cache,
+    timed,
+)
+
+__all__ = [
+    "ACTIVE_STREAMS",
+    "BUDGET_DECISIONS",
+    "CACHE_REQUESTS",
+    "CIRCUIT_STATE",
+    "EMBEDDING_BATCH_REQUESTS",
+    "EMBEDDING_BATCH_SIZE",
+    "EMBEDDING_CALLS",
+    "EMBEDDING_LATENCY",
+    "HEDGED_REQUESTS",
+    "LLM_ADMISSION_REJECTED",
+    "LLM_CALLS",
+    "LLM_ERRORS",
+    "LLM_FIRST_TOKEN",
+    "LLM_IN_FLIGHT",
+    "LLM_LATENCY",
+    "LLM_QUEUE_DEPTH",
+    "LLM_QUEUE_WAIT",
+    "LLM_RETRIES",
+    "LLM_TOKENS",
+    "RETRIEVER_LATENCY",
+    "ROUTER_FAILOVERS",
+    "ROUTER_SELECTIONS",
+    "export",
+    "record_cache",
+    "timed",
+]
@@ -0,0 +1,185 @@
+"""Prometheus 指标：LLM / embedding / 检索用量与延迟，缓存命中，进行中的流式响应
+
+指标注册在 prometheus_client 的默认 registry 中，由 GET /metrics 导出。
+多个 uvicorn worker 时每个进程各自计数（需要时使用 prometheus_client 的 multiprocess 模式）。
+"""
+
+import functools
+import inspect
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+
+# LLM 调用延迟跨度大（几百毫秒到几十秒）
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32, 64)
+# 检索与 embedding 以毫秒级为主
+FAST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+
+LLM_CALLS = Counter(
+    "llm_calls_total",
+    "LLM 调用次数（按 PROMPT_REGISTRY 中的 prompt 名称）",
+    ["prompt", "status"],
+)
+LLM_LATENCY = Histogram(
+    "llm_call_duration_seconds",
+    "llm_call 耗时；流式调用为整个流的耗时",
+    ["prompt"],
+    buckets=LLM_BUCKETS,
+)
+LLM_FIRST_TOKEN = Histogram(
+    "llm_stream_first_token_seconds",
+    "流式调用的首 token 延迟",
+    ["prompt"],
+    buckets=LLM_BUCKETS,
+)
+LLM_ERRORS = Counter(
+    "llm_errors_total",
+    "LLM 调用失败次数（按异常类型）",
+    ["prompt", "error"],
+)
+LLM_RETRIES = Counter(
+    "llm_retries_total",
+    "LLM / embedding 调用重试次数",
+    ["llm_provider", "model"],
+)
+HEDGED_REQUESTS = Counter(
+    "llm_hedged_requests_total",
+    "超过 hedge_delay 未返回而发出的对冲请求数",
+    ["prompt"],
+)
+CIRCUIT_STATE = Gauge(
+    "upstream_circuit_state",
+    "上游熔断器状态：0 closed, 1 open, 2 half_open",
+    ["breaker"],
+)
+ROUTER_SELECTIONS = Counter(
+    "llm_router_selections_total",
+    "路由适配器选择各 provider 发起调用的次数（含故障切换后的调用）",
+    ["route", "llm_provider", "model"],
+)
+LLM_QUEUE_DEPTH = Gauge(
+    "llm_queue_depth",
+    "等待 provider 准入名额的 LLM 调用数",
+    ["llm_provider", "priority"],
+)
+LLM_IN_FLIGHT = Gauge(
+    "llm_in_flight",
+    "已获得准入名额、进行中的 LLM 调用数",
+    ["llm_provider", "priority"],
+)
+LLM_QUEUE_WAIT = Histogram(
+    "llm_queue_wait_seconds",
+    "LLM 调用的排队时间",
+    ["llm_provider", "priority"],
+    buckets=LLM_BUCKETS,
+)
+LLM_ADMISSION_REJECTED = Counter(
+    "llm_admission_rejected_total",
+    "排队已满（queue_full）或排队超时（timeout）被拒绝的 LLM 调用数",
+    ["llm_provider", "priority", "reason"],
+)
+ROUTER_FAILOVERS = Counter(
+    "llm_router_failovers_total",
+    "路由适配器因该 provider 失败而切换到下一个 provider 的次数",
+    ["route", "llm_provider", "model"],
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total",
+    "LLM token 用量（direction = input / output）",
+    ["prompt", "llm_provider", "model", "direction"],
+)
+BUDGET_DECISIONS = Counter(
+    "llm_budget_decisions_total",
+    "用户 / 知识库预算检查结果（allow / downgrade / reject）",
+    ["action"],
+)
+
+EMBEDDING_CALLS = Counter(
+    "embedding_calls_total",
+    "embedding 接口调用次数",
+    ["model", "status"],
+)
+EMBEDDING_LATENCY = Histogram(
+    "embedding_call_duration_seconds",
+    "embedding 接口调用耗时",
+    ["model"],
+    buckets=FAST_BUCKETS,
+)
+EMBEDDING_BATCH_SIZE = Histogram(
+    "embedding_batch_size",
+    "单次 embedding 调用的文本数",
+    ["model"],
+    buckets=(1, 2, 4, 8, 10, 16, 32, 64, 128, 256),
+)
+EMBEDDING_BATCH_REQUESTS = Histogram(
+    "embedding_batch_requests",
+    "合并（micro-batching）后单次 embedding 调用包含的请求数",
+    ["model"],
+    buckets=(1, 2, 3, 4, 6, 8, 10),
+)
+
+RETRIEVER_LATENCY = Histogram(
+    "retriever_duration_seconds",
+    "检索器耗时（按检索器类型与方法）",
+    ["retriever", "method"],
+    buckets=FAST_BUCKETS,
+)
+
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "缓存查询次数，命中率 = hit / (hit + miss)",
+    ["cache", "result"],
+)
+
+ACTIVE_STREAMS = Gauge(
+    "chat_active_streams",
+    "进行中的 /chat-stream 流式响应数",
+)
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def timed(histogram: Histogram, **labels: str):
+    """记录同步 / 异步函数耗时到 histogram"""
+
+    def decorator(func):
+        observe = histogram.labels(**labels).observe
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    observe(time.perf_counter() - start)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+def export() -> tuple[bytes, str]:
+    """返回 (文本格式的全部指标, Content-Type)"""
+    return generate_latest(), CONTENT_TYPE_LATEST
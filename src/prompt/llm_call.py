@@ -1,5 +1,21 @@
+import inspect
+import time
+from typing import AsyncIterator
+
 from .PromptConfig import PROMPT_REGISTRY
 from src.llm import BaseChatAdapter
+from src.llm.usage import current_attribution, usage_context
+from src.metrics import LLM_CALLS, LLM_ERRORS, LLM_FIRST_TOKEN, LLM_LATENCY
+from src.tracing import span
+
+
+def record_call(prompt_name: str, seconds: float, error: BaseException | None):
+    LLM_LATENCY.labels(prompt=prompt_name).observe(seconds)
+    if error is None:
+        LLM_CALLS.labels(prompt=prompt_name, status="ok").inc()
+    else:
+        LLM_CALLS.labels(prompt=prompt_name, status="error").inc()
+        LLM_ERRORS.labels(prompt=prompt_name, error=type(error).__name__).inc()
 
 
 async def llm_call(prompt_name: str, llm: BaseChatAdapter, args: dict):
@@ -8,23 +24,32 @@ async def llm_call(prompt_name: str, llm: BaseChatAdapter, args: dict):
 
     cfg = PROMPT_REGISTRY[prompt_name]
 
-    # 1. 构建 prompt
-    prompt_text = cfg.input_builder(args)
+    start = time.perf_counter()
+    try:
+        with usage_context(prompt_name), span(
+            f"llm_call.{prompt_name}", prompt=prompt_name
+        ):
+            # 1. 构建 prompt
+            prompt_text = cfg.input_builder(args)
 
-    # 2. 调用 LLM
-    response = await llm.async_call(
-        prompt_text,
-        **cfg.llm_args,
-    )
-    if not response:
-        raise RuntimeError("LLM 调用失败")
+            # 2. 调用 LLM
+            response = await llm.async_call(
+                prompt_text,
+                **cfg.llm_args,
+            )
+            if not response:
+                raise RuntimeError("LLM 调用失败")
 
-    # 3. 解析输出
-    try:
-        output = cfg.output_parser(response)
+            # 3. 解析输出
+            try:
+                output = cfg.output_parser(response)
+            except Exception as e:
+                raise RuntimeError(f"LLM 输出解析失败: {str(e)}") from e
     except Exception as e:
-        raise RuntimeError(f"LLM 输出解析失败: {str(e)}") from e
+        record_call(prompt_name, time.perf_counter() - start, e)
+        raise
 
+    record_call(prompt_name, time.perf_counter() - start, None)
     return output
     # return cfg.output_parser(response)
 
@@ -41,7 +66,50 @@ async def llm_chat_stream(
     prompt_text = cfg.input_builder(args)
 
     # 2. 调用 LLM 流式接口
-    return llm.async_stream_chat(
-        messages + [{"role": "user", "content": prompt_text}],
-        **cfg.llm_args,
-    )
+    start = time.perf_counter()
+    # 流在响应阶段才被消费，此时调用方设置的归属已经退出，先记下
+    attribution = current_attribution.get() or {}
+    try:
+        with usage_context(prompt_name):
+            stream = llm.async_stream_chat(
+                messages + [{"role": "user", "content": prompt_text}],
+                **cfg.llm_args,
+            )
+            if inspect.isawaitable(stream):
+                stream = await stream
+    except Exception as e:
+        record_call(prompt_name, time.perf_counter() - start, e)
+        raise
+
+    return observe_stream(prompt_name, stream, start, attribution)
+
+
+async def observe_stream(
+    prompt_name: str,
+    stream: AsyncIterator[str],
+    start: float,
+    attribution: dict[str, str],
+) -> AsyncIterator[str]:
+    """记录流式调用的首 token 延迟、总耗时与失败
+
+    每次取 chunk 时重新进入发起调用时的 usage_context，流末尾上报的用量归属不变。
+    """
+    first = True
+    iterator = aiter(stream)
+    try:
+        while True:
+            with usage_context(prompt_name, **attribution):
+                try:
+                    chunk = await anext(iterator)
+                except StopAsyncIteration:
+                    break
+            if first:
+                LLM_FIRST_TOKEN.labels(prompt=prompt_name).observe(
+                    time.perf_counter() - start
+                )
+                first = False
+            yield chunk
+    except Exception as e:
+        record_call(prompt_name, time.perf_counter() - start, e)
+        raise
+    record_call(prompt_name, time.perf_counter() - start, None)
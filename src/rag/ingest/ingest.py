@@ -1,7 +1,12 @@
+import hashlib
+import json
 import os
 import pickle
 
-from src.rag.retriever import ChromaRetriever, BM25Retriever
+from langchain_core.documents import Document
+
+from src.rag.retriever import ChromaRetriever, BM25Retriever, ANNRetriever
+from src.rag.retriever.chroma_retriever.EmbeddingFunction import get_embedding_function
 from .text_splitter.get_chunks import get_chunks, get_chunks_from_messages
 
 from config import rag_cfg, memory_cfg
@@ -17,6 +22,73 @@ class IngestResult:
         self.num_chunks = num_chunks
 
 
+def get_retriever_classes(retriever_type: str) -> list:
+    """根据检索器类型获取需要入库的检索器类"""
+    if retriever_type == "vector":
+        return [ChromaRetriever]
+    elif retriever_type == "sparse":
+        return [BM25Retriever]
+    elif retriever_type == "hybrid":
+        return [ChromaRetriever, BM25Retriever]
+    elif retriever_type == "ann":
+        return [ANNRetriever]
+    elif retriever_type == "ann_hybrid":
+        return [ANNRetriever, BM25Retriever]
+    raise ValueError(f"Invalid retriever type: {retriever_type}")
+
+
+def compute_chunk_key(
+    file_hash: str,
+    chunk_size: int,
+    chunk_overlap: int,
+    split_method: str,
+) -> str:
+    """分块结果的内容地址：相同文件 + 相同切分配置得到相同分块"""
+    payload = json.dumps(
+        [file_hash, chunk_size, chunk_overlap, split_method], ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def compute_embedding_key(retriever_type: str, dimensions: int | None = None) -> str:
+    """向量的来源模型（及维度），不需要向量的检索器类型返回空字符串"""
+    classes = get_retriever_classes(retriever_type)
+    if ChromaRetriever not in classes and ANNRetriever not in classes:
+        return ""
+    return get_embedding_function(dimensions).model_id
+
+
+def chunk_file(
+    collection_record_id: str,
+    markdown_path: str,
+    chunk_save_path: str,
+    document_title: str = "",
+    chunk_size: int = rag_cfg["chunk_size"],
+    chunk_overlap: int = rag_cfg["chunk_overlap"],
+    split_method: str = rag_cfg["split_method"],
+) -> list[Document]:
+    """读取 Markdown 文件分块，并保存分块结果。"""
+    with open(markdown_path, "r", encoding="utf-8") as f:
+        markdown_content = f.read()
+
+    chunks = get_chunks(
+        markdown_content,
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        split_method=split_method,
+        metadata={
+            "document_title": document_title,
+            "collection_id": collection_record_id,
+        },
+    )
+
+    os.makedirs(os.path.dirname(chunk_save_path), exist_ok=True)
+    with open(chunk_save_path, "wb") as f:
+        pickle.dump(chunks, f)
+
+    return chunks
+
+
 def ingest_file(
     collection_record_id: str,
     markdown_path: str,
@@ -26,6 +98,10 @@ def ingest_file(
     chunk_overlap: int = rag_cfg["chunk_overlap"],
     split_method: str = rag_cfg["split_method"],
     retriever_type: str | None = None,
+    language: str = "EN",
+    knowledge_base_id: str | None = None,
+    dimensions: int | None = None,
+    quantization: str = "none",
 ) -> IngestResult:
     """异步封装的 ingest 函数。
 
@@ -35,39 +111,36 @@ def ingest_file(
         chunk_size (int): 分块大小。
         chunk_overlap (int): 分块重叠大小。
         retriever_type (list[BaseRetriever]): 检索器类型列表。
+        language (str): 文档语言（ZH/EN），决定 BM25 分词方式。
+        knowledge_base_id (str): 所属知识库，ANN 检索器按知识库建索引。
+        dimensions (int): 向量维度，默认 1024。
+        quantization (str): 本地 ANN 向量的量化方式 none/int8/pq。
     """
     if retriever_type is None:
         retriever_type = rag_cfg["retriever_type"]
 
     try:
         # 1. chunking
-        with open(markdown_path, "r", encoding="utf-8") as f:
-            markdown_content = f.read()
-
-        chunks = get_chunks(
-            markdown_content,
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            split_method=split_method,
-            metadata={
-                "document_title": document_title,
-                "collection_id": collection_record_id,
-            },
+        chunks = chunk_file(
+            collection_record_id,
+            markdown_path,
+            chunk_save_path,
+            document_title,
+            chunk_size,
+            chunk_overlap,
+            split_method,
         )
 
-        os.makedirs(os.path.dirname(chunk_save_path), exist_ok=True)
-        with open(chunk_save_path, "wb") as f:
-            pickle.dump(chunks, f)
-
         # 2. ingeset
-        if retriever_type == "vector":
-            r_type = [ChromaRetriever]
-        elif retriever_type == "sparse":
-            r_type = [BM25Retriever]
-        elif retriever_type == "hybrid":
-            r_type = [ChromaRetriever, BM25Retriever]
-        for retriever in r_type:
-            retriever.ingest(chunks, collection_record_id=collection_record_id)
+        for retriever in get_retriever_classes(retriever_type):
+            retriever.ingest(
+                chunks,
+                collection_record_id=collection_record_id,
+                language=language,
+                knowledge_base_id=knowledge_base_id,
+                embedding_function=get_embedding_function(dimensions),
+                quantization=quantization,
+            )
 
     except Exception as e:
         raise e
@@ -75,6 +148,76 @@ def ingest_file(
     return IngestResult(num_chunks=len(chunks))
 
 
+def reuse_file(
+    source_collection_record_id: str,
+    source_chunk_path: str,
+    collection_record_id: str,
+    chunk_save_path: str,
+    retriever_type: str | None = None,
+    language: str = "EN",
+    knowledge_base_id: str | None = None,
+    dimensions: int | None = None,
+    quantization: str = "none",
+) -> list[Document]:
+    """复用已处理 collection 的分块与向量：复制分块并改写 collection_id，
+    向量直接从源 collection 复制，不重新切分和向量化。"""
+    if retriever_type is None:
+        retriever_type = rag_cfg["retriever_type"]
+
+    with open(source_chunk_path, "rb") as f:
+        chunks: list[Document] = pickle.load(f)
+    for chunk in chunks:
+        chunk.metadata["collection_id"] = collection_record_id
+
+    os.makedirs(os.path.dirname(chunk_save_path), exist_ok=True)
+    with open(chunk_save_path, "wb") as f:
+        pickle.dump(chunks, f)
+
+    for retriever in get_retriever_classes(retriever_type):
+        retriever.copy_from(
+            source_collection_record_id,
+            chunks,
+            collection_record_id=collection_record_id,
+            language=language,
+            knowledge_base_id=knowledge_base_id,
+            embedding_function=get_embedding_function(dimensions),
+            quantization=quantization,
+        )
+
+    return chunks
+
+
+def ingest_chunks_batch(
+    chunk_sets: dict[str, list[Document]],
+    retriever_type: str | None = None,
+    languages: dict[str, str] | None = None,
+    knowledge_base_id: str | None = None,
+    dimensions: int | None = None,
+    quantization: str = "none",
+) -> None:
+    """多个 collection 的分块一起入库，向量化时跨文档共享 embedding 批次。
+
+    Args:
+        chunk_sets (dict[str, list[Document]]): collection_record_id -> 分块列表。
+        retriever_type (str): 检索器类型。
+        languages (dict[str, str]): collection_record_id -> 文档语言。
+        knowledge_base_id (str): 所属知识库，ANN 检索器按知识库建索引。
+        dimensions (int): 向量维度，默认 1024。
+        quantization (str): 本地 ANN 向量的量化方式 none/int8/pq。
+    """
+    if retriever_type is None:
+        retriever_type = rag_cfg["retriever_type"]
+
+    for retriever in get_retriever_classes(retriever_type):
+        retriever.ingest_many(
+            chunk_sets,
+            languages=languages,
+            knowledge_base_id=knowledge_base_id,
+            embedding_function=get_embedding_function(dimensions),
+            quantization=quantization,
+        )
+
+
 def ingest_memory(
     user_id: str,
     messages: list[dict[str, str]],
@@ -101,13 +244,7 @@ def ingest_memory(
             pickle.dump(chunks, f)
 
         # 2. ingeset
-        if retriever_type == "vector":
-            r_type = [ChromaRetriever]
-        elif retriever_type == "sparse":
-            r_type = [BM25Retriever]
-        elif retriever_type == "hybrid":
-            r_type = [ChromaRetriever, BM25Retriever]
-        for retriever in r_type:
+        for retriever in get_retriever_classes(retriever_type):
             retriever.ingest(chunks, collection_record_id=user_id)
 
     except Exception as e:
@@ -1,18 +1,38 @@
 import asyncio
+import logging
 import os
+from typing import Awaitable, Callable
 
+from beanie import PydanticObjectId
 from beanie.odm.operators.update.general import Set
 from beanie.operators import In
 
-from src.database import get_collection
+from src.database import get_collection, delete_collection
 from .odm.KnowledgeBase import KnowledgeBase
 from .odm.CollectionRecord import CollectionRecord
-from src.rag.ingest.ingest import ingest_file
+from src.rag.ingest.ingest import (
+    ingest_file,
+    chunk_file,
+    ingest_chunks_batch,
+    reuse_file,
+    compute_chunk_key,
+    compute_embedding_key,
+)
 from src.document import DocumentRecord
+from src.rag.retriever import ANNRetriever
+from src.rag.retriever.ann_retriever.hnsw_index import delete_index, vector_path
+from src.rag.retriever.ann_retriever.quantized_index import QUANTIZATION_TYPES
+from src.metrics import record_cache
 
 from config import rag_cfg
 
 
+logger = logging.getLogger(__name__)
+
+# 批量入库时的单项状态回调: (document_record_id, status, error)
+ItemCallback = Callable[..., Awaitable[None]]
+
+
 async def create_knowledge_base(
     name: str,
     description: str = "",
@@ -20,6 +40,8 @@ async def create_knowledge_base(
     chunk_overlap: int = 50,
     split_method: str = "hierarchical",
     retriever_type: str = "hybrid",
+    dimensions: int = 1024,
+    quantization: str = "none",
     document_record_ids: list[str] | None = None,
 ) -> KnowledgeBase:
     """创建一个新的知识库。
@@ -27,11 +49,18 @@ async def create_knowledge_base(
     Args:
         name (str): 知识库名称，必须唯一。
         description (str, optional): 知识库描述. Defaults to "".
+        dimensions (int, optional): 向量维度. Defaults to 1024.
+        quantization (str, optional): 本地 ANN 向量的量化方式 none/int8/pq. Defaults to "none".
         document_record_ids (Optional[list[str]], optional): 关联的文件记录ID列表. Defaults to None.
 
     Returns:
         KnowledgeBase: 创建的知识库对象。
     """
+    if quantization not in QUANTIZATION_TYPES:
+        raise ValueError(f"Invalid quantization: {quantization}")
+    # 校验维度是否被 embedding 模型支持
+    compute_embedding_key(retriever_type, dimensions)
+
     knowledge_base = KnowledgeBase(
         name=name,
         description=description,
@@ -39,6 +68,8 @@ async def create_knowledge_base(
         chunk_overlap=chunk_overlap,
         split_method=split_method,
         retriever_type=retriever_type,
+        dimensions=dimensions,
+        quantization=quantization,
     )
 
     task = []
@@ -74,7 +105,117 @@ async def remove_record_from_knowledge_base(
         raise ValueError("Document record not found")
 
     # 清理相关内容（chunk，chromadb记录），已在 CollectionRecord 的删除钩子中处理
-    collection_record.delete()
+    await collection_record.delete()
+    # 记录删除成功后再从 ANN 索引中移除
+    if knowledge_base.retriever_type in ["ann", "ann_hybrid"]:
+        await asyncio.to_thread(
+            ANNRetriever.remove, knowledge_base_id, collection_record_id
+        )
+
+
+def new_collection_record(
+    knowledge_base: KnowledgeBase, document_record: DocumentRecord
+) -> CollectionRecord:
+    """创建 collection 记录（未写入数据库），并按知识库的切分配置计算内容地址
+
+    id 预先生成，用作分块文件与向量库中的名称；记录在分块与入库都成功后才写入，
+    中途崩溃不会留下 num_chunks 为 0 的记录。
+    """
+    return CollectionRecord(
+        id=PydanticObjectId(),
+        knowledge_base_id=str(knowledge_base.id),
+        document_record_id=str(document_record.id),
+        chunk_key=(
+            compute_chunk_key(
+                document_record.file_hash,
+                knowledge_base.chunk_size,
+                knowledge_base.chunk_overlap,
+                knowledge_base.split_method,
+            )
+            if document_record.file_hash
+            else ""
+        ),
+        embedding_key=compute_embedding_key(
+            knowledge_base.retriever_type, knowledge_base.dimensions
+        ),
+    )
+
+
+async def find_reusable_collection(
+    chunk_key: str, embedding_key: str = ""
+) -> CollectionRecord | None:
+    """查找分块（以及需要时的向量）可复用的已完成 collection。
+
+    Args:
+        chunk_key (str): 分块内容地址。
+        embedding_key (str): 需要的向量模型，为空表示只复用分块。
+    """
+    if not chunk_key:
+        return None
+
+    query = CollectionRecord.find(
+        CollectionRecord.chunk_key == chunk_key,
+        CollectionRecord.num_chunks > 0,
+    )
+    if embedding_key:
+        query = query.find(CollectionRecord.embedding_key == embedding_key)
+
+    candidates = await query.sort(-CollectionRecord.created_at).limit(5).to_list()  # type: ignore
+    for record in candidates:
+        if os.path.exists(record.chunk_path):
+            record_cache("ingest.reuse", True)
+            return record
+    record_cache("ingest.reuse", False)
+    return None
+
+
+async def reuse_collection(
+    collection_record: CollectionRecord,
+    source: CollectionRecord,
+    chunk_save_path: str,
+    retriever_type: str,
+    language: str = "EN",
+    dimensions: int | None = None,
+    quantization: str = "none",
+) -> bool:
+    """从 source 复制分块与向量到 collection_record，失败时清理并返回 False"""
+    try:
+        chunks = await asyncio.to_thread(
+            reuse_file,
+            str(source.id),
+            source.chunk_path,
+            str(collection_record.id),
+            chunk_save_path,
+            retriever_type,
+            language,
+            collection_record.knowledge_base_id,
+            dimensions,
+            quantization,
+        )
+    except Exception as e:
+        logger.warning(
+            f"Failed to reuse {source.id} for {collection_record.id}, re-ingesting",
+            exc_info=e,
+        )
+        try:
+            delete_collection(str(collection_record.id))
+        except Exception:
+            pass
+        if retriever_type in ["ann", "ann_hybrid"]:
+            # 从 ANN 索引中移除，并删除已复制的向量文件
+            try:
+                await asyncio.to_thread(
+                    ANNRetriever.remove,
+                    collection_record.knowledge_base_id,
+                    str(collection_record.id),
+                )
+            except Exception:
+                pass
+        return False
+
+    collection_record.chunk_path = chunk_save_path
+    collection_record.num_chunks = len(chunks)
+    return True
 
 
 async def add_record_to_knowledge_base(knowledge_base_id: str, document_record_id: str):
@@ -93,16 +234,27 @@ async def add_record_to_knowledge_base(knowledge_base_id: str, document_record_i
     if not document_record.markdown_path:
         raise ValueError("Document record has not been parsed yet")
 
-    collection_record = CollectionRecord(
-        knowledge_base_id=knowledge_base_id,
-        document_record_id=document_record_id,
-    )
-    await collection_record.insert()
-
+    collection_record = new_collection_record(knowledge_base, document_record)
     chunk_save_path = os.path.join(
         rag_cfg["chunk_dir"], str(collection_record.id) + ".pkl"
     )
 
+    # 已有相同内容地址的 collection 时直接复用分块与向量
+    source = await find_reusable_collection(
+        collection_record.chunk_key, collection_record.embedding_key
+    )
+    if source is not None and await reuse_collection(
+        collection_record,
+        source,
+        chunk_save_path,
+        knowledge_base.retriever_type,
+        document_record.language,
+        knowledge_base.dimensions,
+        knowledge_base.quantization,
+    ):
+        await collection_record.insert()
+        return
+
     ingest_result = await asyncio.to_thread(
         ingest_file,
         str(collection_record.id),
@@ -113,11 +265,181 @@ async def add_record_to_knowledge_base(knowledge_base_id: str, document_record_i
         knowledge_base.chunk_overlap,
         knowledge_base.split_method,
         knowledge_base.retriever_type,
+        document_record.language,
+        knowledge_base_id,
+        knowledge_base.dimensions,
+        knowledge_base.quantization,
     )
     collection_record.chunk_path = chunk_save_path
     collection_record.num_chunks = ingest_result.num_chunks
 
-    await collection_record.save_changes()
+    await collection_record.insert()
+
+
+async def remove_incomplete_collection(
+    knowledge_base: KnowledgeBase, collection_record: CollectionRecord
+):
+    """删除未完成入库的 collection 记录及其可能已写入的向量"""
+    logger.warning(
+        f"Removing incomplete collection {collection_record.id} "
+        f"of document {collection_record.document_record_id}"
+    )
+    # 分块文件与 Chroma collection 由删除钩子清理
+    await collection_record.delete()
+    if knowledge_base.retriever_type in ["ann", "ann_hybrid"]:
+        await asyncio.to_thread(
+            ANNRetriever.remove, str(knowledge_base.id), str(collection_record.id)
+        )
+
+
+async def add_records_to_knowledge_base(
+    knowledge_base_id: str,
+    document_record_ids: list[str],
+    concurrency: int = 4,
+    on_item: ItemCallback | None = None,
+) -> dict[str, str]:
+    """向知识库中批量添加已解析的文件记录。
+
+    分块以有限并发在线程中执行，所有文档的分块随后一起入库，
+    向量化时跨文档共享 embedding 批次。已在其他知识库中以相同配置处理过的文件
+    直接复制分块与向量。
+
+    Args:
+        knowledge_base_id (str): 知识库ID。
+        document_record_ids (list[str]): 文件记录ID列表。
+        concurrency (int): 并发分块的文件数。
+        on_item (ItemCallback, optional): 单项状态回调，状态为 chunking/done/skipped/failed。
+
+    Returns:
+        dict[str, str]: document_record_id -> 最终状态。
+    """
+    knowledge_base = await KnowledgeBase.get(knowledge_base_id)
+    if not knowledge_base:
+        raise ValueError("Knowledge base not found")
+
+    statuses: dict[str, str] = {}
+
+    async def report(record_id: str, status: str, error: str | None = None):
+        statuses[record_id] = status
+        if on_item is not None:
+            await on_item(record_id, status, error)
+
+    document_records = await DocumentRecord.find(
+        In(DocumentRecord.id, [PydanticObjectId(i) for i in document_record_ids])
+    ).to_list()
+    document_records = {str(record.id): record for record in document_records}
+
+    existing = await CollectionRecord.find(
+        CollectionRecord.knowledge_base_id == knowledge_base_id,
+        In(CollectionRecord.document_record_id, document_record_ids),
+    ).to_list()
+    # 未完成入库的记录（旧版本在分块前写入记录，中途崩溃时遗留）清理后重新入库
+    for record in existing:
+        if record.num_chunks <= 0:
+            await remove_incomplete_collection(knowledge_base, record)
+    existing_ids = {
+        record.document_record_id for record in existing if record.num_chunks > 0
+    }
+
+    pending: list[DocumentRecord] = []
+    for record_id in dict.fromkeys(document_record_ids):
+        document_record = document_records.get(record_id)
+        if record_id in existing_ids:
+            await report(record_id, "skipped")
+        elif document_record is None:
+            await report(record_id, "failed", "Document record not found")
+        elif not document_record.markdown_path:
+            await report(record_id, "failed", "Document record has not been parsed yet")
+        else:
+            pending.append(document_record)
+
+    # 1. 有限并发分块
+    semaphore = asyncio.Semaphore(concurrency)
+    chunked: dict[str, tuple[CollectionRecord, list]] = {}
+    languages: dict[str, str] = {}
+
+    async def chunk_one(document_record: DocumentRecord):
+        record_id = str(document_record.id)
+        async with semaphore:
+            await report(record_id, "chunking")
+            collection_record = new_collection_record(knowledge_base, document_record)
+            chunk_save_path = os.path.join(
+                rag_cfg["chunk_dir"], str(collection_record.id) + ".pkl"
+            )
+
+            # 已处理过的内容只需复制分块与向量，不进入 embedding 批次
+            source = await find_reusable_collection(
+                collection_record.chunk_key, collection_record.embedding_key
+            )
+            if source is not None and await reuse_collection(
+                collection_record,
+                source,
+                chunk_save_path,
+                knowledge_base.retriever_type,
+                document_record.language,
+                knowledge_base.dimensions,
+                knowledge_base.quantization,
+            ):
+                await collection_record.insert()
+                await report(record_id, "done")
+                return
+
+            try:
+                chunks = await asyncio.to_thread(
+                    chunk_file,
+                    str(collection_record.id),
+                    document_record.markdown_path,
+                    chunk_save_path,
+                    document_record.title,  # type: ignore
+                    knowledge_base.chunk_size,
+                    knowledge_base.chunk_overlap,
+                    knowledge_base.split_method,
+                )
+            except Exception as e:
+                logger.error(f"Failed to chunk {record_id}", exc_info=e)
+                await report(record_id, "failed", f"{type(e).__name__}: {e}")
+                return
+
+            collection_record.chunk_path = chunk_save_path
+            collection_record.num_chunks = len(chunks)
+            chunked[record_id] = (collection_record, chunks)
+            languages[str(collection_record.id)] = document_record.language
+
+    await asyncio.gather(*(chunk_one(record) for record in pending))
+
+    if not chunked:
+        return statuses
+
+    # 2. 统一入库，共享 embedding 批次
+    try:
+        await asyncio.to_thread(
+            ingest_chunks_batch,
+            {str(col.id): chunks for col, chunks in chunked.values()},
+            knowledge_base.retriever_type,
+            languages,
+            knowledge_base_id,
+            knowledge_base.dimensions,
+            knowledge_base.quantization,
+        )
+    except Exception as e:
+        logger.error(f"Failed to ingest into {knowledge_base_id}", exc_info=e)
+        # 回滚：清理已写入的向量与分块文件
+        for collection_record, _ in chunked.values():
+            try:
+                delete_collection(str(collection_record.id))
+            except Exception:
+                pass
+            if os.path.exists(collection_record.chunk_path):
+                os.remove(collection_record.chunk_path)
+        for record_id in chunked:
+            await report(record_id, "failed", f"{type(e).__name__}: {e}")
+        return statuses
+
+    for record_id, (collection_record, _) in chunked.items():
+        await collection_record.insert()
+        await report(record_id, "done")
+
+    return statuses
 
 
 async def delete_knowledge_base(knowledge_base_id: str):
@@ -130,15 +452,24 @@ async def delete_knowledge_base(knowledge_base_id: str):
     if not knowledge_base:
         raise ValueError("Knowledge base not found")
 
+    collection_records = await CollectionRecord.find(
+        CollectionRecord.knowledge_base_id == knowledge_base_id
+    ).to_list()
+
     if knowledge_base.retriever_type in ["vector", "hybrid"]:
         # 删除相关 向量库
-        collection_records = await CollectionRecord.find(
-            CollectionRecord.knowledge_base_id == knowledge_base_id
-        ).to_list()
         for collection_record in collection_records:
             collection = get_collection(name=str(collection_record.id))
             collection.delete()
 
+    if knowledge_base.retriever_type in ["ann", "ann_hybrid"]:
+        # 删除知识库的 ANN 索引及各 collection 的向量文件
+        delete_index(knowledge_base_id)
+        for collection_record in collection_records:
+            path = vector_path(str(collection_record.id))
+            if os.path.exists(path):
+                os.remove(path)
+
     await CollectionRecord.find(
         CollectionRecord.knowledge_base_id == knowledge_base_id
     ).delete()
@@ -1,5 +1,4 @@
 import os
-import shutil
 
 from beanie import Delete, before_event
 from pydantic import Field
@@ -16,6 +15,10 @@ class CollectionRecord(BaseDocument):
 
     chunk_path: str = Field(default="")
     num_chunks: int = Field(default=0)
+    # 内容地址：相同文件 + 切分配置的分块可在知识库之间复用
+    chunk_key: str = Field(default="")
+    # 向量使用的 embedding 模型（provider:model），未向量化时为空
+    embedding_key: str = Field(default="")
 
     document_record_id: str = Field(...)  # 关联的文档记录ID
     knowledge_base_id: str = Field(...)  # 关联的知识库ID
@@ -31,13 +34,22 @@ class CollectionRecord(BaseDocument):
             ],
             [("knowledge_base_id", ASCENDING)],
             [("document_record_id", ASCENDING)],
+            [("chunk_key", ASCENDING)],
         ]
         use_state_management = True
 
     @before_event([Delete])
     async def clean_up_chunks(self):
-        if os.path.exists(self.chunk_path):
-            shutil.rmtree(self.chunk_path)
+        # 分块文件为单个 .pkl 文件
+        if self.chunk_path and os.path.isfile(self.chunk_path):
+            os.remove(self.chunk_path)
+
+    @before_event([Delete])
+    async def clean_up_tokens(self):
+        # BM25 词频缓存与分块文件同目录
+        index_path = os.path.splitext(self.chunk_path)[0] + ".bm25.pkl"
+        if self.chunk_path and os.path.exists(index_path):
+            os.remove(index_path)
 
     @before_event([Delete])
     async def clean_up_chroma(self):
@@ -16,7 +16,11 @@ class KnowledgeBase(BaseDocument):
     chunk_size: int = Field(default=300)  # 知识库文本块大小
     chunk_overlap: int = Field(default=50)  # 知识库文本块重叠大小
     split_method: str = Field(default="hierarchical")  #  hierarchical, recursive
-    retriever_type: str = Field(default="hybrid")  # 检索器类型 vector, sparse, hybrid
+    # 检索器类型 vector, sparse, hybrid, ann, ann_hybrid
+    retriever_type: str = Field(default="hybrid")
+    dimensions: int = Field(default=1024)  # 向量维度（text-embedding-v4 支持 64~2048）
+    # 本地向量存储的量化方式 none, int8, pq（仅 ann / ann_hybrid 生效）
+    quantization: str = Field(default="none")
 
     class Settings:
         name = "knowledge_base"  # MongoDB 集合名
@@ -1,6 +1,13 @@
+import asyncio
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
 from langchain_core.documents import Document
 
-from src.rag.retriever import ChromaRetriever
+from src.metrics import record_cache
+from config import rag_cfg
 
 """
 Document 结构：
@@ -67,15 +74,53 @@ async def context_retrieve(
         # 将所有 record 的扩展 ID 收集起来
         all_extended_chunk_ids.append(extended_chunk_ids)
 
-    # 4. 调用 get_by_ids 获取所有扩展后的文档
-    retriever = ChromaRetriever(list(records_ids_chunk_ids.keys()), language={})  # XXX
-    retrieved_documents = await retriever.get_by_ids(
-        record_ids=list(records_ids_chunk_ids.keys()), ids=all_extended_chunk_ids
+    # 4. 从分块文件获取所有扩展后的文档（分块文件是所有检索器类型共同的数据源）
+    retrieved_documents = await asyncio.to_thread(
+        get_chunks_by_ids, list(records_ids_chunk_ids.keys()), all_extended_chunk_ids
     )
 
     return retrieved_documents
 
 
+# 分块文件 LRU 缓存：(路径, 修改时间) -> 分块，文件重写后自动失效
+_chunk_cache: OrderedDict[tuple[str, int], list[Document]] = OrderedDict()
+_chunk_cache_lock = threading.Lock()
+
+
+def load_chunks(collection_id: str) -> list[Document]:
+    """读取 collection 的分块文件，最近使用的 chunk_cache_size 个文件常驻内存"""
+    path = os.path.join(rag_cfg["chunk_dir"], collection_id + ".pkl")
+    key = (path, os.stat(path).st_mtime_ns)
+    with _chunk_cache_lock:
+        chunks = _chunk_cache.get(key)
+        if chunks is not None:
+            _chunk_cache.move_to_end(key)
+    record_cache("context.chunks", chunks is not None)
+    if chunks is not None:
+        return chunks
+
+    with open(path, "rb") as f:
+        chunks = pickle.load(f)
+    with _chunk_cache_lock:
+        _chunk_cache[key] = chunks  # type: ignore
+        while len(_chunk_cache) > rag_cfg.get("chunk_cache_size", 32):
+            _chunk_cache.popitem(last=False)
+    return chunks  # type: ignore
+
+
+def get_chunks_by_ids(
+    collection_ids: list[str], ids: list[list[str]]
+) -> dict[str, list[Document]]:
+    """按分块 id 从 collection 的分块文件中读取文档，分块 id 即其在文件中的序号"""
+    result: dict[str, list[Document]] = {}
+    for collection_id, id_list in zip(collection_ids, ids):
+        chunks = load_chunks(collection_id)
+        result[collection_id] = [
+            chunks[int(i)] for i in id_list if 0 <= int(i) < len(chunks)
+        ]
+    return result
+
+
 def extend_array(
     arr: list[int | str], n: int, min_range: int, max_range: int
 ) -> list[str]:
@@ -1,11 +1,15 @@
+import asyncio
+
 from langchain_core.documents import Document
 from beanie.operators import In
 from beanie import PydanticObjectId
 
 from src.rag.knowledge_base import KnowledgeBase
 from src.document import DocumentRecord
-from src.rag.retriever import BM25Retriever, ChromaRetriever
+from src.rag.retriever import ANNRetriever, BM25Retriever, ChromaRetriever
+from src.rag.retriever.chroma_retriever.EmbeddingFunction import get_embedding_function
 from src.rag.knowledge_base import CollectionRecord
+from src.tracing import traced
 
 from config import rag_cfg, memory_cfg
 
@@ -24,13 +28,11 @@ Document 结构：
 """
 
 
-async def retrieve_knowledge_base(
+@traced("retrieve.load_retrievers")
+async def load_knowledge_base_retrievers(
     knowledge_base_id: str,
-    query: dict | str,
-    # retriever_type: Optional[str],
-    top_k: int = 10,
-    query_route: dict[str, int] | None = None,
-) -> list[Document] | None:
+) -> list[ChromaRetriever | BM25Retriever | ANNRetriever]:
+    """按知识库的检索器类型构建检索器，知识库为空时返回空列表"""
     knowledge_base = await KnowledgeBase.get(knowledge_base_id)
     if not knowledge_base:
         raise ValueError("Knowledge base not found")
@@ -54,28 +56,103 @@ async def retrieve_knowledge_base(
             str(col_record.document_record_id), "EN"
         )
 
+    embedding_function = get_embedding_function(knowledge_base.dimensions)
     if knowledge_base.retriever_type == "vector":
-        retriever = [ChromaRetriever(col_ids, language=languages)]
+        return [
+            ChromaRetriever(
+                col_ids, language=languages, embedding_function=embedding_function
+            )
+        ]
     elif knowledge_base.retriever_type == "sparse":
-        retriever = [BM25Retriever(col_ids, language=languages)]
+        return [BM25Retriever(col_ids, language=languages)]
     elif knowledge_base.retriever_type == "hybrid":
-        retriever = [
-            ChromaRetriever(col_ids, language=languages),
+        return [
+            ChromaRetriever(
+                col_ids, language=languages, embedding_function=embedding_function
+            ),
             BM25Retriever(col_ids, language=languages),
         ]
-    else:
-        raise ValueError("Invalid retriever type")
+    elif knowledge_base.retriever_type == "ann":
+        return [
+            ANNRetriever(
+                col_ids,
+                language=languages,
+                knowledge_base_id=knowledge_base_id,
+                embedding_function=embedding_function,
+            )
+        ]
+    elif knowledge_base.retriever_type == "ann_hybrid":
+        return [
+            ANNRetriever(
+                col_ids,
+                language=languages,
+                knowledge_base_id=knowledge_base_id,
+                embedding_function=embedding_function,
+            ),
+            BM25Retriever(col_ids, language=languages),
+        ]
+    raise ValueError("Invalid retriever type")
 
-    results: list[Document] = []
+
+async def retrieve_knowledge_base(
+    knowledge_base_id: str,
+    query: dict | str,
+    # retriever_type: Optional[str],
+    top_k: int = 10,
+    query_route: dict[str, int] | None = None,
+) -> list[Document] | None:
+    retriever = await load_knowledge_base_retrievers(knowledge_base_id)
+    if not retriever:
+        return []
+
+    # 检索器为同步实现，放入线程中并发执行，不阻塞事件循环
     if query_route:
-        for r in retriever:
-            results.extend(r.retrieve(query, query_route=query_route))
+        tasks = [
+            asyncio.to_thread(r.retrieve, query, query_route=query_route)
+            for r in retriever
+        ]
     else:
-        for r in retriever:
-            results.extend(r.retrieve(query, top_k=top_k // len(retriever)))
+        tasks = [
+            asyncio.to_thread(r.retrieve, query, top_k=top_k // len(retriever))
+            for r in retriever
+        ]
+
+    results: list[Document] = []
+    for documents in await asyncio.gather(*tasks):
+        results.extend(documents)
 
     return results
 
+
+async def retrieve_knowledge_base_batch(
+    knowledge_base_id: str,
+    queries: list[str],
+    top_k: int = 10,
+) -> list[list[Document]]:
+    """一次检索多个 query（语言变体、多 query 扩展、多用户请求等）。
+
+    每个检索器对全部 query 只打一次分：Chroma 一次 embedding 请求 + 每个 collection
+    一次多向量 query，BM25 一次稀疏矩阵乘法。
+
+    Returns:
+        list[list[Document]]: 与 queries 一一对应的结果。
+    """
+    retriever = await load_knowledge_base_retrievers(knowledge_base_id)
+    results: list[list[Document]] = [[] for _ in queries]
+    if not retriever:
+        return results
+
+    batches = await asyncio.gather(
+        *(
+            asyncio.to_thread(r.retrieve_batch, queries, top_k=top_k // len(retriever))
+            for r in retriever
+        )
+    )
+    for batch in batches:
+        for i, documents in enumerate(batch):
+            results[i].extend(documents)
+    return results
+
 # TODO 设置相似度阈值
 # TODO context 组装
 async def retrieve_memory(
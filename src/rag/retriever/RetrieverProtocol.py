@@ -18,8 +18,38 @@ class RetrieverProtocol(Protocol):
         """将文档切片并存储到检索器中"""
         ...
 
+    @classmethod
+    def ingest_many(
+        cls,
+        chunk_sets: dict[str, list[Document]],
+        **kwargs,
+    ) -> None:
+        """将多个 collection 的文档切片一起存储到检索器中"""
+        ...
+
+    @classmethod
+    def copy_from(
+        cls,
+        source_collection_record_id: str,
+        documents: list[Document],
+        collection_record_id: str,
+        **kwargs,
+    ) -> None:
+        """复用另一个 collection 已入库的内容（相同分块），避免重新计算"""
+        ...
+
     def retrieve(
         self, query: dict | str, top_k: int = 10, query_route: dict | None = None
     ) -> list[Document]:
         """根据 query 检索 top_k 个文档"""
         ...
+
+    def retrieve_batch(
+        self,
+        queries: list[str],
+        top_k: int = 10,
+        collection_ids: list[str] | None = None,
+        **kwargs,
+    ) -> list[list[Document]]:
+        """一次检索多个 query，返回与 queries 一一对应的排序结果"""
+        ...
@@ -1,9 +1,11 @@
 from .RetrieverProtocol import RetrieverProtocol
 from .chroma_retriever.ChromaRetriever import ChromaRetriever
 from .bm25_retriever.BM25Retriever import BM25Retriever
+from .ann_retriever.ANNRetriever import ANNRetriever
 
 __all__ = [
     "RetrieverProtocol",
     "ChromaRetriever",
     "BM25Retriever",
+    "ANNRetriever",
 ]
@@ -0,0 +1,285 @@
+import os
+import pickle
+import threading
+from logging import getLogger
+
+import numpy as np
+from langchain_core.documents import Document
+
+from src.database import get_collection
+from src.rag.utils import resolve_query
+from src.metrics import RETRIEVER_LATENCY, record_cache, timed
+from src.tracing import traced
+from src.rag.retriever.chroma_retriever.EmbeddingFunction import (
+    EmbeddingFunction,
+    SyncEmbeddingFunction,
+    embed_texts,
+)
+from .hnsw_index import (
+    HNSWIndex,
+    index_lock,
+    load_vectors,
+    save_vectors,
+    vector_path,
+)
+from .quantized_index import QuantizedIndex, load_index
+
+from config import rag_cfg
+
+
+logger = getLogger(__name__)
+
+
+class ANNRetriever:
+    """本地向量检索器：每个知识库一个索引（HNSW 或 int8/PQ 量化索引），
+    原始向量按 collection 以内存映射文件存储。
+
+    适合读多写少的场景，检索不经过 Chroma 服务。
+    """
+
+    _instances = {}
+
+    def __new__(cls, collection_record_ids: list[str] | str, *args, **kwargs):
+        if isinstance(collection_record_ids, str):
+            collection_record_ids = [collection_record_ids]
+        key = frozenset(str(i) for i in collection_record_ids)
+        record_cache("retriever.ann", key in cls._instances)
+        if key not in cls._instances:
+            instance = super().__new__(cls)
+            cls._instances[key] = instance
+        return cls._instances[key]
+
+    def __init__(
+        self,
+        collection_record_ids: list[str] | str,
+        language: dict[str, str] | None = None,
+        knowledge_base_id: str | None = None,
+        embedding_function: EmbeddingFunction = SyncEmbeddingFunction(),
+    ):
+        if getattr(self, "_initialized", False):
+            return
+        if isinstance(collection_record_ids, str):
+            collection_record_ids = [collection_record_ids]
+        if knowledge_base_id is None:
+            raise ValueError("ANNRetriever requires knowledge_base_id")
+        self._initialized = True
+        self.embedding_function = embedding_function
+
+        self.collection_ids = [str(cid) for cid in collection_record_ids]
+        self.language: dict[str, str] = {}
+        self.documents: dict[str, list[Document]] = {}
+        for cid in self.collection_ids:
+            self.language[cid] = language.get(cid, "EN") if language else "EN"
+            with open(os.path.join(rag_cfg["chunk_dir"], cid + ".pkl"), "rb") as f:
+                self.documents[cid] = pickle.load(f)
+
+        # 量化方式以索引落盘时为准
+        self.knowledge_base_id = knowledge_base_id
+        self.index = load_index(knowledge_base_id)
+        self._refresh_lock = threading.Lock()
+
+    @staticmethod
+    def embed(
+        texts: list[str], embedding_function: EmbeddingFunction
+    ) -> np.ndarray:
+        """分批向量化，返回 [n, dim] float32 矩阵"""
+        batch_size = 10  # 最大10
+        vectors = [
+            embed_texts(embedding_function, texts[i : i + batch_size])
+            for i in range(0, len(texts), batch_size)
+        ]
+        return np.concatenate(vectors) if vectors else np.empty((0, 0), np.float32)
+
+    @classmethod
+    def _write_index(
+        cls,
+        knowledge_base_id: str,
+        collection_ids: list[str],
+        quantization: str = "none",
+    ):
+        with index_lock(knowledge_base_id):
+            index = load_index(knowledge_base_id, quantization)
+            for cid in collection_ids:
+                vectors = load_vectors(cid)
+                if vectors is not None:
+                    index.add_collection(cid, vectors)
+            index.save()
+
+    @classmethod
+    def ingest(
+        cls,
+        documents: list[Document],
+        collection_record_id: str,
+        knowledge_base_id: str | None = None,
+        embedding_function: EmbeddingFunction = SyncEmbeddingFunction(),
+        quantization: str = "none",
+        **_: dict,
+    ):
+        cls.ingest_many(
+            {collection_record_id: documents},
+            knowledge_base_id=knowledge_base_id,
+            embedding_function=embedding_function,
+            quantization=quantization,
+        )
+
+    @classmethod
+    def ingest_many(
+        cls,
+        chunk_sets: dict[str, list[Document]],
+        knowledge_base_id: str | None = None,
+        embedding_function: EmbeddingFunction = SyncEmbeddingFunction(),
+        quantization: str = "none",
+        **_: dict,
+    ):
+        """所有 collection 的分块共享 embedding 批次，向量落盘后增量写入知识库索引"""
+        if knowledge_base_id is None:
+            raise ValueError("ANNRetriever requires knowledge_base_id")
+
+        items = [
+            (cid, doc) for cid, documents in chunk_sets.items() for doc in documents
+        ]
+        try:
+            vectors = cls.embed([doc.page_content for _, doc in items], embedding_function)
+            start = 0
+            for cid, documents in chunk_sets.items():
+                save_vectors(cid, vectors[start : start + len(documents)])
+                start += len(documents)
+            cls._write_index(
+                knowledge_base_id, list(chunk_sets.keys()), quantization
+            )
+        except Exception as e:
+            logger.error(f"ANN 索引写入失败: {list(chunk_sets.keys())}", exc_info=e)
+            raise RuntimeError(f"ANN 索引写入失败: {list(chunk_sets.keys())}") from e
+
+    @classmethod
+    def copy_from(
+        cls,
+        source_collection_record_id: str,
+        documents: list[Document],
+        collection_record_id: str,
+        knowledge_base_id: str | None = None,
+        embedding_function: EmbeddingFunction = SyncEmbeddingFunction(),
+        quantization: str = "none",
+        **_: dict,
+    ):
+        """复用源 collection 的向量：优先读取向量文件，其次从 Chroma 读取"""
+        if knowledge_base_id is None:
+            raise ValueError("ANNRetriever requires knowledge_base_id")
+
+        vectors = load_vectors(source_collection_record_id)
+        if vectors is None:
+            result = get_collection(
+                source_collection_record_id, embedding_function=embedding_function
+            ).get(ids=[doc.id for doc in documents], include=["embeddings"])  # type: ignore
+            embeddings = dict(zip(result["ids"], result["embeddings"]))  # type: ignore
+            vectors = np.asarray(
+                [embeddings[doc.id] for doc in documents], dtype=np.float32
+            )
+        if len(vectors) != len(documents):
+            raise ValueError(
+                f"Vector count mismatch for {source_collection_record_id}"
+            )
+
+        save_vectors(collection_record_id, np.asarray(vectors))
+        cls._write_index(knowledge_base_id, [collection_record_id], quantization)
+
+    @classmethod
+    def remove(cls, knowledge_base_id: str, collection_record_id: str):
+        """从知识库索引中删除一个 collection（标记删除），并删除其向量文件"""
+        with index_lock(knowledge_base_id):
+            index = load_index(knowledge_base_id)
+            if collection_record_id in index.collections:
+                index.remove_collection(collection_record_id)
+                index.save()
+        if os.path.exists(vector_path(collection_record_id)):
+            os.remove(vector_path(collection_record_id))
+
+    def _refresh(self) -> HNSWIndex | QuantizedIndex:
+        """worker 进程写入索引后重新加载，返回本次检索使用的索引。
+
+        实例在线程间共享：新索引加载完成后才替换引用，正在检索的线程继续使用旧索引。
+        """
+        if self.index.changed_on_disk():
+            with self._refresh_lock:
+                if self.index.changed_on_disk():
+                    self.index = load_index(self.knowledge_base_id)
+        return self.index
+
+    def _to_documents(self, hits: list[tuple[str, int, float]]) -> list[Document]:
+        return [
+            self.documents[cid][pos]
+            for cid, pos, _ in hits
+            if cid in self.documents and pos < len(self.documents[cid])
+        ]
+
+    @traced("retriever.ann.retrieve_batch")
+    @timed(RETRIEVER_LATENCY, retriever="ann", method="retrieve_batch")
+    def retrieve_batch(
+        self,
+        queries: list[str],
+        top_k: int = 10,
+        collection_ids: list[str] | None = None,
+        query_embeddings: np.ndarray | list | None = None,
+        **_: dict,
+    ) -> list[list[Document]]:
+        """批量检索：所有 query 一次向量化，一次 knn_query"""
+        index = self._refresh()
+        results: list[list[Document]] = [[] for _ in queries]
+        active = [i for i, query in enumerate(queries) if query]
+        if not active or top_k <= 0:
+            return results
+
+        if query_embeddings is None:
+            vectors = self.embed([queries[i] for i in active], self.embedding_function)
+        else:
+            vectors = np.asarray(query_embeddings, dtype=np.float32)[active]
+
+        hits = index.search(
+            vectors,
+            top_k,
+            collection_ids if collection_ids is not None else self.collection_ids,
+        )
+        for i, query_hits in zip(active, hits):
+            results[i] = self._to_documents(query_hits)
+        return results
+
+    @traced("retriever.ann.retrieve_routed")
+    @timed(RETRIEVER_LATENCY, retriever="ann", method="retrieve_routed")
+    def retrieve_routed(
+        self, query: dict | str, query_route: dict[str, int]
+    ) -> list[Document]:
+        """每个 collection 的 query 按语言独立选择，结果按距离全局合并"""
+        index = self._refresh()
+        routes = {
+            cid: k for cid, k in query_route.items() if cid in self.documents and k > 0
+        }
+        route_queries = {
+            cid: resolve_query(query, self.language.get(cid, "EN")) for cid in routes
+        }
+        texts = list(dict.fromkeys(q for q in route_queries.values() if q))
+        if not texts:
+            return []
+        vectors = dict(zip(texts, self.embed(texts, self.embedding_function)))
+
+        hits: list[tuple[str, int, float]] = []
+        for cid, k in routes.items():
+            text = route_queries[cid]
+            if text:
+                hits.extend(index.search(vectors[text][None, :], k, [cid])[0])
+
+        hits.sort(key=lambda x: x[2])
+        return self._to_documents(hits)
+
+    @traced("retriever.ann.retrieve")
+    @timed(RETRIEVER_LATENCY, retriever="ann", method="retrieve")
+    def retrieve(
+        self, query: dict | str, top_k: int = 10, query_route: dict | None = None
+    ) -> list[Document]:
+        if not self.documents:
+            return []
+
+        if query_route:
+            return self.retrieve_routed(query, query_route)
+        return self.retrieve_batch(
+            [query.get("EN", "") if isinstance(query, dict) else query], top_k
+        )[0]
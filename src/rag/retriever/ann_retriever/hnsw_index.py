@@ -0,0 +1,254 @@
+"""本地 HNSW 向量索引（hnswlib）
+
+每个知识库一个索引目录 <index_dir>/<knowledge_base_id>/：
+- index.bin   hnswlib 索引，label 为连续整数
+- meta.json   维度、下一个 label、collection -> [起始 label, 数量]
+
+每个 collection 的原始向量另存为 <chunk_dir>/<collection_id>.vec.npy（float32），
+检索时以内存映射方式读取，不占用常驻内存；重建索引、跨知识库复用向量都直接读取该文件。
+"""
+
+import bisect
+import json
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+from config import rag_cfg
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+ann_cfg = rag_cfg.get("ann", {})
+
+
+def index_dir(knowledge_base_id: str) -> str:
+    return os.path.join(ann_cfg.get("index_dir", "data/ann_index"), knowledge_base_id)
+
+
+def vector_path(collection_record_id: str) -> str:
+    return os.path.join(rag_cfg["chunk_dir"], collection_record_id + ".vec.npy")
+
+
+def save_vectors(collection_record_id: str, vectors: np.ndarray):
+    path = vector_path(collection_record_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    np.save(path, np.ascontiguousarray(vectors, dtype=np.float32))
+
+
+def load_vectors(collection_record_id: str) -> np.ndarray | None:
+    """以内存映射方式读取 collection 的向量，不存在时返回 None"""
+    path = vector_path(collection_record_id)
+    if not os.path.exists(path):
+        return None
+    return np.load(path, mmap_mode="r")
+
+
+_thread_locks: dict[str, threading.Lock] = {}
+_thread_locks_guard = threading.Lock()
+
+
+@contextmanager
+def index_lock(knowledge_base_id: str):
+    """同一知识库索引的写锁：进程内线程锁 + 跨进程文件锁（worker 与 API 进程）"""
+    with _thread_locks_guard:
+        lock = _thread_locks.setdefault(knowledge_base_id, threading.Lock())
+    with lock:
+        directory = index_dir(knowledge_base_id)
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, ".lock"), "w") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _hnswlib():
+    try:
+        import hnswlib
+    except ImportError as e:
+        raise ImportError(
+            'ANN 检索器需要 hnswlib，请安装可选依赖: pip install ".[ann]"'
+        ) from e
+    return hnswlib
+
+
+class HNSWIndex:
+    """单个知识库的 HNSW 索引，支持增量写入与按 collection 过滤检索"""
+
+    def __init__(self, knowledge_base_id: str):
+        self.knowledge_base_id = knowledge_base_id
+        self.directory = index_dir(knowledge_base_id)
+        self.index = None
+        self.dim: int | None = None
+        self.next_label = 0
+        # collection_id -> (起始 label, 数量)
+        self.collections: dict[str, tuple[int, int]] = {}
+        self.mtime = 0.0
+        self._starts: list[int] = []
+        self._owners: list[str] = []
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.directory, "index.bin")
+
+    @property
+    def meta_path(self) -> str:
+        return os.path.join(self.directory, "meta.json")
+
+    @classmethod
+    def load(cls, knowledge_base_id: str) -> "HNSWIndex":
+        index = cls(knowledge_base_id)
+        index.reload()
+        return index
+
+    def changed_on_disk(self) -> bool:
+        """其他进程（worker）写入后 meta.json 会更新"""
+        try:
+            return os.path.getmtime(self.meta_path) != self.mtime
+        except FileNotFoundError:
+            return self.index is not None
+
+    def reload(self):
+        if not os.path.exists(self.meta_path):
+            self.index, self.dim, self.next_label, self.collections = None, None, 0, {}
+            self._rebuild_owners()
+            return
+
+        with open(self.meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.mtime = os.path.getmtime(self.meta_path)
+        self.dim = meta["dim"]
+        self.next_label = meta["next_label"]
+        self.collections = {
+            cid: (start, count) for cid, (start, count) in meta["collections"].items()
+        }
+
+        self.index = _hnswlib().Index(space=ann_cfg.get("space", "cosine"), dim=self.dim)
+        self.index.load_index(self.index_path, max_elements=max(1, self.next_label))
+        self.index.set_ef(ann_cfg.get("ef", 64))
+        self._rebuild_owners()
+
+    def save(self):
+        if self.index is None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self.index.save_index(self.index_path)
+        meta = {
+            "dim": self.dim,
+            "next_label": self.next_label,
+            "collections": {cid: list(v) for cid, v in self.collections.items()},
+        }
+        tmp_path = self.meta_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.meta_path)
+        self.mtime = os.path.getmtime(self.meta_path)
+
+    def _rebuild_owners(self):
+        ordered = sorted(self.collections.items(), key=lambda x: x[1][0])
+        self._starts = [start for _, (start, _) in ordered]
+        self._owners = [cid for cid, _ in ordered]
+
+    def _ensure_index(self, dim: int, extra: int):
+        if self.index is None:
+            self.dim = dim
+            self.index = _hnswlib().Index(space=ann_cfg.get("space", "cosine"), dim=dim)
+            self.index.init_index(
+                max_elements=max(1024, extra),
+                M=ann_cfg.get("M", 16),
+                ef_construction=ann_cfg.get("ef_construction", 200),
+                allow_replace_deleted=False,
+            )
+            self.index.set_ef(ann_cfg.get("ef", 64))
+        elif dim != self.dim:
+            raise ValueError(f"向量维度不一致: 索引为 {self.dim}，写入为 {dim}")
+
+        required = self.next_label + extra
+        capacity = self.index.get_max_elements()
+        if required > capacity:
+            # 按倍数扩容，避免频繁 resize
+            self.index.resize_index(max(required, capacity * 2))
+
+    def add_collection(self, collection_record_id: str, vectors: np.ndarray):
+        """增量写入一个 collection 的向量，已存在时先删除旧向量"""
+        if len(vectors) == 0:
+            return
+        self.remove_collection(collection_record_id)
+        self._ensure_index(vectors.shape[1], len(vectors))
+
+        start = self.next_label
+        labels = np.arange(start, start + len(vectors))
+        self.index.add_items(np.asarray(vectors, dtype=np.float32), labels)  # type: ignore
+        self.collections[collection_record_id] = (start, len(vectors))
+        self.next_label += len(vectors)
+        self._rebuild_owners()
+
+    def remove_collection(self, collection_record_id: str):
+        if collection_record_id not in self.collections:
+            return
+        start, count = self.collections.pop(collection_record_id)
+        for label in range(start, start + count):
+            self.index.mark_deleted(label)  # type: ignore
+        self._rebuild_owners()
+
+    def owner(self, label: int) -> tuple[str, int]:
+        """label -> (collection_id, collection 内的分块序号)"""
+        i = bisect.bisect_right(self._starts, label) - 1
+        cid = self._owners[i]
+        return cid, label - self.collections[cid][0]
+
+    def search(
+        self,
+        query_vectors: np.ndarray,
+        k: int,
+        collection_ids: list[str] | None = None,
+        ef: int | None = None,
+    ) -> list[list[tuple[str, int, float]]]:
+        """检索每个 query 的 k 个近邻
+
+        Returns:
+            list[list[(collection_id, 分块序号, 距离)]]，距离升序
+        """
+        if self.index is None or k <= 0 or not self.collections:
+            return [[] for _ in range(len(query_vectors))]
+
+        ranges = None
+        available = sum(count for _, count in self.collections.values())
+        if collection_ids is not None:
+            ranges = [self.collections[c] for c in collection_ids if c in self.collections]
+            if not ranges:
+                return [[] for _ in range(len(query_vectors))]
+            available = sum(count for _, count in ranges)
+        filter_fn = (
+            (
+                lambda label: any(
+                    start <= label < start + count for start, count in ranges
+                )
+            )
+            if ranges is not None
+            else None
+        )
+
+        k = min(k, available)
+        self.index.set_ef(max(ef or ann_cfg.get("ef", 64), k))
+        labels, distances = self.index.knn_query(
+            np.asarray(query_vectors, dtype=np.float32), k=k, filter=filter_fn
+        )
+        return [
+            [(*self.owner(int(label)), float(dist)) for label, dist in zip(row, dists)]
+            for row, dists in zip(labels, distances)
+        ]
+
+
+def delete_index(knowledge_base_id: str):
+    shutil.rmtree(index_dir(knowledge_base_id), ignore_errors=True)
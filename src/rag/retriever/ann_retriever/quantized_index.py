@@ -0,0 +1,412 @@
+"""量化向量索引：int8 标量量化 / 乘积量化（PQ）
+
+与 HNSWIndex 接口一致，目录结构相同（<index_dir>/<knowledge_base_id>/meta.json），
+常驻内存的只有量化编码：
+- int8: 每个向量 dim 字节 + 1 个 float32 缩放系数（约为 float32 的 1/4）
+- pq:   每个向量 pq_m 字节（1024 维、pq_m=64 时约为 float32 的 1/64）
+
+检索先用量化编码对候选 collection 做暴力扫描取 k * rescore 个候选，
+再从内存映射的 .vec.npy 读取候选的原始 float 向量精确重排。
+量化索引固定使用余弦相似度。
+"""
+
+import bisect
+import json
+import os
+
+import numpy as np
+
+from .hnsw_index import HNSWIndex, ann_cfg, index_dir, load_vectors
+
+
+QUANTIZATION_TYPES = ("none", "int8", "pq")
+
+# 暴力扫描时每次反量化的行数，限制临时内存
+_SCAN_BLOCK = 65536
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def encode_int8(vectors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """按向量对称量化到 int8，不需要训练，可直接增量写入
+
+    Returns:
+        (int8 编码 [n, dim], 缩放系数 [n])
+    """
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def _nearest(x: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    distances = (
+        -2 * x @ centroids.T + (centroids**2).sum(axis=1)[None, :]
+    )  # ||x||^2 与 argmin 无关
+    return distances.argmin(axis=1)
+
+
+def _kmeans(
+    x: np.ndarray, k: int, iterations: int, rng: np.random.Generator
+) -> np.ndarray:
+    centroids = x[rng.choice(len(x), k, replace=False)].copy()
+    for _ in range(iterations):
+        assign = _nearest(x, centroids)
+        counts = np.bincount(assign, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, x)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+        # 空簇重新随机取点
+        if not filled.all():
+            centroids[~filled] = x[rng.choice(len(x), int((~filled).sum()))]
+    return centroids
+
+
+def pq_subspaces(dim: int, m: int) -> int:
+    """不超过 m 且能整除 dim 的子空间数"""
+    m = max(1, min(m, dim))
+    while dim % m:
+        m -= 1
+    return m
+
+
+def train_pq(
+    vectors: np.ndarray, m: int, iterations: int = 20, seed: int = 0
+) -> np.ndarray:
+    """训练 PQ 码本
+
+    Returns:
+        码本 [m, k, dim / m]，k = min(256, 训练向量数)
+    """
+    rng = np.random.default_rng(seed)
+    n, dim = vectors.shape
+    ds = dim // m
+    k = min(256, n)
+    return np.stack(
+        [
+            _kmeans(vectors[:, j * ds : (j + 1) * ds], k, iterations, rng)
+            for j in range(m)
+        ]
+    ).astype(np.float32)
+
+
+def encode_pq(vectors: np.ndarray, codebook: np.ndarray) -> np.ndarray:
+    m, _, ds = codebook.shape
+    codes = np.empty((len(vectors), m), dtype=np.uint8)
+    for j in range(m):
+        codes[:, j] = _nearest(vectors[:, j * ds : (j + 1) * ds], codebook[j])
+    return codes
+
+
+class QuantizedIndex:
+    """单个知识库的量化向量索引，label 即编码矩阵的行号（按 collection 连续存放）"""
+
+    def __init__(self, knowledge_base_id: str, quantization: str = "int8"):
+        if quantization not in ("int8", "pq"):
+            raise ValueError(f"Invalid quantization: {quantization}")
+        self.knowledge_base_id = knowledge_base_id
+        self.quantization = quantization
+        self.directory = index_dir(knowledge_base_id)
+        self.dim: int | None = None
+        self.codes: np.ndarray | None = None
+        self.scales: np.ndarray | None = None  # int8
+        self.codebook: np.ndarray | None = None  # pq
+        self.trained_on = 0  # pq 码本的训练向量数
+        # collection_id -> (起始行, 数量)
+        self.collections: dict[str, tuple[int, int]] = {}
+        self.mtime = 0.0
+        self._starts: list[int] = []
+        self._owners: list[str] = []
+        # 原始向量读取方式，rescore 与重新训练码本时使用
+        self.vector_loader = load_vectors
+
+    @property
+    def meta_path(self) -> str:
+        return os.path.join(self.directory, "meta.json")
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name + ".npy")
+
+    @property
+    def next_label(self) -> int:
+        return 0 if self.codes is None else len(self.codes)
+
+    @classmethod
+    def load(
+        cls, knowledge_base_id: str, quantization: str = "int8"
+    ) -> "QuantizedIndex":
+        index = cls(knowledge_base_id, quantization)
+        index.reload()
+        return index
+
+    def changed_on_disk(self) -> bool:
+        try:
+            return os.path.getmtime(self.meta_path) != self.mtime
+        except FileNotFoundError:
+            return self.codes is not None
+
+    def reload(self):
+        if not os.path.exists(self.meta_path):
+            self.dim, self.codes, self.scales, self.codebook = None, None, None, None
+            self.collections = {}
+            self._rebuild_owners()
+            return
+
+        with open(self.meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.mtime = os.path.getmtime(self.meta_path)
+        self.quantization = meta["quantization"]
+        self.dim = meta["dim"]
+        self.trained_on = meta.get("trained_on", 0)
+        self.collections = {
+            cid: (start, count) for cid, (start, count) in meta["collections"].items()
+        }
+        self.codes = np.load(self._path("codes"))
+        if self.quantization == "int8":
+            self.scales = np.load(self._path("scales"))
+        else:
+            self.codebook = np.load(self._path("codebook"))
+        self._rebuild_owners()
+
+    def save(self):
+        if self.codes is None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        arrays = {"codes": self.codes}
+        if self.quantization == "int8":
+            arrays["scales"] = self.scales
+        else:
+            arrays["codebook"] = self.codebook
+        for name, array in arrays.items():
+            tmp_path = self._path(name + ".tmp")
+            np.save(tmp_path, array)
+            os.replace(tmp_path, self._path(name))
+
+        meta = {
+            "quantization": self.quantization,
+            "dim": self.dim,
+            "next_label": self.next_label,
+            "trained_on": self.trained_on,
+            "collections": {cid: list(v) for cid, v in self.collections.items()},
+        }
+        tmp_path = self.meta_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.meta_path)
+        self.mtime = os.path.getmtime(self.meta_path)
+
+    def memory_bytes(self) -> int:
+        """常驻内存的编码大小（字节）"""
+        return sum(
+            array.nbytes
+            for array in (self.codes, self.scales, self.codebook)
+            if array is not None
+        )
+
+    def _encode(self, vectors: np.ndarray) -> tuple[np.ndarray, np.ndarray | None]:
+        if self.quantization == "int8":
+            return encode_int8(vectors)
+        return encode_pq(vectors, self.codebook), None  # type: ignore
+
+    def _train(self, vectors: np.ndarray):
+        sample_size = ann_cfg.get("pq_train_size", 20000)
+        if len(vectors) > sample_size:
+            rng = np.random.default_rng(0)
+            vectors = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+        m = pq_subspaces(vectors.shape[1], ann_cfg.get("pq_m", 64))
+        self.codebook = train_pq(vectors, m)
+        self.trained_on = len(vectors)
+
+    def _retrain(self):
+        """数据量增长到训练量的 4 倍以上时，用全部原始向量重新训练码本并重新编码"""
+        ordered = sorted(self.collections.items(), key=lambda x: x[1][0])
+        parts = [self.vector_loader(cid) for cid, _ in ordered]
+        if any(part is None for part in parts):
+            return
+        vectors = normalize(np.concatenate(parts))  # type: ignore
+        self._train(vectors)
+        self.codes = encode_pq(vectors, self.codebook)  # type: ignore
+
+    def add_collection(self, collection_record_id: str, vectors: np.ndarray):
+        """增量写入一个 collection 的向量，已存在时先删除旧向量"""
+        if len(vectors) == 0:
+            return
+        self.remove_collection(collection_record_id)
+        vectors = normalize(vectors)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(
+                f"向量维度不一致: 索引为 {self.dim}，写入为 {vectors.shape[1]}"
+            )
+
+        if self.quantization == "pq" and self.codebook is None:
+            self._train(vectors)
+        codes, scales = self._encode(vectors)
+
+        start = self.next_label
+        self.codes = codes if self.codes is None else np.concatenate([self.codes, codes])
+        if scales is not None:
+            self.scales = (
+                scales if self.scales is None else np.concatenate([self.scales, scales])
+            )
+        self.collections[collection_record_id] = (start, len(vectors))
+        self._rebuild_owners()
+
+        pq_train_size = ann_cfg.get("pq_train_size", 20000)
+        if (
+            self.quantization == "pq"
+            and self.trained_on < pq_train_size
+            and self.next_label >= 4 * self.trained_on
+        ):
+            self._retrain()
+
+    def remove_collection(self, collection_record_id: str):
+        """删除一个 collection 的编码，后续 collection 的行号前移"""
+        if collection_record_id not in self.collections:
+            return
+        start, count = self.collections.pop(collection_record_id)
+        keep = np.r_[0:start, start + count : self.next_label]
+        self.codes = self.codes[keep]  # type: ignore
+        if self.scales is not None:
+            self.scales = self.scales[keep]
+        self.collections = {
+            cid: (s - count if s > start else s, c)
+            for cid, (s, c) in self.collections.items()
+        }
+        self._rebuild_owners()
+
+    def _rebuild_owners(self):
+        ordered = sorted(self.collections.items(), key=lambda x: x[1][0])
+        self._starts = [start for _, (start, _) in ordered]
+        self._owners = [cid for cid, _ in ordered]
+
+    def owner(self, label: int) -> tuple[str, int]:
+        """label -> (collection_id, collection 内的分块序号)"""
+        i = bisect.bisect_right(self._starts, label) - 1
+        cid = self._owners[i]
+        return cid, label - self.collections[cid][0]
+
+    def _approx_scores(
+        self, queries: np.ndarray, tables: np.ndarray | None, start: int, end: int
+    ) -> np.ndarray:
+        """近似内积 [end - start, query 数]"""
+        if self.quantization == "int8":
+            block = self.codes[start:end].astype(np.float32)  # type: ignore
+            return (block @ queries.T) * self.scales[start:end, None]  # type: ignore
+
+        # PQ: 查表求和（ADC）
+        codes = self.codes[start:end]  # type: ignore
+        subspaces = np.arange(codes.shape[1])[None, :]
+        return np.stack(
+            [table[subspaces, codes].sum(axis=1) for table in tables],  # type: ignore
+            axis=1,
+        )
+
+    def _rescore(
+        self, query: np.ndarray, labels: np.ndarray, approx: np.ndarray
+    ) -> list[tuple[str, int, float]]:
+        hits = []
+        loaded: dict[str, np.ndarray | None] = {}
+        for label, score in zip(labels, approx):
+            cid, pos = self.owner(int(label))
+            if cid not in loaded:
+                loaded[cid] = self.vector_loader(cid)
+            vectors = loaded[cid]
+            if vectors is not None:
+                score = float(normalize(vectors[pos]) @ query)
+            hits.append((cid, pos, 1.0 - float(score)))
+        hits.sort(key=lambda x: x[2])
+        return hits
+
+    def search(
+        self,
+        query_vectors: np.ndarray,
+        k: int,
+        collection_ids: list[str] | None = None,
+        ef: int | None = None,
+        rescore: int | None = None,
+    ) -> list[list[tuple[str, int, float]]]:
+        """检索每个 query 的 k 个近邻
+
+        Args:
+            rescore: 取 k * rescore 个候选用原始向量重排，0 表示不重排。
+
+        Returns:
+            list[list[(collection_id, 分块序号, 余弦距离)]]，距离升序
+        """
+        if self.codes is None or k <= 0 or not self.collections:
+            return [[] for _ in range(len(query_vectors))]
+
+        if collection_ids is None:
+            ranges = list(self.collections.values())
+        else:
+            ranges = [self.collections[c] for c in collection_ids if c in self.collections]
+            if not ranges:
+                return [[] for _ in range(len(query_vectors))]
+
+        queries = normalize(query_vectors)
+        tables = None
+        if self.quantization == "pq":
+            m, _, ds = self.codebook.shape  # type: ignore
+            # [query, 子空间, 码字]
+            tables = np.einsum(
+                "qmd,mkd->qmk", queries.reshape(len(queries), m, ds), self.codebook
+            )
+
+        rows, scores = [], []
+        for start, count in ranges:
+            for block_start in range(start, start + count, _SCAN_BLOCK):
+                block_end = min(block_start + _SCAN_BLOCK, start + count)
+                rows.append(np.arange(block_start, block_end))
+                scores.append(
+                    self._approx_scores(queries, tables, block_start, block_end)
+                )
+        rows = np.concatenate(rows)
+        scores = np.concatenate(scores)
+
+        if rescore is None:
+            rescore = ann_cfg.get("rescore", 4)
+        num_candidates = min(len(rows), max(k, k * rescore))
+        results = []
+        for j, query in enumerate(queries):
+            column = scores[:, j]
+            if num_candidates < len(column):
+                candidates = np.argpartition(-column, num_candidates - 1)[:num_candidates]
+            else:
+                candidates = np.arange(len(column))
+            candidates = candidates[np.argsort(-column[candidates], kind="stable")]
+            if rescore:
+                hits = self._rescore(query, rows[candidates], column[candidates])
+            else:
+                hits = [
+                    (*self.owner(int(rows[i])), 1.0 - float(column[i]))
+                    for i in candidates
+                ]
+            results.append(hits[:k])
+        return results
+
+
+def read_quantization(knowledge_base_id: str) -> str | None:
+    """已有索引的量化方式，索引不存在时返回 None"""
+    meta_path = os.path.join(index_dir(knowledge_base_id), "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, "r", encoding="utf-8") as f:
+        return json.load(f).get("quantization", "none")
+
+
+def load_index(
+    knowledge_base_id: str, quantization: str | None = None
+) -> HNSWIndex | QuantizedIndex:
+    """加载知识库的向量索引；已有索引以落盘时的量化方式为准，
+    新建索引使用 quantization（默认不量化，即 HNSW）"""
+    quantization = read_quantization(knowledge_base_id) or quantization or "none"
+    if quantization == "none":
+        return HNSWIndex.load(knowledge_base_id)
+    return QuantizedIndex.load(knowledge_base_id, quantization)
@@ -1,15 +1,67 @@
 import os
 import pickle
+import shutil
 
 from langchain_core.documents import Document
-from langchain_community.retrievers import BM25Retriever as LangchainBM25Retriever
+from scipy import sparse
 
-from src.rag.utils import remove_duplicates
+from src.rag.utils import remove_duplicates, resolve_query
+from src.metrics import RETRIEVER_LATENCY, record_cache, timed
+from src.tracing import traced
+from .tokenizer import get_tokenizer, tokenize_zh, tokenizer_id
+from .sparse_index import BM25Index, term_frequencies
 from config import rag_cfg
 from logging import getLogger
 
 logger = getLogger(__name__)
 
+bm25_cfg = rag_cfg.get("bm25", {})
+
+
+def index_cache_path(collection_record_id: str) -> str:
+    return os.path.join(rag_cfg["chunk_dir"], collection_record_id + ".bm25.pkl")
+
+
+def save_index(collection_record_id: str, tokens: list[list[str]], language: str):
+    """保存 collection 的局部词表与词频矩阵"""
+    vocab, tf = term_frequencies(tokens)
+    path = index_cache_path(collection_record_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        pickle.dump({"tokenizer": tokenizer_id(language), "vocab": vocab, "tf": tf}, f)
+
+
+def read_index_cache(
+    path: str, language: str
+) -> tuple[list[str], sparse.csr_matrix] | None:
+    """读取词频缓存，分词器不一致（语言/配置/版本变化）时视为失效"""
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        cache = pickle.load(f)
+    if cache.get("tokenizer") != tokenizer_id(language):
+        return None
+    return cache["vocab"], cache["tf"]
+
+
+def load_index_part(
+    collection_record_id: str, documents: list[Document], language: str
+) -> tuple[list[str], sparse.csr_matrix]:
+    """优先使用 ingest 时缓存的词频矩阵，缓存缺失或失效时重新分词并写回"""
+    cached = read_index_cache(index_cache_path(collection_record_id), language)
+    hit = cached is not None and cached[1].shape[0] == len(documents)
+    record_cache("bm25.term_frequencies", hit)
+    if hit:
+        return cached  # type: ignore
+
+    tokenizer = get_tokenizer(language)
+    tokens = [tokenizer(doc.page_content) for doc in documents]
+    try:
+        save_index(collection_record_id, tokens, language)
+    except OSError as e:
+        logger.warning(f"BM25 索引缓存写入失败: {collection_record_id}", exc_info=e)
+    return term_frequencies(tokens)
+
 
 class BM25Retriever:
     _instances = {}
@@ -22,6 +74,7 @@ class BM25Retriever:
         if isinstance(collection_record_ids, str):
             collection_record_ids = [collection_record_ids]
         key = frozenset(str(i) for i in collection_record_ids)
+        record_cache("retriever.bm25", key in cls._instances)
         if key not in cls._instances:
             instance = super().__new__(cls)
             cls._instances[key] = instance
@@ -38,62 +91,162 @@ class BM25Retriever:
             collection_record_ids = [collection_record_ids]
         self._initialized = True
 
-        all_documents = []
-        self.bm25_retrievers: dict[str, LangchainBM25Retriever] = {}
+        self.documents: list[Document] = []
         self.language: dict[str, str] = {}
+        parts = []
         for cid in collection_record_ids:
+            self.language[cid] = language.get(cid, "EN") if language else "EN"
             with open(
                 os.path.join(rag_cfg["chunk_dir"], cid + ".pkl"),
                 "rb",
             ) as f:
                 documents = pickle.load(f)
-                self.bm25_retrievers[cid] = LangchainBM25Retriever.from_documents(
-                    documents
-                )
-                self.language[cid] = language.get(cid, "EN") if language else "EN"
-                all_documents.extend(documents)
-        self.all_retriever = LangchainBM25Retriever.from_documents(all_documents)
+            vocab, tf = load_index_part(cid, documents, self.language[cid])
+            parts.append((cid, vocab, tf))
+            self.documents.extend(documents)
+
+        # 所有 collection 合并为一个索引，IDF 按合并后的语料计算
+        self.index = BM25Index(
+            parts, k1=bm25_cfg.get("k1", 1.5), b=bm25_cfg.get("b", 0.75)
+        )
 
     @classmethod
     def ingest(
         cls,
         documents: list[Document],
         collection_record_id: str,
+        language: str = "EN",
         **_: dict,
     ) -> None:
         """
-        使用原始chunk即可
+        使用原始chunk，按 collection 语言分词并预计算词频矩阵，检索时只需对 query 分词
         """
-        ...  # No additional processing needed for BM25
+        tokenizer = get_tokenizer(language)
+        save_index(
+            collection_record_id,
+            [tokenizer(doc.page_content) for doc in documents],
+            language,
+        )
+
+    @classmethod
+    def ingest_many(
+        cls,
+        chunk_sets: dict[str, list[Document]],
+        languages: dict[str, str] | None = None,
+        **kwargs,
+    ) -> None:
+        for collection_record_id, documents in chunk_sets.items():
+            cls.ingest(
+                documents,
+                collection_record_id=collection_record_id,
+                language=(languages or {}).get(collection_record_id, "EN"),
+                **kwargs,
+            )
 
+    @classmethod
+    def copy_from(
+        cls,
+        source_collection_record_id: str,
+        documents: list[Document],
+        collection_record_id: str,
+        language: str = "EN",
+        **kwargs,
+    ) -> None:
+        """BM25 只依赖分块文件与词频缓存，分块相同时直接复制词频缓存"""
+        source_path = index_cache_path(source_collection_record_id)
+        cached = read_index_cache(source_path, language)
+        if cached is not None and cached[1].shape[0] == len(documents):
+            shutil.copyfile(source_path, index_cache_path(collection_record_id))
+        else:
+            cls.ingest(
+                documents,
+                collection_record_id=collection_record_id,
+                language=language,
+                **kwargs,
+            )
+
+    @traced("retriever.bm25.retrieve_batch")
+    @timed(RETRIEVER_LATENCY, retriever="bm25", method="retrieve_batch")
+    def retrieve_batch(
+        self,
+        queries: list[str],
+        top_k: int = 10,
+        collection_ids: list[str] | None = None,
+        language: str | None = None,
+        **_: dict,
+    ) -> list[list[Document]]:
+        """批量检索：所有 query 组成一个 query 矩阵，一次稀疏矩阵乘法打分。
+
+        Args:
+            queries (list[str]): query 列表（语言变体、多 query 扩展、多用户请求等）。
+            top_k (int): 每个 query 返回的文档数。
+            collection_ids (list[str], optional): 只在这些 collection 中检索。
+            language (str, optional): query 分词语言，默认使用中英混合分词。
+
+        Returns:
+            list[list[Document]]: 与 queries 一一对应的排序结果。
+        """
+        if self.index.num_docs == 0:
+            return [[] for _ in queries]
+
+        tokenizer = get_tokenizer(language) if language else tokenize_zh
+        hits = self.index.top_k_many(
+            [tokenizer(query) for query in queries], top_k, collection_ids
+        )
+        return [[self.documents[row] for row, _ in query_hits] for query_hits in hits]
+
+    @traced("retriever.bm25.retrieve_routed")
+    @timed(RETRIEVER_LATENCY, retriever="bm25", method="retrieve_routed")
+    def retrieve_routed(
+        self, query: dict | str, query_route: dict[str, int]
+    ) -> list[Document]:
+        """按路由结果在各 collection 中检索，结果按分数全局合并。
+
+        每个 collection 的 query 按其语言独立选择；同语言的 collection 共用一个 query，
+        对这些 collection 的行区间一次打分后再分别取 top-k。
+        """
+        routes = {
+            cid: k
+            for cid, k in query_route.items()
+            if cid in self.index.offsets and k > 0
+        }
+        by_language: dict[str, dict[str, int]] = {}
+        for cid, k in routes.items():
+            by_language.setdefault(self.language.get(cid, "EN"), {})[cid] = k
+
+        hits: list[tuple[float, Document]] = []
+        for language, ks in by_language.items():
+            query_tokens = get_tokenizer(language)(resolve_query(query, language))
+            per_collection = self.index.top_k_per_collection(query_tokens, ks)
+            for collection_hits in per_collection.values():
+                hits.extend(
+                    (score, self.documents[row]) for row, score in collection_hits
+                )
+
+        hits.sort(key=lambda x: -x[0])
+        return [doc for _, doc in hits]
+
+    @traced("retriever.bm25.retrieve")
+    @timed(RETRIEVER_LATENCY, retriever="bm25", method="retrieve")
     def retrieve(
         self, query: dict | str, top_k: int = 10, query_route: dict | None = None
     ) -> list[Document]:
-        if len(self.bm25_retrievers) == 0:
+        if self.index.num_docs == 0:
             return []
 
         documents = []
         if query_route:
-            for record_id, k in query_route.items():
-                if self.bm25_retrievers[record_id] is not None and k > 0:
-                    if isinstance(query, dict):
-                        doc_language = self.language.get(record_id, "EN")
-                        query = query.get(doc_language, "")
-                    self.bm25_retrievers[record_id].k = k
-                    documents.extend(self.bm25_retrievers[record_id].invoke(query))  # type: ignore
-
+            documents = self.retrieve_routed(query, query_route)
         else:
-            self.all_retriever.k = top_k // 2
-            documents.extend(
-                self.all_retriever.invoke(
-                    query.get("EN", "") if isinstance(query, dict) else query
-                )
-            )
-            documents.extend(
-                self.all_retriever.invoke(
-                    query.get("ZH", "") if isinstance(query, dict) else query
-                )
+            # 跨语言的全局检索：中英文 query 一次打分
+            # 中文分词器对英文的处理与英文分词器一致
+            queries = (
+                [query.get("EN", ""), query.get("ZH", "")]
+                if isinstance(query, dict)
+                else [query]
             )
+            for query_documents in self.retrieve_batch(queries, top_k // 2):
+                documents.extend(query_documents)
             documents = remove_duplicates(documents)
 
         return documents
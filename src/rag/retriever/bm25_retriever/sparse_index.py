@@ -0,0 +1,225 @@
+"""基于 SciPy 稀疏矩阵的 BM25 索引
+
+ingest 时每个 collection 只保存自己的词表与词频矩阵（文档 x 词，CSR）；
+加载时合并为全局词表，按合并后的语料计算 IDF 与文档长度归一化，
+得到 BM25 权重矩阵 W。检索即一次稀疏矩阵乘法 W @ q，top-k 使用 argpartition。
+每个 collection 占据 W 中连续的行，query_route 只需对行切片打分，无需重建索引。
+"""
+
+import numpy as np
+from scipy import sparse
+
+
+def term_frequencies(tokens: list[list[str]]) -> tuple[list[str], sparse.csr_matrix]:
+    """将分词结果转换为局部词表与词频矩阵"""
+    vocab: dict[str, int] = {}
+    indptr = [0]
+    indices: list[int] = []
+    data: list[int] = []
+    for doc_tokens in tokens:
+        counts: dict[int, int] = {}
+        for token in doc_tokens:
+            col = vocab.setdefault(token, len(vocab))
+            counts[col] = counts.get(col, 0) + 1
+        indices.extend(counts.keys())
+        data.extend(counts.values())
+        indptr.append(len(indices))
+
+    tf = sparse.csr_matrix(
+        (
+            np.asarray(data, dtype=np.float32),
+            np.asarray(indices, dtype=np.int32),
+            np.asarray(indptr, dtype=np.int64),
+        ),
+        shape=(len(tokens), len(vocab)),
+    )
+    return list(vocab.keys()), tf
+
+
+class BM25Index:
+    """多个 collection 合并的 BM25 索引（Okapi BM25，IDF 取 Lucene 形式，恒为正）"""
+
+    def __init__(
+        self,
+        parts: list[tuple[str, list[str], sparse.csr_matrix]],
+        k1: float = 1.5,
+        b: float = 0.75,
+    ):
+        """
+        Args:
+            parts: [(collection_record_id, 局部词表, 局部词频矩阵), ...]，
+                行顺序即文档顺序。
+        """
+        self.vocab: dict[str, int] = {}
+        self.offsets: dict[str, tuple[int, int]] = {}
+
+        blocks = []
+        start = 0
+        for cid, local_vocab, tf in parts:
+            mapping = np.fromiter(
+                (self.vocab.setdefault(t, len(self.vocab)) for t in local_vocab),
+                dtype=np.int32,
+                count=len(local_vocab),
+            )
+            blocks.append((tf, mapping))
+            self.offsets[cid] = (start, start + tf.shape[0])
+            start += tf.shape[0]
+
+        num_terms = max(1, len(self.vocab))
+        tf_all = sparse.vstack(
+            [
+                sparse.csr_matrix(
+                    (tf.data, mapping[tf.indices], tf.indptr),
+                    shape=(tf.shape[0], num_terms),
+                )
+                for tf, mapping in blocks
+            ]
+            or [sparse.csr_matrix((0, num_terms), dtype=np.float32)],
+            format="csr",
+        )
+        self.num_docs = tf_all.shape[0]
+
+        # 文档长度归一化与 IDF
+        doc_len = np.asarray(tf_all.sum(axis=1)).ravel()
+        avgdl = doc_len.mean() if self.num_docs else 1.0
+        df = np.bincount(tf_all.indices, minlength=num_terms)
+        self.idf = np.log(
+            (self.num_docs - df + 0.5) / (df + 0.5) + 1.0, dtype=np.float32
+        )
+
+        rows = np.repeat(np.arange(self.num_docs), np.diff(tf_all.indptr))
+        norm = k1 * (1 - b + b * doc_len[rows] / max(avgdl, 1e-9))
+        weights = tf_all.data * (k1 + 1) / (tf_all.data + norm)
+        weights *= self.idf[tf_all.indices]
+        self.weights = sparse.csr_matrix(
+            (weights.astype(np.float32), tf_all.indices, tf_all.indptr),
+            shape=tf_all.shape,
+        )
+
+    def query_vector(self, query_tokens: list[str]) -> np.ndarray:
+        """query 词频向量，未登录词直接忽略"""
+        vector = np.zeros(self.weights.shape[1], dtype=np.float32)
+        for token in query_tokens:
+            col = self.vocab.get(token)
+            if col is not None:
+                vector[col] += 1
+        return vector
+
+    def score(
+        self, query_tokens: list[str], collection_ids: list[str] | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """对全部（或指定 collection 的）文档打分
+
+        Returns:
+            (行号, 分数)
+        """
+        q = self.query_vector(query_tokens)
+        if collection_ids is None:
+            return np.arange(self.num_docs), self.weights @ q
+
+        # 每个 collection 是连续的行区间，切片打分
+        ranges = [self.offsets[cid] for cid in collection_ids if cid in self.offsets]
+        if not ranges:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        rows = np.concatenate([np.arange(start, end) for start, end in ranges])
+        scores = np.concatenate(
+            [self.weights[start:end] @ q for start, end in ranges]
+        )
+        return rows, scores
+
+    def query_matrix(self, queries_tokens: list[list[str]]) -> sparse.csc_matrix:
+        """多个 query 的词频矩阵（词 x query）"""
+        indices: list[int] = []
+        indptr = [0]
+        for query_tokens in queries_tokens:
+            indices.extend(
+                col for col in map(self.vocab.get, query_tokens) if col is not None
+            )
+            indptr.append(len(indices))
+        # 重复的 (row, col) 在 csc 中求和，即 query 词频
+        return sparse.csc_matrix(
+            (
+                np.ones(len(indices), dtype=np.float32),
+                np.asarray(indices, dtype=np.int32),
+                np.asarray(indptr, dtype=np.int64),
+            ),
+            shape=(self.weights.shape[1], len(queries_tokens)),
+        )
+
+    def score_many(
+        self,
+        queries_tokens: list[list[str]],
+        collection_ids: list[str] | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """一次稀疏矩阵乘法为多个 query 打分
+
+        Returns:
+            (行号, 分数矩阵 [文档, query])
+        """
+        q = self.query_matrix(queries_tokens)
+        if collection_ids is None:
+            return np.arange(self.num_docs), (self.weights @ q).toarray()
+
+        ranges = [self.offsets[cid] for cid in collection_ids if cid in self.offsets]
+        if not ranges:
+            return (
+                np.empty(0, dtype=np.int64),
+                np.empty((0, len(queries_tokens)), dtype=np.float32),
+            )
+        rows = np.concatenate([np.arange(start, end) for start, end in ranges])
+        weights = sparse.vstack([self.weights[start:end] for start, end in ranges])
+        return rows, (weights @ q).toarray()
+
+    def top_k_many(
+        self,
+        queries_tokens: list[list[str]],
+        k: int,
+        collection_ids: list[str] | None = None,
+    ) -> list[list[tuple[int, float]]]:
+        """每个 query 的 top-k [(行号, 分数)]"""
+        if not queries_tokens:
+            return []
+        rows, scores = self.score_many(queries_tokens, collection_ids)
+        return [select_top_k(rows, scores[:, j], k) for j in range(scores.shape[1])]
+
+    def top_k(
+        self,
+        query_tokens: list[str],
+        k: int,
+        collection_ids: list[str] | None = None,
+    ) -> list[tuple[int, float]]:
+        """返回得分最高的 k 个文档 [(行号, 分数)]，不含零分文档"""
+        rows, scores = self.score(query_tokens, collection_ids)
+        return select_top_k(rows, scores, k)
+
+    def top_k_per_collection(
+        self, query_tokens: list[str], ks: dict[str, int]
+    ) -> dict[str, list[tuple[int, float]]]:
+        """一次打分，按 collection 分别取 top-k（query_route 场景）"""
+        collection_ids = [cid for cid in ks if cid in self.offsets]
+        rows, scores = self.score(query_tokens, collection_ids)
+
+        hits: dict[str, list[tuple[int, float]]] = {}
+        pos = 0
+        for cid in collection_ids:
+            start, end = self.offsets[cid]
+            size = end - start
+            hits[cid] = select_top_k(
+                rows[pos : pos + size], scores[pos : pos + size], ks[cid]
+            )
+            pos += size
+        return hits
+
+
+def select_top_k(
+    rows: np.ndarray, scores: np.ndarray, k: int
+) -> list[tuple[int, float]]:
+    """argpartition 取 top-k，再只对 k 个结果排序"""
+    if k <= 0 or scores.size == 0:
+        return []
+    if k < scores.size:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(scores.size)
+    candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+    return [(int(rows[i]), float(scores[i])) for i in candidates if scores[i] > 0]
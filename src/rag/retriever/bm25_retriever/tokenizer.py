@@ -0,0 +1,134 @@
+"""BM25 分词器
+
+按 collection 语言选择分词方式：
+- ZH: jieba 分词（未安装时退回汉字二元组 bigram）
+- EN: 小写 + 停用词过滤 + 轻量词干化
+
+中文分词器中的拉丁字符片段按英文规则处理，两种分词器对英文的结果一致，
+因此跨语言的全局索引可以统一使用中文分词器处理 query。
+"""
+
+import re
+from functools import lru_cache
+from logging import getLogger
+from typing import Callable
+
+from config import rag_cfg
+
+
+logger = getLogger(__name__)
+
+Tokenizer = Callable[[str], list[str]]
+
+bm25_cfg = rag_cfg.get("bm25", {})
+
+# 分词规则变更时递增，使旧的分词缓存失效
+TOKENIZER_VERSION = 1
+
+_CJK_PATTERN = re.compile(r"[\u4e00-\u9fff]+")
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+_SEGMENT_PATTERN = re.compile(r"[\u4e00-\u9fff]+|[a-zA-Z0-9]+")
+
+EN_STOPWORDS = frozenset(
+    """
+    a about above after again against all am an and any are as at be because been
+    before being below between both but by can could did do does doing down during
+    each few for from further had has have having he her here hers herself him
+    himself his how i if in into is it its itself just me more most my myself no
+    nor not now of off on once only or other our ours ourselves out over own same
+    she should so some such than that the their theirs them themselves then there
+    these they this those through to too under until up very was we were what when
+    where which while who whom why will with would you your yours yourself
+    yourselves
+    """.split()
+)
+
+ZH_STOPWORDS = frozenset(
+    "的 了 和 是 在 就 都 而 及 与 着 或 一个 没有 我们 你们 他们 它们 这 那 之 于 以 "
+    "被 把 对 也 又 并 等 其 中 为 上 下".split()
+)
+
+
+def stem(word: str) -> str:
+    """轻量英文词干化（常见屈折后缀），不依赖 nltk"""
+    if len(word) <= 3 or word.isdigit():
+        return word
+    if word.endswith("sses"):
+        return word[:-2]
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    for suffix in ("ing", "edly", "ed", "ly"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[: -len(suffix)]
+            # running -> run, stopped -> stop
+            if len(word) > 3 and word[-1] == word[-2] and word[-1] not in "lsz":
+                word = word[:-1]
+            return word
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def _english_tokens(text: str) -> list[str]:
+    tokens = _WORD_PATTERN.findall(text.lower())
+    if bm25_cfg.get("en_stopwords", True):
+        tokens = [t for t in tokens if t not in EN_STOPWORDS]
+    if bm25_cfg.get("en_stemming", True):
+        tokens = [stem(t) for t in tokens]
+    return tokens
+
+
+def tokenize_en(text: str) -> list[str]:
+    return _english_tokens(text)
+
+
+def _bigrams(segment: str) -> list[str]:
+    if len(segment) == 1:
+        return [segment]
+    return [segment[i : i + 2] for i in range(len(segment) - 1)]
+
+
+@lru_cache(maxsize=1)
+def _load_jieba():
+    if bm25_cfg.get("zh_tokenizer", "jieba") != "jieba":
+        return None
+    try:
+        import jieba
+    except ImportError:
+        logger.warning("jieba 未安装，中文 BM25 分词退回 bigram")
+        return None
+    jieba.setLogLevel("WARNING")
+    return jieba
+
+
+def tokenize_zh(text: str) -> list[str]:
+    jieba = _load_jieba()
+    tokens: list[str] = []
+    for segment in _SEGMENT_PATTERN.findall(text):
+        if not _CJK_PATTERN.fullmatch(segment):
+            tokens.extend(_english_tokens(segment))
+        elif jieba is not None:
+            tokens.extend(
+                t for t in jieba.lcut_for_search(segment) if t not in ZH_STOPWORDS
+            )
+        else:
+            tokens.extend(t for t in _bigrams(segment) if t not in ZH_STOPWORDS)
+    return tokens
+
+
+def get_tokenizer(language: str) -> Tokenizer:
+    """按语言获取分词器，未知语言按英文处理"""
+    return tokenize_zh if language == "ZH" else tokenize_en
+
+
+def tokenizer_id(language: str) -> str:
+    """分词器标识，用于校验缓存的分词结果是否仍然有效"""
+    if language == "ZH":
+        method = "jieba" if _load_jieba() is not None else "bigram"
+    else:
+        method = "en"
+    return (
+        f"{language}:{method}:v{TOKENIZER_VERSION}"
+        f":stop={bm25_cfg.get('en_stopwords', True)}"
+        f":stem={bm25_cfg.get('en_stemming', True)}"
+    )
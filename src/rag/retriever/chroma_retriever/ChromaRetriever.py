@@ -1,16 +1,30 @@
-from chromadb import Collection, EmbeddingFunction, GetResult, QueryResult
+import numpy as np
+from chromadb import Collection, GetResult, QueryResult
 from langchain_core.documents import Document
 
 # from beanie import PydanticObjectId
 
+from concurrent.futures import ThreadPoolExecutor
 from logging import getLogger
 
 from src.database import get_collection
-from .EmbeddingFunction import EmbeddingFunction, SyncEmbeddingFunction
+from src.rag.utils import resolve_query
+from src.metrics import RETRIEVER_LATENCY, record_cache, timed
+from src.tracing import traced
+from src.rag.retriever.ann_retriever.hnsw_index import load_vectors
+from .EmbeddingFunction import EmbeddingFunction, SyncEmbeddingFunction, embed_texts
+
+from config import rag_cfg
 
 
 logger = getLogger(__name__)
 
+# 多个 collection 的检索并发执行
+_retrieve_executor = ThreadPoolExecutor(
+    max_workers=rag_cfg.get("retrieve_concurrency", 8),
+    thread_name_prefix="chroma-retrieve",
+)
+
 
 class ChromaRetriever:
     _instances = {}
@@ -23,6 +37,7 @@ class ChromaRetriever:
         if isinstance(collection_record_ids, str):
             collection_record_ids = [collection_record_ids]
         key = frozenset(str(i) for i in collection_record_ids)
+        record_cache("retriever.chroma", key in cls._instances)
         if key not in cls._instances:
             instance = super().__new__(cls)
             cls._instances[key] = instance
@@ -79,13 +94,225 @@ class ChromaRetriever:
                     ids=[b.id for b in batch],  # type: ignore
                     documents=list(page_contents),
                     metadatas=list(metadatas),
+                    embeddings=embed_texts(embedding_function, list(page_contents)),
                 )
 
         except Exception as e:
             logger.error(f"文档向量化失败: {collection_record_id}", exc_info=e)
             raise RuntimeError(f"文档切片或向量化失败: {id}") from e
 
-    # TODO query 中英文 配对
+    @classmethod
+    def ingest_many(
+        cls,
+        chunk_sets: dict[str, list[Document]],
+        embedding_function: EmbeddingFunction = SyncEmbeddingFunction(),
+        **_: dict,
+    ):
+        """多个 collection 一起向量化：所有分块拼成统一的 embedding 批次，
+        一个批次可以包含多个文档的分块，减少小文档尾部不满批次造成的请求数。"""
+        items = [
+            (collection_record_id, doc)
+            for collection_record_id, documents in chunk_sets.items()
+            for doc in documents
+        ]
+
+        try:
+            batch_size = 10  # 最大10
+            for i in range(0, len(items), batch_size):
+                batch = items[i : i + batch_size]
+                embeddings = embed_texts(
+                    embedding_function, [doc.page_content for _, doc in batch]
+                )
+
+                # 按 collection 分组写入
+                grouped: dict[str, list[int]] = {}
+                for j, (collection_record_id, _) in enumerate(batch):
+                    grouped.setdefault(collection_record_id, []).append(j)
+
+                for collection_record_id, indexes in grouped.items():
+                    vector_store = get_collection(
+                        collection_record_id, embedding_function=embedding_function
+                    )
+                    vector_store.add(
+                        ids=[batch[j][1].id for j in indexes],  # type: ignore
+                        documents=[batch[j][1].page_content for j in indexes],
+                        metadatas=[batch[j][1].metadata for j in indexes],
+                        embeddings=embeddings[indexes],
+                    )
+
+        except Exception as e:
+            logger.error(f"文档向量化失败: {list(chunk_sets.keys())}", exc_info=e)
+            raise RuntimeError(
+                f"文档切片或向量化失败: {list(chunk_sets.keys())}"
+            ) from e
+
+    @classmethod
+    def copy_from(
+        cls,
+        source_collection_record_id: str,
+        documents: list[Document],
+        collection_record_id: str,
+        embedding_function: EmbeddingFunction = SyncEmbeddingFunction(),
+        **_: dict,
+    ):
+        """复用已入库 collection 的向量：按 id 读取 embedding 写入新 collection，
+        documents 为改写过 collection_id 元数据的分块，不重新调用 embedding 服务。
+
+        源 collection 只在 ANN 知识库中入库过（Chroma 中没有向量）时，
+        按分块顺序读取其向量文件。"""
+        source_store = get_collection(
+            source_collection_record_id, embedding_function=embedding_function
+        )
+        vector_store = get_collection(
+            collection_record_id, embedding_function=embedding_function
+        )
+
+        try:
+            vectors = None
+            if source_store.count() == 0:
+                vectors = load_vectors(source_collection_record_id)
+                if vectors is None or len(vectors) != len(documents):
+                    raise ValueError(
+                        f"vectors missing in {source_collection_record_id}"
+                    )
+
+            batch_size = 500
+            for i in range(0, len(documents), batch_size):
+                batch = documents[i : i + batch_size]
+                ids = [doc.id for doc in batch]
+                if vectors is not None:
+                    batch_embeddings = np.asarray(vectors[i : i + batch_size])
+                else:
+                    result = source_store.get(
+                        ids=ids, include=["embeddings"]  # type: ignore
+                    )
+                    embeddings = dict(
+                        zip(result["ids"], result["embeddings"])  # type: ignore
+                    )
+                    missing = [
+                        chunk_id for chunk_id in ids if chunk_id not in embeddings
+                    ]
+                    if missing:
+                        raise ValueError(
+                            f"{len(missing)} vectors missing in "
+                            f"{source_collection_record_id}"
+                        )
+                    batch_embeddings = [embeddings[chunk_id] for chunk_id in ids]
+
+                vector_store.add(
+                    ids=ids,  # type: ignore
+                    documents=[doc.page_content for doc in batch],
+                    metadatas=[doc.metadata for doc in batch],
+                    embeddings=batch_embeddings,
+                )
+
+        except Exception as e:
+            logger.error(
+                f"向量复制失败: {source_collection_record_id} -> {collection_record_id}",
+                exc_info=e,
+            )
+            raise RuntimeError(f"向量复制失败: {collection_record_id}") from e
+
+    def embed_queries(self, queries: list[str]) -> np.ndarray:
+        """一次 embedding 请求向量化所有 query，返回 [n, dim] float32 矩阵"""
+        return embed_texts(self.embedding_function, queries)
+
+    @traced("retriever.chroma.retrieve_batch")
+    @timed(RETRIEVER_LATENCY, retriever="chroma", method="retrieve_batch")
+    def retrieve_batch(
+        self,
+        queries: list[str],
+        top_k: int = 10,
+        collection_ids: list[str] | None = None,
+        query_embeddings: np.ndarray | list | None = None,
+        **_: dict,
+    ) -> list[list[Document]]:
+        """批量检索：所有 query 一次向量化，每个 collection 只发起一次多向量 query，
+        各 collection 并发检索，结果按距离在 collection 之间全局合并。
+
+        Args:
+            queries (list[str]): query 列表（语言变体、多 query 扩展、多用户请求等）。
+            top_k (int): 每个 query 返回的文档数。
+            collection_ids (list[str], optional): 只在这些 collection 中检索。
+            query_embeddings (np.ndarray, optional): 预先计算好的 query 向量。
+
+        Returns:
+            list[list[Document]]: 与 queries 一一对应的排序结果。
+        """
+        results: list[list[Document]] = [[] for _ in queries]
+        # 空 query 不参与向量化
+        active = [i for i, query in enumerate(queries) if query]
+        if not active or top_k <= 0:
+            return results
+
+        if query_embeddings is None:
+            embeddings = self.embed_queries([queries[i] for i in active])
+        else:
+            embeddings = np.asarray(query_embeddings, dtype=np.float32)[active]
+
+        vector_stores = [
+            self.vector_stores[cid]
+            for cid in (
+                collection_ids if collection_ids is not None else self.vector_stores
+            )
+            if self.vector_stores.get(cid) is not None
+        ]
+
+        def search(vector_store: Collection) -> list[list[tuple[float, Document]]]:
+            result = vector_store.query(query_embeddings=embeddings, n_results=top_k)
+            return query_result_hits(result)
+
+        hits: list[list[tuple[float, Document]]] = [[] for _ in active]
+        for collection_hits in _retrieve_executor.map(search, vector_stores):
+            for j, query_hits in enumerate(collection_hits):
+                hits[j].extend(query_hits)
+
+        for j, i in enumerate(active):
+            hits[j].sort(key=lambda x: x[0])
+            results[i] = [doc for _, doc in hits[j][:top_k]]
+        return results
+
+    @traced("retriever.chroma.retrieve_routed")
+    @timed(RETRIEVER_LATENCY, retriever="chroma", method="retrieve_routed")
+    def retrieve_routed(
+        self, query: dict | str, query_route: dict[str, int]
+    ) -> list[Document]:
+        """按路由结果在各 collection 中检索，结果按距离全局合并。
+
+        每个 collection 的 query 按其语言独立选择，不同语言的 query 一次向量化，
+        各 collection 的检索在线程池中并发执行。
+        """
+        routes = {
+            cid: k
+            for cid, k in query_route.items()
+            if self.vector_stores.get(cid) is not None and k > 0
+        }
+        route_queries = {
+            cid: resolve_query(query, self.language.get(cid, "EN")) for cid in routes
+        }
+        texts = list(dict.fromkeys(q for q in route_queries.values() if q))
+        if not texts:
+            return []
+        embeddings = dict(zip(texts, self.embed_queries(texts)))
+
+        def search(cid: str) -> list[tuple[float, Document]]:
+            text = route_queries[cid]
+            if not text:
+                return []
+            result = self.vector_stores[cid].query(
+                query_embeddings=embeddings[text][None, :], n_results=routes[cid]
+            )
+            return query_result_hits(result)[0]
+
+        hits: list[tuple[float, Document]] = []
+        for collection_hits in _retrieve_executor.map(search, routes):
+            hits.extend(collection_hits)
+
+        hits.sort(key=lambda x: x[0])
+        return [doc for _, doc in hits]
+
+    @traced("retriever.chroma.retrieve")
+    @timed(RETRIEVER_LATENCY, retriever="chroma", method="retrieve")
     def retrieve(
         self, query: dict | str, top_k: int = 10, query_route: dict | None = None
     ) -> list[Document]:
@@ -93,30 +320,11 @@ class ChromaRetriever:
             return []
 
         if query_route:
-            documents = []
-            for record_id, k in query_route.items():
-                if self.vector_stores[record_id] is not None and k > 0:
-                    if isinstance(query, dict):
-                        doc_language = self.language.get(record_id, "EN")
-                        query = query.get(doc_language, "")
-                    result = self.vector_stores[record_id].query(
-                        query_texts=query, n_results=k  # type: ignore
-                    )
-                    documents.extend(flatten_query_result(result))
-
+            documents = self.retrieve_routed(query, query_route)
         else:
-            results = []
-            for vs in self.vector_stores.values():
-                res = vs.query(
-                    query_texts=[
-                        query.get("EN", "") if isinstance(query, dict) else query
-                    ],
-                    n_results=top_k,
-                )
-                results.append(res)
-
-            topk_results = get_topk_query_result(results, top_k)
-            documents = [doc for _, doc in topk_results]
+            documents = self.retrieve_batch(
+                [query.get("EN", "") if isinstance(query, dict) else query], top_k
+            )[0]
         return documents
 
     async def get_by_ids(
@@ -137,32 +345,24 @@ class ChromaRetriever:
         return result
 
 
-def get_topk_query_result(results: list[QueryResult], k: int):
-    """
-    从多个 QueryResult 中，基于 distances 全局排序，取前 k 条最相关文档。
-    返回一个列表，每项为 (distance, document)
-    """
-
-    merged: list[tuple[float, Document]] = []
-
-    for result in results:
-        distances = result.get("distances")
-        documents = result.get("documents")
-        metadatas = result.get("metadatas")
-
-        if distances is None or documents is None or metadatas is None:
-            continue
-
-        # 遍历每个 query 的结果
-        for dist_list, doc_list, meta_list in zip(distances, documents, metadatas):
-            for dist, doc, meta in zip(dist_list, doc_list, meta_list):
-                merged.append((dist, Document(page_content=doc, metadata=meta)))  # type: ignore
-
-    # 按距离升序排序
-    merged.sort(key=lambda x: x[0])
+def query_result_hits(result: QueryResult) -> list[list[tuple[float, Document]]]:
+    """将多 query 的 QueryResult 拆分为每个 query 的 [(distance, document)]"""
+    ids_list = result.get("ids") or []
+    docs_list = result.get("documents") or []
+    metas_list = result.get("metadatas") or []
+    distances_list = result.get("distances") or []
 
-    # 返回 top-k
-    return merged[:k]
+    hits = []
+    for ids, docs, metas, distances in zip(
+        ids_list, docs_list, metas_list, distances_list
+    ):
+        hits.append(
+            [
+                (dist, Document(page_content=doc, metadata={**meta}, id=id))  # type: ignore
+                for id, doc, meta, dist in zip(ids, docs, metas, distances)
+            ]
+        )
+    return hits
 
 
 def flatten_query_result(result: QueryResult | GetResult) -> list[Document]:
@@ -1,6 +1,17 @@
+import time
+
+import numpy as np
 from chromadb import Documents, EmbeddingFunction, Embeddings
 
 from src.embedding import get_embedding_model
+from src.embedding.batcher import get_batcher
+from src.metrics import EMBEDDING_BATCH_SIZE, EMBEDDING_CALLS, EMBEDDING_LATENCY
+from src.tracing import traced
+
+from config import embedding_cfg, rag_cfg
+
+
+DEFAULT_DIMENSIONS = 1024
 
 
 class SyncEmbeddingFunction(EmbeddingFunction):
@@ -9,14 +20,77 @@ class SyncEmbeddingFunction(EmbeddingFunction):
     用来让 Chroma 在插入或查询文本时，自动调用你定义的 embedding_call 函数生成向量。
     """
 
-    def __init__(self, llm_provider: str = "bailian", model: str = "text-embedding-v4"):
+    def __init__(
+        self,
+        llm_provider: str = rag_cfg.get("embedding_provider", "bailian"),
+        model: str = "text-embedding-v4",
+        dimensions: int = DEFAULT_DIMENSIONS,
+    ):
         self.embedding_model = get_embedding_model(
             llm_provider=llm_provider, model=model
         )
+        supported = getattr(self.embedding_model, "supported_dimensions", None)
+        if supported and dimensions not in supported:
+            raise ValueError(
+                f"{model} 不支持 {dimensions} 维向量，可选: {list(supported)}"
+            )
+        self.dimensions = dimensions
+        # 向量复用时用于判断两组向量是否出自同一 embedding 模型（及维度）
+        # 默认维度不写入标识，与已有 collection 的 embedding_key 保持一致
+        self.model_id = f"{llm_provider}:{model}"
+        if dimensions != DEFAULT_DIMENSIONS:
+            self.model_id += f":{dimensions}"
+        # 批处理器与指标使用的标识
+        self.key = f"{llm_provider}:{model}:{dimensions}"
+        # 并发的小请求（对话中的 query）合并后再调用 embedding 服务
+        self.batcher = (
+            get_batcher(self.key, self._embed)
+            if embedding_cfg.get("batching", True)
+            else None
+        )
 
     def __call__(self, input: Documents) -> Embeddings:
         # embed the documents somehow
-        return self.embedding_model.embedding_call(input)
+        return self.embed(input)  # type: ignore
+
+    def _embed(self, texts: list[str]) -> np.ndarray:
+        EMBEDDING_BATCH_SIZE.labels(model=self.key).observe(len(texts))
+        start = time.perf_counter()
+        try:
+            embeddings = self.embedding_model.embedding_call(
+                texts, dimensions=self.dimensions
+            )
+        except Exception:
+            EMBEDDING_CALLS.labels(model=self.key, status="error").inc()
+            raise
+        EMBEDDING_CALLS.labels(model=self.key, status="ok").inc()
+        EMBEDDING_LATENCY.labels(model=self.key).observe(time.perf_counter() - start)
+        return embeddings
+
+    @traced("embedding.embed")
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """[n, dim] float32 矩阵，不经过 Chroma 对返回值的逐行规范化"""
+        if self.batcher is None:
+            return self._embed(texts)
+        return self.batcher.embed(texts)
+
+
+def embed_texts(embedding_function: EmbeddingFunction, texts: list[str]) -> np.ndarray:
+    """向量化为 [n, dim] float32 矩阵，入库与检索路径统一使用"""
+    if isinstance(embedding_function, SyncEmbeddingFunction):
+        return embedding_function.embed(texts)
+    return np.asarray(embedding_function(texts), dtype=np.float32)
+
+
+_embedding_functions: dict[int, SyncEmbeddingFunction] = {}
+
+
+def get_embedding_function(dimensions: int | None = None) -> SyncEmbeddingFunction:
+    """按向量维度获取 EmbeddingFunction 单例（知识库可配置 dimensions）"""
+    dimensions = dimensions or DEFAULT_DIMENSIONS
+    if dimensions not in _embedding_functions:
+        _embedding_functions[dimensions] = SyncEmbeddingFunction(dimensions=dimensions)
+    return _embedding_functions[dimensions]
 
 
 # TODO: 异步版本
@@ -2,18 +2,36 @@ from langchain_core.documents import Document
 
 
 def remove_duplicates(doucuments: list[Document]) -> list[Document]:
-    """根据 record_id 和 id 去重两个 Document 列表"""
+    """根据 collection_id（或 record_id）和 id 去重两个 Document 列表
+
+    分块 id 只在单个 collection 内唯一，必须带上 collection_id 才能区分不同文档的分块。
+    """
     seen_contents = set()
     unique_documents = []
 
     for doc in doucuments:
-        if (doc.id, doc.metadata.get("record_id")) not in seen_contents:
-            seen_contents.add((doc.id, doc.metadata.get("record_id")))
+        key = (
+            doc.id,
+            doc.metadata.get("collection_id", doc.metadata.get("record_id")),
+        )
+        if key not in seen_contents:
+            seen_contents.add(key)
             unique_documents.append(doc)
 
     return unique_documents
 
 
+def resolve_query(query: dict | str, language: str) -> str:
+    """按 collection 的语言选择 query。
+
+    query 为 {"EN": ..., "ZH": ...} 时取对应语言，缺失时退回任一非空的语言版本；
+    不修改传入的 query，多个 collection 之间互不影响。
+    """
+    if not isinstance(query, dict):
+        return query
+    return query.get(language) or next((q for q in query.values() if q), "")
+
+
 def organize_context(documents: dict[str, list[Document]]) -> str:
     """将 Document 列表组织成纯文本，并合并相邻同 header 的片段。"""
 
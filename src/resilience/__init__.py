@@ -0,0 +1,23 @@
+from .breaker import CircuitBreaker, CircuitOpenError, get_breaker
+from .retry import (
+    RetryPolicy,
+    client_options,
+    hedged,
+    is_retryable,
+    load_policy,
+    retry_async,
+    retry_sync,
+)
+
+__all__ = [
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "get_breaker",
+    "RetryPolicy",
+    "client_options",
+    "hedged",
+    "is_retryable",
+    "load_policy",
+    "retry_async",
+    "retry_sync",
+]
@@ -0,0 +1,114 @@
+"""按上游（provider）划分的熔断器
+
+closed：正常放行，连续失败 failure_threshold 次后 open
+open：直接抛出 CircuitOpenError，reset_timeout 秒后进入 half_open
+half_open：只放行一个探测请求，成功则 closed，失败则重新 open
+"""
+
+import threading
+import time
+
+from src.metrics import CIRCUIT_STATE
+
+from config import resilience_cfg
+
+
+class CircuitOpenError(RuntimeError):
+    """熔断中，调用未发出"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(
+            f"Circuit breaker '{name}' is open, retry in {retry_after:.0f}s"
+        )
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = resilience_cfg.get("failure_threshold", 5),
+        reset_timeout: float = resilience_cfg.get("reset_timeout", 30),
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        # 同步调用在线程池中执行，状态用锁保护
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._set_gauge()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and self._elapsed() >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def _elapsed(self) -> float:
+        return time.monotonic() - self._opened_at
+
+    def _set_gauge(self):
+        value = {self.CLOSED: 0, self.OPEN: 1, self.HALF_OPEN: 2}[self._state]
+        CIRCUIT_STATE.labels(breaker=self.name).set(value)
+
+    def before_call(self):
+        """调用前检查，熔断中抛出 CircuitOpenError"""
+        with self._lock:
+            if self._state == self.OPEN:
+                if self._elapsed() < self.reset_timeout:
+                    raise CircuitOpenError(
+                        self.name, self.reset_timeout - self._elapsed()
+                    )
+                self._state = self.HALF_OPEN
+                self._set_gauge()
+            if self._state == self.HALF_OPEN:
+                if self._probing:
+                    raise CircuitOpenError(self.name, self.reset_timeout)
+                self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._probing = False
+            if self._state != self.CLOSED:
+                self._state = self.CLOSED
+                self._set_gauge()
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if (
+                self._state == self.HALF_OPEN
+                or self._failures >= self.failure_threshold
+            ):
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._set_gauge()
+
+    def release(self):
+        """调用因非上游原因结束（如参数错误、被取消）时释放探测名额，不改变状态"""
+        with self._lock:
+            self._probing = False
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """获取或创建指定上游的熔断器单例"""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
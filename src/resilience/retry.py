@@ -0,0 +1,154 @@
+"""单次调用超时、带抖动的指数退避重试与对冲请求（hedged request）"""
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, TypeVar
+
+import openai
+
+from .breaker import CircuitBreaker, CircuitOpenError
+
+from config import resilience_cfg
+
+
+T = TypeVar("T")
+
+# 限流、超时与服务端错误可重试；其余 4xx（参数、鉴权）重试也不会成功
+RETRYABLE_STATUS = {408, 409, 429}
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, (TimeoutError, ConnectionError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS or error.status_code >= 500
+    return False
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    timeout: float | None = 60  # 单次尝试的超时（秒），None 为不限制
+    max_attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 8
+
+    def backoff(self, attempt: int) -> float:
+        """第 attempt 次失败后的等待时间（full jitter）：
+        在 [0, min(max_delay, base_delay * 2^(attempt-1))] 中均匀随机"""
+        cap = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return random.uniform(0, cap)
+
+
+def load_policy(timeout_key: str) -> RetryPolicy:
+    """从 [tool.resilience] 读取重试策略，timeout_key 为对应的超时配置项"""
+    return RetryPolicy(
+        timeout=resilience_cfg.get(timeout_key) or None,
+        max_attempts=resilience_cfg.get("max_attempts", 3),
+        base_delay=resilience_cfg.get("base_delay", 0.5),
+        max_delay=resilience_cfg.get("max_delay", 8),
+    )
+
+
+def client_options(timeout_key: str) -> dict:
+    """OpenAI 客户端参数：请求超时；启用重试层时关闭 SDK 自带的重试，避免重试次数相乘"""
+    enabled = resilience_cfg.get("enabled", True)
+    return {
+        "timeout": resilience_cfg.get(timeout_key) or None,
+        "max_retries": 0 if enabled else 2,
+    }
+
+
+async def retry_async(
+    call: Callable[[], Awaitable[T]],
+    policy: RetryPolicy,
+    breaker: CircuitBreaker,
+    on_retry: Callable[[BaseException], None] | None = None,
+) -> T:
+    """执行 call()，可重试的错误按退避策略重试；只有可重试的错误计入熔断器"""
+    attempt = 0
+    while True:
+        attempt += 1
+        breaker.before_call()
+        try:
+            if policy.timeout:
+                result = await asyncio.wait_for(call(), policy.timeout)
+            else:
+                result = await call()
+        except BaseException as e:
+            if not is_retryable(e):
+                breaker.release()
+                raise
+            breaker.record_failure()
+            if attempt >= policy.max_attempts:
+                raise
+            if on_retry is not None:
+                on_retry(e)
+            await asyncio.sleep(policy.backoff(attempt))
+            continue
+        breaker.record_success()
+        return result
+
+
+def retry_sync(
+    call: Callable[[], T],
+    policy: RetryPolicy,
+    breaker: CircuitBreaker,
+    on_retry: Callable[[BaseException], None] | None = None,
+) -> T:
+    """retry_async 的同步版本；无法中断阻塞调用，超时依赖 HTTP 客户端的 timeout"""
+    attempt = 0
+    while True:
+        attempt += 1
+        breaker.before_call()
+        try:
+            result = call()
+        except BaseException as e:
+            if not is_retryable(e):
+                breaker.release()
+                raise
+            breaker.record_failure()
+            if attempt >= policy.max_attempts:
+                raise
+            if on_retry is not None:
+                on_retry(e)
+            time.sleep(policy.backoff(attempt))
+            continue
+        breaker.record_success()
+        return result
+
+
+async def hedged(
+    call: Callable[[], Awaitable[T]],
+    delay: float,
+    on_hedge: Callable[[], None] | None = None,
+) -> T:
+    """先发出一个请求，delay 秒内未完成时再发出一个相同的请求，
+    返回先成功的结果并取消另一个；两个都失败时抛出后失败的错误"""
+    tasks = [asyncio.ensure_future(call())]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done:
+            if on_hedge is not None:
+                on_hedge()
+            tasks.append(asyncio.ensure_future(call()))
+
+        pending: set[asyncio.Future] = set(tasks)
+        error: BaseException | None = None
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        assert error is not None
+        raise error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
@@ -4,7 +4,15 @@ from fastapi import HTTPException
 from .dialog.DialogManager import DialogManager
 from .odm.Session import Session
 from .memory.MemoryManager import MemoryManager
+from src.job import JobType, job_service
 from src.prompt import get_prompt
+from src.llm import get_llm
+from src.llm.usage import usage_context
+from src.usage import check_budget
+from src.metrics import BUDGET_DECISIONS
+from src.tracing import span, traced
+
+from config import job_cfg, usage_cfg
 
 
 # SessionService -> DialogManager（业务层） -> Session.messages（数据层）, Session.memory（数据层）
@@ -54,17 +62,28 @@ class SessionService:
             await session.delete()
             return "Session had no messages and was deleted."
         else:
+            # 长期记忆、记忆入库与标题生成交给 memory 队列的 worker
             await asyncio.gather(
-                self.memory_manager.update_long_term_memory(session),
-                self.memory_manager.ingest_memory_to_rag(session),
-                self.dialog_manager.generate_dialog_title(session),
+                self._enqueue_memory_job(JobType.long_term_memory, session),
+                self._enqueue_memory_job(JobType.ingest_memory, session),
+                self._enqueue_memory_job(JobType.dialog_title, session),
             )
-            # await self.memory_manager.update_long_term_memory(session)
-            # await self.memory_manager.ingest_memory_to_rag(session)
-            # await self.dialog_manager.generate_dialog_title(session)
             return "Session exited successfully."
             # Add any additional cleanup logic if needed
 
+    async def _enqueue_memory_job(
+        self, job_type: JobType, session: Session, **payload
+    ) -> None:
+        """记忆相关的后台任务：低优先级；同一会话的同类任务在 memory_batch_window 秒内合并"""
+        session_id = str(session.id)
+        await job_service.enqueue_job(
+            job_type.value,
+            {"session_id": session_id, **payload},
+            priority=job_cfg.get("memory_priority", -10),
+            dedup_key=f"{job_type.value}:{session_id}",
+            delay=job_cfg.get("memory_batch_window", 30),
+        )
+
     async def send_message(
         self,
         session_id: str,
@@ -74,6 +93,7 @@ class SessionService:
     ):
         raise NotImplementedError("send_message method is not implemented yet")
 
+    @traced("session.send_message_stream")
     async def send_message_stream(
         self,
         session_id: str,
@@ -82,24 +102,52 @@ class SessionService:
         kb_id: str | None = None,
     ):
 
-        session = await Session.get(session_id)
+        with span("mongo.get_session"):
+            session = await Session.get(session_id)
         if not session:
             raise HTTPException(status_code=404, detail="Session not found")
 
-        await self.memory_manager.retrieve_memory_from_rag(
-            query=content, session=session
-        )
-
-        token_stream = await self.dialog_manager.generate_response_stream(
-            session=session,
-            message_content=content,
-            message_metadata=metadata,
-            knowledge_base_id=kb_id,
-        )
+        # 预算：超出时拒绝，或本次回答降级到便宜模型
+        budget = await check_budget(user_id=session.user_id, knowledge_base_id=kb_id)
+        BUDGET_DECISIONS.labels(action=budget.action).inc()
+        if budget.action == "reject":
+            raise HTTPException(
+                status_code=429,
+                detail=f"Token budget exceeded: {budget.reason}",
+                headers={"Retry-After": str(budget.retry_after)},
+            )
+        llm_adapter = None
+        if budget.action == "downgrade":
+            llm_adapter = get_llm(
+                llm_provider=usage_cfg.get("downgrade_llm_provider", "deepseek"),
+                model=usage_cfg.get("downgrade_llm_model", "deepseek-chat"),
+            )
 
-        # 更新记忆
-        if self.memory_manager.should_update_short_term_memory(session):
-            asyncio.create_task(self.memory_manager.update_short_term_memory(session))
+        # 本次请求内的 LLM 调用计入该用户 / 会话 / 知识库
+        with usage_context(
+            user_id=session.user_id, session_id=session_id, knowledge_base_id=kb_id
+        ):
+            with span("memory.retrieve"):
+                await self.memory_manager.retrieve_memory_from_rag(
+                    query=content, session=session
+                )
+
+            with span("dialog.prepare_response", knowledge_base_id=kb_id or ""):
+                token_stream = await self.dialog_manager.generate_response_stream(
+                    session=session,
+                    message_content=content,
+                    message_metadata=metadata,
+                    knowledge_base_id=kb_id,
+                    llm_adapter=llm_adapter,
+                )
+
+            # 更新记忆
+            if self.memory_manager.should_update_short_term_memory(session):
+                await self._enqueue_memory_job(
+                    JobType.short_term_memory,
+                    session,
+                    message_count=session.message_count,
+                )
 
         return token_stream
 
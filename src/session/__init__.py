@@ -4,5 +4,15 @@ from .odm.Session import Session
 from .dialog.DialogManager import DialogManager
 from .SessionService import SessionService
 from .memory.MemoryManager import MemoryManager, LongTermMemory
+from .factory import get_dialog_manager, get_memory_manager, reset_dialog_manager
 
-__all__ = ["Session", "DialogManager", "SessionService", "MemoryManager", "LongTermMemory"]
+__all__ = [
+    "Session",
+    "DialogManager",
+    "SessionService",
+    "MemoryManager",
+    "LongTermMemory",
+    "get_dialog_manager",
+    "get_memory_manager",
+    "reset_dialog_manager",
+]
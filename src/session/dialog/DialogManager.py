@@ -12,6 +12,7 @@ from .DialogMessage import DialogMessage, RoleEnum
 from src.session.odm.Session import Session
 
 from src.prompt import llm_chat_stream, llm_call
+from src.tracing import span
 
 
 class DialogManager:
@@ -79,9 +80,12 @@ class DialogManager:
         message_content: str,
         message_metadata: dict | None = None,
         knowledge_base_id: Optional[str] = None,
+        llm_adapter: Optional[BaseChatAdapter] = None,
     ) -> AsyncGenerator[str, Any]:
+        """llm_adapter: 本次回答使用的模型（如超出预算时降级），默认 self.llm_adapter"""
 
         message_metadata = message_metadata or {}
+        llm_adapter = llm_adapter or self.llm_adapter
 
         # 检索调用
         retrieved = None
@@ -94,7 +98,7 @@ class DialogManager:
 
             stream_source = await llm_chat_stream(
                 "RAG_answer",
-                self.llm_adapter,
+                llm_adapter,
                 session.messages,
                 {
                     "information": retrieved,
@@ -106,7 +110,7 @@ class DialogManager:
         else:
             stream_source = await llm_chat_stream(
                 "plain_chat",
-                self.llm_adapter,
+                llm_adapter,
                 session.messages,
                 {"user_message": message_content},
             )
@@ -123,19 +127,21 @@ class DialogManager:
                     yield chunk
 
             # 全部结束后再保存到会话中
-            await self._append_message(
-                session,
-                role=RoleEnum.user,
-                content=message_content,
-                metadata=message_metadata,
-            )
-            await self._append_message(
-                session,
-                role=RoleEnum.assistant,
-                content=response_text,
-                metadata={"generated_at": datetime.now(timezone.utc).isoformat()},
-            )
-            await session.save()
+            with span("mongo.save_messages"):
+                await self._append_message(
+                    session,
+                    role=RoleEnum.user,
+                    content=message_content,
+                    metadata=message_metadata,
+                )
+                await self._append_message(
+                    session,
+                    role=RoleEnum.assistant,
+                    content=response_text,
+                    metadata={"generated_at": datetime.now(timezone.utc).isoformat()},
+                )
+                # 只写入变化的字段，不覆盖后台任务更新的记忆与标题
+                await session.save_changes()
 
         return token_stream()
 
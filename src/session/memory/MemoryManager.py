@@ -1,3 +1,4 @@
+import asyncio
 import os
 from typing import Protocol
 
@@ -6,6 +7,7 @@ from .LongTermMemory import LongTermMemory
 from src.session import Session
 from src.prompt import llm_call
 from src.llm import BaseChatAdapter
+from src.llm.tokens import estimate_tokens, truncate_to_tokens
 from src.rag import ingest_memory, RetrievePipelineProtocol
 from src.database import delete_content_from_collection
 from config import memory_cfg
@@ -58,8 +60,44 @@ class MemoryManager:
         )
         await session.save_changes()
 
+    def long_term_memory_input(self, session: Session) -> list[dict[str, str]]:
+        """长期记忆的增量输入：上次更新长期记忆之后的内容，不含系统消息
+
+        - 首次更新时，短期记忆摘要作为 role 为 summary 的一条消息，加上摘要未覆盖的尾部消息
+        - 之后的更新只发送上次更新之后的原始消息：短期记忆摘要是整个会话的累积摘要，
+          其中已合并到长期记忆的内容不再重复发送
+        - 消息每条截断到 long_term_message_tokens，总量超过 long_term_input_tokens 时
+          保留最近的消息
+        """
+        input_tokens = memory_cfg.get("long_term_input_tokens", 3000)
+        message_tokens = memory_cfg.get("long_term_message_tokens", 400)
+        summary_tokens = memory_cfg.get("long_term_summary_tokens", 1000)
+
+        messages: list[dict[str, str]] = []
+        budget = input_tokens
+        start = session.long_term_memory_count
+        # 前 last_summary_count 条消息已包含在短期记忆摘要中
+        summarized = max(session.last_summary_count, 0)
+        if start == 0 and session.memory and summarized > 0:
+            summary = truncate_to_tokens(str(session.memory), summary_tokens)
+            messages.append({"role": "summary", "content": summary})
+            budget -= estimate_tokens(summary)
+            start = summarized
+
+        tail = []
+        for message in reversed(session.get_history()[start:]):
+            content = truncate_to_tokens(message["content"], message_tokens)
+            budget -= estimate_tokens(content)
+            if budget < 0 and tail:
+                break
+            tail.append({"role": message["role"], "content": content})
+        return messages + tail[::-1]
+
     async def update_long_term_memory(self, session: Session):
-        history = session.messages
+        history = self.long_term_memory_input(session)
+        if not history:
+            # 上次更新之后没有新的内容
+            return
         long_term_memory = await LongTermMemory.find_one(
             LongTermMemory.user_id == session.user_id
         )
@@ -79,7 +117,14 @@ class MemoryManager:
                 },
             )
 
+        # 退出会话时由后台任务执行，结果写回用户的长期记忆
+        if long_term_memory is None:
+            long_term_memory = LongTermMemory(user_id=session.user_id)
+        long_term_memory.memory = new_memory
+        await long_term_memory.save()
         session.set_long_term_memory(new_memory)
+        session.long_term_memory_count = session.message_count
+        await session.save_changes()
 
     async def ingest_memory_to_rag(self, session: Session):
         if session.user_id is None:
@@ -88,7 +133,9 @@ class MemoryManager:
         chunk_save_path = os.path.join(
             memory_cfg["chunk_dir"], session.user_id + ".pkl"
         )
-        ingest_memory(
+        # 分块与 embedding 为同步调用，放到线程中执行，不阻塞 worker 的事件循环
+        await asyncio.to_thread(
+            ingest_memory,
             user_id=session.user_id,
             messages=history,
             chunk_save_path=chunk_save_path,
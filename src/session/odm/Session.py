@@ -12,6 +12,7 @@ class Session(BaseDocument):
 
     message_count: int = Field(default=0)
     last_summary_count: int = Field(default=-1)
+    long_term_memory_count: int = Field(default=0)  # 已计入用户长期记忆的消息数
 
     system_prompt: str = Field(default="")  # 系统消息
     dialog_messages: list[DialogMessage] = Field(default_factory=list)
@@ -0,0 +1,23 @@
+from .tracer import (
+    NOOP_SPAN,
+    Span,
+    Timings,
+    collect_timings,
+    configure,
+    format_timings,
+    span,
+    trace_stream,
+    traced,
+)
+
+__all__ = [
+    "NOOP_SPAN",
+    "Span",
+    "Timings",
+    "collect_timings",
+    "configure",
+    "format_timings",
+    "span",
+    "trace_stream",
+    "traced",
+]
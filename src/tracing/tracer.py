@@ -0,0 +1,361 @@
+"""轻量 tracing：span 计时、导出与按请求汇总各阶段耗时
+
+- 未启用（[tool.tracing] enabled = false）且没有计时收集器时，span() 返回 no-op 对象
+- 启用后 span 结束时导出：console / file（JSON Lines，字段与 OpenTelemetry span 对应），
+  或 otel（转交 opentelemetry-api，由 OpenTelemetry SDK 配置导出）
+- collect_timings() 收集当前上下文（含子任务与 asyncio.to_thread）中结束的 span 耗时，
+  用于 X-Timing 响应头与基准测试；同名 span 的耗时累加
+"""
+
+import functools
+import inspect
+import json
+import logging
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Callable, Iterator
+
+from config import tracing_cfg
+
+
+logger = logging.getLogger(__name__)
+
+# 阶段名 -> 累计耗时（秒）
+Timings = dict[str, float]
+
+_current_span: ContextVar["Span | None"] = ContextVar("current_span", default=None)
+_collectors: ContextVar[tuple[Timings, ...]] = ContextVar("collectors", default=())
+
+
+class _Exporter:
+    def export(self, record: dict):
+        raise NotImplementedError
+
+
+class ConsoleExporter(_Exporter):
+    def export(self, record: dict):
+        print(json.dumps(record, ensure_ascii=False, default=str), file=sys.stderr)
+
+
+class FileExporter(_Exporter):
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, record: dict):
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+def _load_otel_tracer():
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        logger.warning("opentelemetry-api 未安装，tracing 退回 console 导出")
+        return None
+    return trace.get_tracer("rag-agent")
+
+
+_enabled: bool = bool(tracing_cfg.get("enabled", False))
+_exporter: _Exporter | None = None
+_otel_tracer = None
+
+
+def configure(
+    enabled: bool | None = None,
+    exporter: str | None = None,
+    path: str | None = None,
+):
+    """设置导出方式，参数缺省时读取 [tool.tracing]"""
+    global _enabled, _exporter, _otel_tracer
+
+    _enabled = bool(tracing_cfg.get("enabled", False) if enabled is None else enabled)
+    exporter = exporter or tracing_cfg.get("exporter", "console")
+    _exporter = _otel_tracer = None
+    if not _enabled:
+        return
+
+    if exporter == "otel":
+        _otel_tracer = _load_otel_tracer()
+        if _otel_tracer is not None:
+            return
+        exporter = "console"
+
+    if exporter == "file":
+        _exporter = FileExporter(path or tracing_cfg.get("file", "data/traces.jsonl"))
+    elif exporter == "console":
+        _exporter = ConsoleExporter()
+    else:
+        raise ValueError(f"Unknown tracing exporter: {exporter}")
+
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+class Span:
+    """一次计时区间，构造时开始计时
+
+    作为上下文管理器使用时成为当前 span（子 span 以其为父）；
+    跨 yield 存活的 span（如流式输出）直接调用 finish()。
+    """
+
+    __slots__ = (
+        "name",
+        "attributes",
+        "events",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "start_ns",
+        "_start",
+        "_collectors",
+        "_token",
+        "_otel_span",
+        "_otel_scope",
+        "_finished",
+    )
+
+    def __init__(self, name: str, attributes: dict[str, Any]):
+        parent = _current_span.get()
+        self.name = name
+        self.attributes = attributes
+        self.events: list[tuple[str, float]] = []
+        self.trace_id = parent.trace_id if parent else _new_id(128)
+        self.span_id = _new_id(64)
+        self.parent_id = parent.span_id if parent else None
+        self.start_ns = time.time_ns()
+        self._start = time.perf_counter()
+        self._collectors = _collectors.get()
+        self._token = None
+        self._otel_span = (
+            _otel_tracer.start_span(name, attributes=attributes)
+            if _otel_tracer is not None
+            else None
+        )
+        self._otel_scope = None
+        self._finished = False
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+        if self._otel_span is not None:
+            self._otel_span.set_attribute(key, value)
+
+    def add_event(self, name: str):
+        """记录 span 内的时间点（如首 token），同时计入计时收集器"""
+        elapsed = time.perf_counter() - self._start
+        self.events.append((name, elapsed))
+        for timings in self._collectors:
+            key = f"{self.name}.{name}"
+            timings[key] = timings.get(key, 0.0) + elapsed
+        if self._otel_span is not None:
+            self._otel_span.add_event(name)
+
+    def finish(self, error: BaseException | None = None):
+        if self._finished:
+            return
+        self._finished = True
+        duration = time.perf_counter() - self._start
+        for timings in self._collectors:
+            timings[self.name] = timings.get(self.name, 0.0) + duration
+
+        if self._otel_span is not None:
+            if error is not None:
+                from opentelemetry.trace import Status, StatusCode
+
+                self._otel_span.record_exception(error)
+                self._otel_span.set_status(Status(StatusCode.ERROR, str(error)))
+            self._otel_span.end()
+        elif _exporter is not None:
+            _exporter.export(
+                {
+                    "name": self.name,
+                    "trace_id": self.trace_id,
+                    "span_id": self.span_id,
+                    "parent_span_id": self.parent_id,
+                    "start_time_unix_nano": self.start_ns,
+                    "end_time_unix_nano": self.start_ns + int(duration * 1e9),
+                    "duration_ms": duration * 1000,
+                    "attributes": self.attributes,
+                    "events": [
+                        {"name": name, "offset_ms": offset * 1000}
+                        for name, offset in self.events
+                    ],
+                    "status": "ERROR" if error is not None else "OK",
+                    "error": repr(error) if error is not None else None,
+                }
+            )
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        if self._otel_span is not None:
+            from opentelemetry import trace
+
+            self._otel_scope = trace.use_span(self._otel_span, end_on_exit=False)
+            self._otel_scope.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._otel_scope is not None:
+            self._otel_scope.__exit__(exc_type, exc, tb)
+        if self._token is not None:
+            _current_span.reset(self._token)
+        self.finish(exc)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def add_event(self, name: str):
+        pass
+
+    def finish(self, error: BaseException | None = None):
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def span(name: str, **attributes: Any) -> Span | _NoopSpan:
+    """开始一个 span；未启用且没有计时收集器时返回 no-op"""
+    if not _enabled and not _collectors.get():
+        return NOOP_SPAN
+    return Span(name, attributes)
+
+
+@contextmanager
+def collect_timings(timings: Timings | None = None) -> Iterator[Timings]:
+    """收集上下文内结束的 span 耗时（秒），可嵌套"""
+    timings = {} if timings is None else timings
+    token = _collectors.set(_collectors.get() + (timings,))
+    try:
+        yield timings
+    finally:
+        _collectors.reset(token)
+
+
+def format_timings(timings: Timings) -> str:
+    """格式化为 X-Timing 头：name;dur=毫秒, ..."""
+    return ", ".join(
+        f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items()
+    )
+
+
+async def trace_stream(
+    stream: AsyncIterator[str], span_: Span | _NoopSpan
+) -> AsyncIterator[str]:
+    """在流结束时结束 span，首个 chunk 记录为 first_token 事件"""
+    first = True
+    try:
+        async for chunk in stream:
+            if first:
+                span_.add_event("first_token")
+                first = False
+            yield chunk
+    except GeneratorExit:
+        span_.finish()
+        raise
+    except BaseException as e:
+        span_.finish(e)
+        raise
+    span_.finish()
+
+
+def traced(name: str | None = None, **attributes: Any):
+    """为同步 / 异步函数添加 span，name 缺省为函数的 __qualname__"""
+
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name, **attributes):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name, **attributes):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def trace_methods(
+    cls: type,
+    prefix: str,
+    methods: tuple[str, ...],
+    stream_methods: tuple[str, ...] = (),
+    attributes: Callable[[Any], dict] = lambda self: {},
+):
+    """为类中直接定义的方法添加 span（span 名为 prefix.方法名），用于 __init_subclass__
+
+    stream_methods 为返回异步迭代器（或返回异步迭代器的协程）的方法，
+    span 持续到流结束，并记录首个 chunk 的时间。
+    """
+    for method in methods:
+        func = cls.__dict__.get(method)
+        if func is not None:
+            setattr(cls, method, _wrap_method(func, f"{prefix}.{method}", attributes))
+    for method in stream_methods:
+        func = cls.__dict__.get(method)
+        if func is not None:
+            setattr(cls, method, _wrap_stream(func, f"{prefix}.{method}", attributes))
+
+
+def _wrap_method(func, span_name: str, attributes: Callable[[Any], dict]):
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(self, *args, **kwargs):
+            with span(span_name, **attributes(self)):
+                return await func(self, *args, **kwargs)
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        with span(span_name, **attributes(self)):
+            return func(self, *args, **kwargs)
+
+    return wrapper
+
+
+def _wrap_stream(func, span_name: str, attributes: Callable[[Any], dict]):
+    @functools.wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        span_ = span(span_name, **attributes(self))
+        try:
+            stream = func(self, *args, **kwargs)
+            if inspect.isawaitable(stream):
+                stream = await stream
+        except BaseException as e:
+            span_.finish(e)
+            raise
+        if span_ is NOOP_SPAN:
+            return stream
+        return trace_stream(stream, span_)
+
+    return wrapper
+
+
+configure()
@@ -0,0 +1,12 @@
+from .odm.TokenUsage import TokenUsage, USAGE_KEYS
+from .usage_service import BudgetDecision, check_budget, usage_recorder
+from . import usage_service
+
+__all__ = [
+    "TokenUsage",
+    "USAGE_KEYS",
+    "BudgetDecision",
+    "check_budget",
+    "usage_recorder",
+    "usage_service",
+]
@@ -0,0 +1,43 @@
+from pydantic import Field
+from pymongo import ASCENDING, IndexModel
+
+from src.database import BaseDocument
+
+
+# 聚合维度：同一天内维度相同的调用累加到同一条记录
+USAGE_KEYS = (
+    "day",
+    "user_id",
+    "session_id",
+    "knowledge_base_id",
+    "prompt",
+    "llm_provider",
+    "model",
+)
+
+
+class TokenUsage(BaseDocument):
+    """LLM token 用量，按天（UTC）与归属维度聚合，由 usage_service 批量 $inc 写入"""
+
+    day: str = Field(...)  # YYYY-MM-DD（UTC）
+    user_id: str = Field(default="")
+    session_id: str = Field(default="")
+    knowledge_base_id: str = Field(default="")
+    prompt: str = Field(default="")  # PROMPT_REGISTRY 的 key
+    llm_provider: str = Field(default="")
+    model: str = Field(default="")
+
+    input_tokens: int = Field(default=0)
+    output_tokens: int = Field(default=0)
+    calls: int = Field(default=0)
+    cost: float = Field(default=0.0)  # 按 [tool.usage.prices] 计算的费用
+
+    class Settings:
+        name = "token_usage"  # MongoDB 集合名
+        indexes = [
+            # upsert 的匹配条件，唯一索引避免多个进程并发 upsert 产生重复记录
+            IndexModel([(key, ASCENDING) for key in USAGE_KEYS], unique=True),
+            # 预算检查：按用户 / 知识库汇总当天费用
+            [("user_id", ASCENDING), ("day", ASCENDING)],
+            [("knowledge_base_id", ASCENDING), ("day", ASCENDING)],
+        ]
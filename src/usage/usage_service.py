@@ -0,0 +1,309 @@
+"""LLM token 用量记账与预算
+
+- record() 在内存中按 USAGE_KEYS 聚合，后台任务定期用 bulk_write（$inc upsert）批量写入，
+  每次调用不再单独访问 Mongo
+- check_budget() 按当天（UTC）累计费用判断用户 / 知识库是否超出预算：
+  允许、降级到便宜模型或拒绝。累计费用 = Mongo 中的值（缓存 spend_cache_seconds 秒）
+  + 本进程尚未写入的用量，多进程部署时存在最多一个缓存周期的误差
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Literal
+
+from pymongo import UpdateOne
+
+from .odm.TokenUsage import USAGE_KEYS, TokenUsage
+
+from config import usage_cfg
+
+
+logger = logging.getLogger(__name__)
+
+# USAGE_KEYS 顺序的维度取值
+UsageKey = tuple[str, ...]
+
+_DAY = USAGE_KEYS.index("day")
+# 可设置预算的维度
+BUDGET_FIELDS = {
+    "user_id": USAGE_KEYS.index("user_id"),
+    "knowledge_base_id": USAGE_KEYS.index("knowledge_base_id"),
+}
+
+
+def today() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+def seconds_until_tomorrow() -> int:
+    """距离预算重置（UTC 零点）的秒数"""
+    now = datetime.now(timezone.utc)
+    tomorrow = (now + timedelta(days=1)).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+    return int((tomorrow - now).total_seconds()) + 1
+
+
+def cost(llm_provider: str, model: str, input_tokens: int, output_tokens: int) -> float:
+    """按 [tool.usage.prices]（每百万 token 的 [输入, 输出] 价格）计算费用，未配置时为 0"""
+    prices = usage_cfg.get("prices", {})
+    input_price, output_price = prices.get(
+        f"{llm_provider}:{model}", prices.get(llm_provider, (0.0, 0.0))
+    )
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+class UsageRecorder:
+    """进程内的用量缓冲区，线程安全（同步适配器在线程池中上报用量）"""
+
+    def __init__(
+        self,
+        flush_interval: float = usage_cfg.get("flush_interval", 5),
+        flush_size: int = usage_cfg.get("flush_size", 500),
+        spend_cache_seconds: float = usage_cfg.get("spend_cache_seconds", 30),
+    ):
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.spend_cache_seconds = spend_cache_seconds
+
+        self._lock = threading.Lock()
+        # key -> [input_tokens, output_tokens, calls, cost]
+        self._pending: dict[UsageKey, list[float]] = {}
+        # (维度, 取值, 日期) -> (Mongo 中的累计费用, 读取时间)
+        self._spend: dict[tuple[str, str, str], tuple[float, float]] = {}
+
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+    def record(
+        self,
+        llm_provider: str,
+        model: str,
+        input_tokens: int,
+        output_tokens: int,
+        prompt: str = "",
+        user_id: str = "",
+        session_id: str = "",
+        knowledge_base_id: str = "",
+    ):
+        values = {
+            "day": today(),
+            "user_id": user_id,
+            "session_id": session_id,
+            "knowledge_base_id": knowledge_base_id,
+            "prompt": prompt,
+            "llm_provider": llm_provider,
+            "model": model,
+        }
+        key = tuple(values[name] for name in USAGE_KEYS)
+        call_cost = cost(llm_provider, model, input_tokens, output_tokens)
+
+        with self._lock:
+            totals = self._pending.setdefault(key, [0, 0, 0, 0.0])
+            totals[0] += input_tokens
+            totals[1] += output_tokens
+            totals[2] += 1
+            totals[3] += call_cost
+            full = len(self._pending) >= self.flush_size
+
+        if full and self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def flush(self):
+        """把缓冲区中的用量批量写入 Mongo，失败时放回缓冲区等待下次写入"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+
+        now = datetime.now(timezone.utc)
+        operations = [
+            UpdateOne(
+                dict(zip(USAGE_KEYS, key)),
+                {
+                    "$inc": {
+                        "input_tokens": input_tokens,
+                        "output_tokens": output_tokens,
+                        "calls": calls,
+                        "cost": call_cost,
+                    },
+                    "$set": {"updated_at": now},
+                    "$setOnInsert": {"created_at": now},
+                },
+                upsert=True,
+            )
+            for key, (input_tokens, output_tokens, calls, call_cost) in pending.items()
+        ]
+        try:
+            await TokenUsage.get_pymongo_collection().bulk_write(
+                operations, ordered=False
+            )
+        except Exception as e:
+            logger.error(
+                f"Failed to write {len(operations)} usage record(s)", exc_info=e
+            )
+            with self._lock:
+                for key, totals in pending.items():
+                    merged = self._pending.setdefault(key, [0, 0, 0, 0.0])
+                    for i, value in enumerate(totals):
+                        merged[i] += value
+            return
+
+        # 已写入的费用计入缓存的累计值，直到下次从 Mongo 重新读取
+        with self._lock:
+            for key, totals in pending.items():
+                for field, index in BUDGET_FIELDS.items():
+                    cache_key = (field, key[index], key[_DAY])
+                    if cache_key in self._spend:
+                        spent, fetched_at = self._spend[cache_key]
+                        self._spend[cache_key] = (spent + totals[3], fetched_at)
+
+    async def spend(self, field: str, value: str, day: str | None = None) -> float:
+        """某用户 / 知识库当天的累计费用"""
+        day = day or today()
+        cache_key = (field, value, day)
+        cached = self._spend.get(cache_key)
+        if cached is None or time.monotonic() - cached[1] > self.spend_cache_seconds:
+            result = await TokenUsage.aggregate(
+                [
+                    {"$match": {field: value, "day": day}},
+                    {"$group": {"_id": None, "cost": {"$sum": "$cost"}}},
+                ]
+            ).to_list()
+            self._spend[cache_key] = (
+                result[0]["cost"] if result else 0.0,
+                time.monotonic(),
+            )
+
+        index = BUDGET_FIELDS[field]
+        with self._lock:
+            pending = sum(
+                totals[3]
+                for key, totals in self._pending.items()
+                if key[index] == value and key[_DAY] == day
+            )
+        return self._spend[cache_key][0] + pending
+
+    def start(self):
+        """启动后台批量写入任务（API / worker 进程启动时调用）"""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """停止后台任务并写入剩余用量"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = self._wakeup = self._loop = None
+        await self.flush()
+
+    async def _flush_loop(self):
+        assert self._wakeup is not None
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+
+usage_recorder = UsageRecorder()
+
+
+@dataclass
+class BudgetDecision:
+    action: Literal["allow", "downgrade", "reject"]
+    reason: str = ""
+    retry_after: int = 0  # 拒绝时距离预算重置的秒数
+
+
+def get_budget(field: str, value: str) -> float:
+    """每日预算，0 为不限制；[tool.usage.user_budgets] / [kb_budgets] 中可单独设置"""
+    if field == "user_id":
+        overrides = usage_cfg.get("user_budgets", {})
+        default = usage_cfg.get("user_daily_budget", 0)
+    else:
+        overrides = usage_cfg.get("kb_budgets", {})
+        default = usage_cfg.get("kb_daily_budget", 0)
+    return float(overrides.get(value, default))
+
+
+async def check_budget(
+    user_id: str | None = None, knowledge_base_id: str | None = None
+) -> BudgetDecision:
+    """检查用户与知识库的当天预算，取超出比例较高的一方决定处理方式"""
+    ratio, reason = 0.0, ""
+    scopes = (("user_id", user_id), ("knowledge_base_id", knowledge_base_id))
+    for field, value in scopes:
+        if not value:
+            continue
+        budget = get_budget(field, value)
+        if budget <= 0:
+            continue
+        spent = await usage_recorder.spend(field, value)
+        if spent / budget > ratio:
+            ratio = spent / budget
+            reason = f"{field} {value} spent {spent:.4f} of daily budget {budget:g}"
+
+    downgrade = usage_cfg.get("over_budget", "reject") == "downgrade"
+    if ratio < 1:
+        return BudgetDecision("allow")
+    if downgrade and ratio < usage_cfg.get("reject_ratio", 1.2):
+        return BudgetDecision("downgrade", reason)
+    return BudgetDecision("reject", reason, seconds_until_tomorrow())
+
+
+async def get_usage(
+    user_id: str | None = None,
+    session_id: str | None = None,
+    knowledge_base_id: str | None = None,
+    start_day: str | None = None,
+    end_day: str | None = None,
+    group_by: tuple[str, ...] = ("prompt", "llm_provider", "model"),
+) -> list[dict]:
+    """按条件汇总用量（包含本进程尚未写入的部分），按 group_by 分组"""
+    await usage_recorder.flush()
+
+    match: dict = {}
+    for field, value in (
+        ("user_id", user_id),
+        ("session_id", session_id),
+        ("knowledge_base_id", knowledge_base_id),
+    ):
+        if value is not None:
+            match[field] = value
+    if start_day or end_day:
+        match["day"] = {}
+        if start_day:
+            match["day"]["$gte"] = start_day
+        if end_day:
+            match["day"]["$lte"] = end_day
+
+    rows = await TokenUsage.aggregate(
+        [
+            {"$match": match},
+            {
+                "$group": {
+                    "_id": {field: f"${field}" for field in group_by},
+                    "input_tokens": {"$sum": "$input_tokens"},
+                    "output_tokens": {"$sum": "$output_tokens"},
+                    "calls": {"$sum": "$calls"},
+                    "cost": {"$sum": "$cost"},
+                }
+            },
+            {"$sort": {"cost": -1}},
+        ]
+    ).to_list()
+    return [{**row.pop("_id"), **row} for row in rows]
@@ -0,0 +1,4 @@
+import os
+
+# 导入 src.rag 时会创建嵌入模型客户端，测试不发出请求，只需提供占位的 API key
+os.environ.setdefault("BAILIAN_API_KEY", "test")
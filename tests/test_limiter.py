@@ -0,0 +1,163 @@
+"""ProviderLimiter：优先级调度、按优先级的并发占比、令牌桶与排队的超时 / 取消"""
+
+import asyncio
+import time
+
+import pytest
+
+from src.llm.limiter import LLMOverloadedError, ProviderLimiter
+
+
+def limiter(max_concurrency: int = 1, rate: float = 0, burst: int = 0):
+    # [tool.llm_limiter.classes]：retrieval 占 0.75、background 占 0.25 的并发
+    return ProviderLimiter("test", max_concurrency, rate, burst)
+
+
+async def queued(limiter: ProviderLimiter, priority: str, order: list[str]):
+    await limiter.acquire(priority)
+    order.append(priority)
+
+
+def test_dispatches_higher_priority_first():
+    async def run():
+        lim = limiter()
+        await lim.acquire("interactive")
+        order: list[str] = []
+        tasks = [
+            asyncio.create_task(queued(lim, p, order))
+            for p in ("background", "retrieval", "interactive")
+        ]
+        await asyncio.sleep(0)
+        assert sum(len(q) for q in lim.queues.values()) == 3
+
+        for _ in range(3):
+            lim.release(order[-1] if order else "interactive")
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+        return lim, order
+
+    lim, order = asyncio.run(run())
+
+    assert order == ["interactive", "retrieval", "background"]
+    assert lim.in_flight["background"] == 1
+
+
+def test_share_limits_lower_priority_concurrency():
+    async def run():
+        lim = limiter(max_concurrency=4)
+        await lim.acquire("background")
+        waiter = asyncio.create_task(lim.acquire("background"))
+        await asyncio.sleep(0)
+        # background 最多占 1 个并发，其余优先级不受影响
+        assert not waiter.done()
+        await lim.acquire("interactive")
+        await lim.acquire("retrieval")
+        assert not waiter.done()
+
+        lim.release("background")
+        await waiter
+        return lim
+
+    lim = asyncio.run(run())
+
+    assert lim.in_flight == {"interactive": 1, "retrieval": 1, "background": 1}
+
+
+def test_does_not_jump_queue_of_same_or_higher_priority():
+    async def run():
+        lim = limiter()
+        await lim.acquire("retrieval")
+        order: list[str] = []
+        first = asyncio.create_task(queued(lim, "retrieval", order))
+        await asyncio.sleep(0)
+        lim.release("retrieval")  # 名额交给排队中的调用
+        second = asyncio.create_task(queued(lim, "retrieval", order))
+        await asyncio.sleep(0.01)
+        assert order == ["retrieval"] and not second.done()
+        lim.release("retrieval")
+        await asyncio.gather(first, second)
+
+    asyncio.run(run())
+
+
+def test_token_bucket_timer_redispatches_queued_call():
+    async def run():
+        lim = limiter(max_concurrency=4, rate=20, burst=1)
+        await lim.acquire("interactive")
+        start = time.perf_counter()
+        # 并发有空闲但没有令牌：等待约 1 / rate 秒后由定时器放行，无需 release
+        await lim.acquire("interactive")
+        return time.perf_counter() - start, lim
+
+    elapsed, lim = asyncio.run(run())
+
+    assert 0.03 <= elapsed < 1
+    assert lim.in_flight["interactive"] == 2
+
+
+def test_rejects_when_queue_full():
+    async def run():
+        lim = limiter()
+        lim.max_queue["background"] = 0
+        await lim.acquire("interactive")
+        with pytest.raises(LLMOverloadedError) as exc_info:
+            await lim.acquire("background")
+        return exc_info.value
+
+    error = asyncio.run(run())
+
+    assert error.reason == "queue_full"
+    assert error.priority == "background"
+
+
+def test_timeout_leaves_queue_empty():
+    async def run():
+        lim = limiter()
+        lim.max_wait["interactive"] = 0.02
+        await lim.acquire("interactive")
+        with pytest.raises(LLMOverloadedError) as exc_info:
+            await lim.acquire("interactive")
+        return lim, exc_info.value
+
+    lim, error = asyncio.run(run())
+
+    assert error.reason == "timeout"
+    assert not lim.queues["interactive"]
+    assert lim.in_flight["interactive"] == 1
+
+
+def test_cancelled_while_queued_is_removed():
+    async def run():
+        lim = limiter()
+        await lim.acquire("interactive")
+        waiter = asyncio.create_task(lim.acquire("retrieval"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        lim.release("interactive")
+        return lim
+
+    lim = asyncio.run(run())
+
+    assert not lim.queues["retrieval"]
+    assert sum(lim.in_flight.values()) == 0
+
+
+def test_cancel_after_grant_releases_slot():
+    async def run():
+        lim = limiter()
+        await lim.acquire("interactive")
+        waiter = asyncio.create_task(lim.acquire("retrieval"))
+        await asyncio.sleep(0)
+        # 名额已分配给 waiter，但 waiter 恢复执行前被取消
+        lim.release("interactive")
+        assert lim.in_flight["retrieval"] == 1
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return lim
+
+    lim = asyncio.run(run())
+
+    assert sum(lim.in_flight.values()) == 0
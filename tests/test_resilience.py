@@ -0,0 +1,169 @@
+"""熔断器状态机与对冲请求"""
+
+import asyncio
+
+import pytest
+
+from src.resilience import CircuitBreaker, CircuitOpenError, hedged
+from src.resilience import breaker as breaker_module
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(breaker_module, "time", clock)
+    return clock
+
+
+def open_breaker(name: str) -> CircuitBreaker:
+    breaker = CircuitBreaker(name, failure_threshold=2, reset_timeout=10)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    return breaker
+
+
+# ===== CircuitBreaker =====
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("test-open", failure_threshold=2, reset_timeout=10)
+    breaker.before_call()
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_success()  # 成功后连续失败计数清零
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError) as exc_info:
+        breaker.before_call()
+    assert exc_info.value.retry_after == pytest.approx(10)
+
+
+def test_breaker_half_open_allows_single_probe(clock):
+    breaker = open_breaker("test-probe")
+    clock.now += 10
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    breaker.before_call()  # 探测请求
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+
+
+def test_breaker_failed_probe_reopens(clock):
+    breaker = open_breaker("test-reopen")
+    clock.now += 10
+    breaker.before_call()
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.now += 5
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    clock.now += 5
+    breaker.before_call()
+
+
+def test_breaker_release_frees_probe_without_closing(clock):
+    breaker = open_breaker("test-release")
+    clock.now += 10
+    breaker.before_call()
+    breaker.release()  # 探测请求因非上游原因结束
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.before_call()  # 可以再次探测
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+# ===== hedged =====
+class Calls:
+    """按调用顺序返回预设的 (耗时, 结果或异常)，记录被取消的调用"""
+
+    def __init__(self, *plans: tuple[float, object]):
+        self.plans = list(plans)
+        self.started = 0
+        self.cancelled: list[int] = []
+
+    async def __call__(self):
+        index = self.started
+        self.started += 1
+        delay, outcome = self.plans[index]
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(index)
+            raise
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+
+def test_hedged_fast_call_sends_no_hedge():
+    calls = Calls((0, "first"))
+    hedges = []
+
+    result = asyncio.run(hedged(calls, 0.05, on_hedge=lambda: hedges.append(1)))
+
+    assert result == "first"
+    assert calls.started == 1
+    assert hedges == []
+
+
+def test_hedged_returns_first_success_and_cancels_other():
+    async def run():
+        calls = Calls((1.0, "slow"), (0, "hedge"))
+        hedges = []
+        result = await hedged(calls, 0.02, on_hedge=lambda: hedges.append(1))
+        await asyncio.sleep(0)  # 让被取消的任务处理 CancelledError
+        return calls, hedges, result
+
+    calls, hedges, result = asyncio.run(run())
+
+    assert result == "hedge"
+    assert hedges == [1]
+    assert calls.cancelled == [0]
+
+
+def test_hedged_waits_for_other_call_after_failure():
+    calls = Calls((0.05, "slow"), (0, ValueError("hedge failed")))
+
+    assert asyncio.run(hedged(calls, 0.01)) == "slow"
+    assert calls.started == 2
+
+
+def test_hedged_raises_last_error_when_both_fail():
+    calls = Calls((0.05, ValueError("first")), (0, ValueError("hedge")))
+
+    with pytest.raises(ValueError, match="first"):
+        asyncio.run(hedged(calls, 0.01))
+
+
+def test_hedged_cancellation_cancels_in_flight_calls():
+    async def run():
+        calls = Calls((1.0, "slow"), (1.0, "hedge"))
+        task = asyncio.create_task(hedged(calls, 0.01))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0)
+        return calls
+
+    calls = asyncio.run(run())
+
+    assert sorted(calls.cancelled) == [0, 1]
@@ -0,0 +1,269 @@
+"""query_route 检索：按 collection 语言选择 query、BM25 按 collection 取 top-k、结果去重"""
+
+import os
+import pickle
+
+import chromadb
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from config import rag_cfg
+from src.rag.retriever import ANNRetriever, BM25Retriever, ChromaRetriever
+from src.rag.retriever.ann_retriever import hnsw_index
+from src.rag.retriever.chroma_retriever import ChromaRetriever as chroma_module
+from src.rag.retriever.bm25_retriever.sparse_index import (
+    BM25Index,
+    term_frequencies,
+)
+from src.rag.retriever.bm25_retriever.tokenizer import get_tokenizer
+from src.rag.utils import remove_duplicates, resolve_query
+
+
+EN_DOCS = [
+    "Vector databases store embeddings for similarity search",
+    "The cat sat on the mat",
+    "Hybrid search combines BM25 ranking with vector similarity",
+]
+ZH_DOCS = [
+    "向量数据库存储嵌入向量用于相似度检索",
+    "今天天气晴朗适合出门散步",
+    "混合检索结合关键词排序与向量相似度",
+]
+
+
+def build_index() -> BM25Index:
+    parts = []
+    for cid, language, docs in (("en", "EN", EN_DOCS), ("zh", "ZH", ZH_DOCS)):
+        tokenizer = get_tokenizer(language)
+        vocab, tf = term_frequencies([tokenizer(doc) for doc in docs])
+        parts.append((cid, vocab, tf))
+    return BM25Index(parts)
+
+
+# ===== resolve_query =====
+def test_resolve_query_plain_string():
+    assert resolve_query("hello", "ZH") == "hello"
+
+
+def test_resolve_query_picks_language():
+    query = {"EN": "vector search", "ZH": "向量检索"}
+    assert resolve_query(query, "EN") == "vector search"
+    assert resolve_query(query, "ZH") == "向量检索"
+
+
+def test_resolve_query_falls_back_to_any_language():
+    assert resolve_query({"EN": "vector search"}, "ZH") == "vector search"
+    assert resolve_query({"EN": "", "ZH": "向量检索"}, "EN") == "向量检索"
+    assert resolve_query({"EN": "", "ZH": ""}, "EN") == ""
+    assert resolve_query({}, "EN") == ""
+
+
+def test_resolve_query_does_not_mutate_query():
+    query = {"EN": "vector search", "ZH": "向量检索"}
+    original = dict(query)
+    # 多个 collection 依次解析同一个 query，互不影响
+    assert [resolve_query(query, lang) for lang in ("ZH", "EN", "ZH")] == [
+        "向量检索",
+        "vector search",
+        "向量检索",
+    ]
+    assert query == original
+
+
+# ===== BM25Index.top_k_per_collection =====
+def test_top_k_per_collection_routes_by_language():
+    index = build_index()
+    en_rows = range(*index.offsets["en"])
+    zh_rows = range(*index.offsets["zh"])
+
+    en_hits = index.top_k_per_collection(
+        get_tokenizer("EN")("vector similarity search"), {"en": 2}
+    )
+    assert list(en_hits) == ["en"]
+    assert len(en_hits["en"]) == 2
+    assert all(row in en_rows for row, _ in en_hits["en"])
+    assert en_hits["en"][0][0] == en_rows[0]
+
+    zh_hits = index.top_k_per_collection(get_tokenizer("ZH")("向量数据库"), {"zh": 1})
+    assert zh_hits["zh"][0][0] == zh_rows[0]
+
+
+def test_top_k_per_collection_matches_single_collection_top_k():
+    index = build_index()
+    query_tokens = get_tokenizer("ZH")("向量 similarity 检索")
+    ks = {"en": 1, "zh": 3, "missing": 5}
+
+    hits = index.top_k_per_collection(query_tokens, ks)
+
+    # 未建索引的 collection 被忽略，每个 collection 各自取 k 个
+    assert set(hits) == {"en", "zh"}
+    for cid in ("en", "zh"):
+        expected = index.top_k(query_tokens, ks[cid], collection_ids=[cid])
+        assert hits[cid] == expected
+        assert len(hits[cid]) <= ks[cid]
+        assert all(score > 0 for _, score in hits[cid])
+
+
+# ===== remove_duplicates =====
+def make_doc(doc_id: str, collection_id: str | None = None, **metadata) -> Document:
+    if collection_id is not None:
+        metadata["collection_id"] = collection_id
+    return Document(
+        id=doc_id, page_content=f"{collection_id}:{doc_id}", metadata=metadata
+    )
+
+
+def test_remove_duplicates_keys_on_id_and_collection():
+    docs = [
+        make_doc("0", "a"),
+        make_doc("0", "b"),  # 同一分块 id，不同 collection
+        make_doc("0", "a"),
+        make_doc("1", "a"),
+    ]
+    unique = remove_duplicates(docs)
+    assert [(d.id, d.metadata["collection_id"]) for d in unique] == [
+        ("0", "a"),
+        ("0", "b"),
+        ("1", "a"),
+    ]
+    # 保留第一次出现的文档
+    assert unique[0] is docs[0]
+
+
+def test_remove_duplicates_falls_back_to_record_id():
+    docs = [
+        make_doc("0", record_id="r1"),
+        make_doc("0", record_id="r2"),
+        make_doc("0", record_id="r1"),
+    ]
+    assert [d.metadata["record_id"] for d in remove_duplicates(docs)] == ["r1", "r2"]
+
+
+# ===== 各检索器的 retrieve_routed =====
+# 每个 collection 都有一个只匹配对方语言 query 的干扰分块：
+# 若 collection 用错了 query，取回的会是干扰分块
+ROUTED_CHUNKS = {
+    "en": ["The cat sat on the mat", "Weather report 天气 today"],
+    "zh": ["今天天气晴朗适合散步", "小猫 cat 喜欢晒太阳"],
+}
+ROUTED_QUERY = {"EN": "cat", "ZH": "天气"}
+EXPECTED = {"The cat sat on the mat", "今天天气晴朗适合散步"}
+KEYWORDS = ["cat", "天气", "weather", "晴朗"]
+
+
+class KeywordEmbedding:
+    """按关键词出现与否生成向量，并记录被向量化的文本"""
+
+    def __init__(self):
+        self.calls: list[list[str]] = []
+
+    def __call__(self, input: list[str]) -> np.ndarray:
+        self.calls.append(list(input))
+        return np.asarray(
+            [[float(kw in text.lower()) for kw in KEYWORDS] + [0.1] for text in input],
+            dtype=np.float32,
+        )
+
+
+def routed_chunk_sets() -> dict[str, list[Document]]:
+    return {
+        cid: [
+            Document(id=str(i), page_content=text, metadata={"collection_id": cid})
+            for i, text in enumerate(texts)
+        ]
+        for cid, texts in ROUTED_CHUNKS.items()
+    }
+
+
+@pytest.fixture
+def chunk_dir(tmp_path, monkeypatch):
+    monkeypatch.setitem(rag_cfg, "chunk_dir", str(tmp_path / "chunks"))
+    os.makedirs(rag_cfg["chunk_dir"])
+    for cid, documents in routed_chunk_sets().items():
+        with open(os.path.join(rag_cfg["chunk_dir"], cid + ".pkl"), "wb") as f:
+            pickle.dump(documents, f)
+    for retriever in (BM25Retriever, ChromaRetriever, ANNRetriever):
+        monkeypatch.setattr(retriever, "_instances", {})
+    return tmp_path
+
+
+LANGUAGES = {"en": "EN", "zh": "ZH"}
+ROUTE = {"en": 1, "zh": 1}
+
+
+def test_bm25_retrieve_routed_uses_query_per_collection(chunk_dir):
+    BM25Retriever.ingest_many(routed_chunk_sets(), languages=LANGUAGES)
+    retriever = BM25Retriever(["en", "zh"], language=LANGUAGES)
+
+    documents = retriever.retrieve(ROUTED_QUERY, query_route=ROUTE)
+
+    assert {doc.page_content for doc in documents} == EXPECTED
+
+
+class SpyCollection:
+    """记录每个 collection 收到的 query 向量"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.queries: list[np.ndarray] = []
+
+    def add(self, **kwargs):
+        self.collection.add(**kwargs)
+
+    def query(self, query_embeddings, n_results):
+        self.queries.append(np.asarray(query_embeddings))
+        return self.collection.query(
+            query_embeddings=query_embeddings, n_results=n_results
+        )
+
+
+def test_chroma_retrieve_routed_uses_query_per_collection(chunk_dir, monkeypatch):
+    client = chromadb.EphemeralClient()
+    prefix = os.path.basename(chunk_dir)
+    stores = {
+        cid: SpyCollection(client.get_or_create_collection(f"{prefix}-{cid}"))
+        for cid in ROUTED_CHUNKS
+    }
+    monkeypatch.setattr(chroma_module, "get_collection", lambda cid, **_: stores[cid])
+    embedding = KeywordEmbedding()
+    ChromaRetriever.ingest_many(routed_chunk_sets(), embedding_function=embedding)
+    retriever = ChromaRetriever(
+        ["en", "zh"], language=LANGUAGES, embedding_function=embedding
+    )
+
+    documents = retriever.retrieve(ROUTED_QUERY, query_route=ROUTE)
+
+    assert {doc.page_content for doc in documents} == EXPECTED
+    # 两种语言的 query 一次向量化，各 collection 收到自己语言的 query 向量
+    assert embedding.calls[-1] == ["cat", "天气"]
+    for cid, language in LANGUAGES.items():
+        (query,) = stores[cid].queries
+        np.testing.assert_array_equal(query, embedding([ROUTED_QUERY[language]]))
+
+
+@pytest.mark.parametrize("quantization", ["none", "int8"])
+def test_ann_retrieve_routed_uses_query_per_collection(
+    chunk_dir, monkeypatch, quantization
+):
+    if quantization == "none":
+        pytest.importorskip("hnswlib")
+    monkeypatch.setitem(hnsw_index.ann_cfg, "index_dir", str(chunk_dir / "ann"))
+    embedding = KeywordEmbedding()
+    ANNRetriever.ingest_many(
+        routed_chunk_sets(),
+        knowledge_base_id="kb",
+        embedding_function=embedding,
+        quantization=quantization,
+    )
+    retriever = ANNRetriever(
+        ["en", "zh"],
+        language=LANGUAGES,
+        knowledge_base_id="kb",
+        embedding_function=embedding,
+    )
+
+    documents = retriever.retrieve(ROUTED_QUERY, query_route=ROUTE)
+
+    assert {doc.page_content for doc in documents} == EXPECTED
+    assert embedding.calls[-1] == ["cat", "天气"]